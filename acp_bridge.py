@@ -0,0 +1,165 @@
+"""
+ACP proxy bridge
+Runs acp_proxy.js once in server mode and multiplexes requests over its stdin/stdout
+"""
+
+import json
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+PROXY_SCRIPT = Path(__file__).parent / "acp_proxy.js"
+
+
+class ProxyDiedError(RuntimeError):
+    """The proxy process exited while a request was in flight"""
+
+
+class RequestCancelled(Exception):
+    """The caller gave up on a request (barge-in)"""
+
+
+class AcpProxy:
+    """Long-lived `node acp_proxy.js --server` process with id-tagged NDJSON requests"""
+
+    def __init__(self, node_binary: str = "node", script: Path = PROXY_SCRIPT,
+                 min_restart_interval: float = 1.0):
+        self.node_binary = node_binary
+        self.script = script
+        self.min_restart_interval = min_restart_interval
+        self.proc: Optional[subprocess.Popen] = None
+        self.pending_requests: Dict[str, Future] = {}
+        # Which process each pending request was written to
+        self._owners: Dict[str, subprocess.Popen] = {}
+        self.restarts = 0
+        self._last_start = 0.0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def start(self):
+        """Start the proxy if it is not already running"""
+        with self._lock:
+            self._ensure_running()
+
+    def _ensure_running(self):
+        if self.proc and self.proc.poll() is None:
+            return
+
+        if self.proc is not None:
+            self.restarts += 1
+            print(f"♻️  Restarting ACP proxy (exit code {self.proc.returncode}, restart #{self.restarts})")
+            # Don't spin if the proxy dies straight away
+            wait = self.min_restart_interval - (time.monotonic() - self._last_start)
+            if wait > 0:
+                time.sleep(wait)
+
+        self._last_start = time.monotonic()
+        self.proc = subprocess.Popen(
+            [self.node_binary, str(self.script), "--server"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            cwd=str(self.script.parent),
+        )
+        threading.Thread(target=self._read_stdout, args=(self.proc,), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self.proc,), daemon=True).start()
+
+    def _read_stdout(self, proc: subprocess.Popen):
+        for line in proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                resp = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"   ⚠️  Could not parse proxy output line: {line}")
+                continue
+
+            self._owners.pop(resp.get("id"), None)
+            future = self.pending_requests.pop(resp.get("id"), None)
+            if future and not future.done():
+                future.set_result(resp)
+
+        # EOF: the process is gone, fail whatever it still owed us
+        proc.wait()
+        for request_id, owner in list(self._owners.items()):
+            if owner is not proc:
+                continue
+            self._owners.pop(request_id, None)
+            future = self.pending_requests.pop(request_id, None)
+            if future and not future.done():
+                future.set_exception(ProxyDiedError(f"ACP proxy exited with code {proc.returncode}"))
+
+    def _read_stderr(self, proc: subprocess.Popen):
+        # Proxy logs go to stderr
+        for line in proc.stderr:
+            if line.strip():
+                print(f"   [proxy stderr] {line.rstrip()}")
+
+    def request(self, message: Dict[str, Any], request_id: Optional[str] = None) -> Future:
+        """Send a request and return a future for its reply"""
+        request_id = request_id or str(uuid.uuid4())
+        future: Future = Future()
+        self.pending_requests[request_id] = future
+
+        with self._lock:
+            self._ensure_running()
+            proc = self.proc
+        self._owners[request_id] = proc
+
+        try:
+            with self._write_lock:
+                proc.stdin.write(json.dumps({**message, "id": request_id}) + "\n")
+                proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self._owners.pop(request_id, None)
+            self.pending_requests.pop(request_id, None)
+            future.set_exception(ProxyDiedError(f"ACP proxy not writable: {e}"))
+        return future
+
+    def cancel(self, request_id: str):
+        """Stop waiting for a request; a late reply is ignored"""
+        self._owners.pop(request_id, None)
+        future = self.pending_requests.pop(request_id, None)
+        if future and not future.done():
+            future.set_exception(RequestCancelled(request_id))
+
+    def ask(self, text: str, to: Optional[str] = None, channel: str = "telegram",
+            timeout: float = 60, cancel_token=None) -> Dict[str, Any]:
+        """
+        Ask the agent and wait for the proxy's reply object
+
+        If cancel_token (a pipeline.CancelToken) is cancelled while waiting,
+        RequestCancelled is raised straight away.
+        """
+        request_id = str(uuid.uuid4())
+        future = self.request({
+            "type": "ask",
+            "text": text,
+            "to": to,
+            "channel": channel,
+        }, request_id)
+        if cancel_token is not None:
+            cancel_token.add_callback(lambda: self.cancel(request_id))
+        try:
+            return future.result(timeout=timeout)
+        finally:
+            self._owners.pop(request_id, None)
+            self.pending_requests.pop(request_id, None)
+
+    def close(self):
+        """Stop the proxy process"""
+        with self._lock:
+            if self.proc and self.proc.poll() is None:
+                self.proc.stdin.close()
+                try:
+                    self.proc.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    self.proc.terminate()
+            self.proc = None
@@ -2,6 +2,11 @@
 
 // ACP proxy: stdin JSON -> OpenClaw Gateway -> stdout JSON
 // Uses @agentclientprotocol/sdk from OpenClaw's node_modules
+//
+// One-shot mode (default): connect, answer the asks on stdin, exit when stdin closes.
+// Server mode (--server): stay resident, keep one gateway connection open and
+// reconnect it on demand. Requests may carry an "id" that is echoed in the
+// reply; asks run concurrently, so replies can come back out of order.
 
 import fs from "fs";
 import path from "path";
@@ -14,13 +19,14 @@ import { AgentSideConnection } from "@agentclientprotocol/sdk/dist/acp.js";
 const __dirname = path.dirname(url.fileURLToPath(import.meta.url));
 const ROOT = __dirname;
 const CONFIG_PATH = path.join(ROOT, "config.json");
+const SERVER_MODE = process.argv.includes("--server");
 
 function loadConfig() {
   const raw = fs.readFileSync(CONFIG_PATH, "utf-8");
   return JSON.parse(raw);
 }
 
-async function connectGateway(config) {
+async function connectGateway(config, onClose) {
   const gatewayUrl = config.gatewayUrl || "ws://127.0.0.1:18789";
   const deviceId = config.deviceId;
   const token = config.gatewayToken;
@@ -57,12 +63,12 @@ async function connectGateway(config) {
 
   ws.on("close", (code, reason) => {
     console.error("[acp_proxy] WebSocket closed", code, reason.toString());
-    process.exit(1);
+    onClose();
   });
 
   ws.on("error", (err) => {
     console.error("[acp_proxy] WebSocket error", err);
-    process.exit(1);
+    onClose();
   });
 
   await new Promise((resolve, reject) => {
@@ -113,15 +119,73 @@ async function connectGateway(config) {
   return client;
 }
 
+function respond(msg, body) {
+  const out = msg && msg.id !== undefined ? { id: msg.id, ...body } : body;
+  process.stdout.write(JSON.stringify(out) + "\n");
+}
+
 async function run() {
-  const config = loadConfig();
-  let client;
+  let config = loadConfig();
+
+  // Shared gateway connection; reset when the socket closes so the next
+  // request reconnects (server mode) instead of killing the process.
+  let clientPromise = null;
+
+  // Only forget the connection that actually closed: a socket replaced
+  // after a config change may close late, and must not drop its successor.
+  const onGatewayClosed = (promise) => {
+    if (!SERVER_MODE) {
+      process.exit(1);
+    }
+    if (clientPromise === promise) {
+      clientPromise = null;
+    }
+  };
+
+  const getClient = () => {
+    if (!clientPromise) {
+      const promise = connectGateway(config, () => onGatewayClosed(promise)).catch((err) => {
+        if (clientPromise === promise) {
+          clientPromise = null;
+        }
+        throw err;
+      });
+      clientPromise = promise;
+    }
+    return clientPromise;
+  };
+
+  // Server mode: pick up gateway settings edited in config.json. Asks already
+  // running finish on the old connection; the next one connects afresh.
+  if (SERVER_MODE) {
+    fs.watchFile(CONFIG_PATH, { interval: 1000 }, () => {
+      let next;
+      try {
+        next = loadConfig();
+      } catch (err) {
+        console.error("[acp_proxy] Ignoring config.json change:", err.message || err);
+        return;
+      }
+      const keys = ["gatewayUrl", "gatewayToken", "deviceId"];
+      const changed = keys.some((key) => next[key] !== config[key]);
+      config = next;
+      if (changed) {
+        console.error("[acp_proxy] Gateway settings changed, reconnecting on next request");
+        clientPromise = null;
+      }
+    });
+  }
 
   try {
-    client = await connectGateway(config);
+    await getClient();
+    if (SERVER_MODE) {
+      console.error("[acp_proxy] Connected, serving requests on stdin");
+    }
   } catch (err) {
     console.error("[acp_proxy] Failed to connect:", err.message || err);
-    process.exit(1);
+    if (!SERVER_MODE) {
+      process.exit(1);
+    }
   }
 
   const rl = readline.createInterface({
@@ -130,6 +194,20 @@ async function run() {
     terminal: false,
   });
 
+  let inFlight = 0;
+  let stdinClosed = false;
+
+  const maybeExit = () => {
+    if (stdinClosed && inFlight === 0) {
+      process.exit(0);
+    }
+  };
+
+  rl.on("close", () => {
+    stdinClosed = true;
+    maybeExit();
+  });
+
   rl.on("line", async (line) => {
     line = line.trim();
     if (!line) return;
@@ -142,8 +220,30 @@ async function run() {
       return;
     }
 
+    if (msg.type === "ping") {
+      // Report the gateway connection too: server mode keeps reading stdin
+      // after a failed connect, so a bare pong would not mean it is up
+      inFlight++;
+      try {
+        await getClient();
+        respond(msg, { ok: true, type: "pong", gateway: "connected" });
+      } catch (err) {
+        respond(msg, {
+          ok: false,
+          type: "pong",
+          gateway: "disconnected",
+          error: `gateway not connected: ${err.message || err}`,
+        });
+      } finally {
+        inFlight--;
+        maybeExit();
+      }
+      return;
+    }
+
     if (msg.type !== "ask") {
       console.error("[acp_proxy] Unsupported message type:", msg.type);
+      respond(msg, { ok: false, error: `Unsupported message type: ${msg.type}` });
       return;
     }
 
@@ -151,7 +251,10 @@ async function run() {
     const to = msg.to;
     const channel = msg.channel || "telegram";
 
+    inFlight++;
     try {
+      const client = await getClient();
+
       // Call gateway agent via extMethod
       const res = await client.extMethod("gateway.agent.run", {
         message: text,
@@ -160,9 +263,12 @@ async function run() {
       });
 
       const reply = res?.reply || "";
-      process.stdout.write(JSON.stringify({ ok: true, reply }) + "\n");
+      respond(msg, { ok: true, reply });
     } catch (err) {
-      process.stdout.write(JSON.stringify({ ok: false, error: String(err) }) + "\n");
+      respond(msg, { ok: false, error: String(err) });
+    } finally {
+      inFlight--;
+      maybeExit();
     }
   });
 }
@@ -0,0 +1,271 @@
+"""
+Audio capture
+Persistent microphone stream with pre-roll, and preallocated buffers that STT reads without copying
+"""
+
+import datetime
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from stt_engine import SAMPLE_RATE
+
+# PortAudio callback status flags (same values as pyaudio.paInputUnderflow etc.)
+INPUT_UNDERFLOW = 0x1
+INPUT_OVERFLOW = 0x2
+
+
+class PcmBuffer:
+    """
+    Growable mono capture buffer
+
+    Each appended chunk is written once into an int16 array (for VAD and
+    debug WAVs) and once into a float32 array scaled to [-1, 1] (for
+    Whisper). Both are preallocated and grow by doubling, and samples() /
+    float32() return views, so nothing is joined or re-decoded after
+    recording stops.
+    """
+
+    def __init__(self, seconds: float = 30.0):
+        capacity = int(SAMPLE_RATE * seconds)
+        self._int16 = np.zeros(capacity, dtype=np.int16)
+        self._float32 = np.zeros(capacity, dtype=np.float32)
+        self.length = 0
+        self.chunks = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def duration(self) -> float:
+        return self.length / SAMPLE_RATE
+
+    def _grow(self, needed: int):
+        capacity = len(self._int16)
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_int16", "_float32"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.length] = old[:self.length]
+            setattr(self, name, new)
+
+    def append(self, pcm: bytes):
+        """Append 16-bit PCM from the audio callback"""
+        chunk = np.frombuffer(pcm, dtype=np.int16)
+        end = self.length + len(chunk)
+        if end > len(self._int16):
+            self._grow(end)
+        self._int16[self.length:end] = chunk
+        np.multiply(chunk, 1.0 / 32768.0, out=self._float32[self.length:end], casting="unsafe")
+        self.length = end
+        self.chunks += 1
+
+    def clear(self):
+        """Forget the contents but keep the allocation"""
+        self.length = 0
+        self.chunks = 0
+
+    def samples(self) -> np.ndarray:
+        """int16 view of the captured audio"""
+        return self._int16[:self.length]
+
+    def float32(self) -> np.ndarray:
+        """float32 view of the captured audio, ready for Whisper"""
+        return self._float32[:self.length]
+
+    def save_wav(self, directory: str = "./recordings") -> str:
+        """Write the captured audio to a timestamped WAV file (debugging aid)"""
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = str(Path(directory) / f"recording_{timestamp}.wav")
+
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(SAMPLE_RATE)
+            wf.writeframes(self.samples().tobytes())
+        return path
+
+
+class CaptureStats:
+    """Counts of PortAudio callback status flags"""
+
+    def __init__(self):
+        self.overflows = 0
+        self.underflows = 0
+        self.callbacks = 0
+
+    def record(self, status: int):
+        self.callbacks += 1
+        if status & INPUT_OVERFLOW:
+            self.overflows += 1
+        if status & INPUT_UNDERFLOW:
+            self.underflows += 1
+
+    def reset(self):
+        self.overflows = 0
+        self.underflows = 0
+        self.callbacks = 0
+
+    def summary(self) -> str:
+        return f"{self.callbacks} callbacks, {self.overflows} overflows, {self.underflows} underflows"
+
+
+class AudioEngine:
+    """
+    Persistent microphone input
+
+    PortAudio is initialized and the input stream opened once. While idle
+    the stream keeps feeding a short ring buffer; begin() starts a new
+    capture that is seeded with that pre-roll, so the first syllable spoken
+    together with the hotkey isn't lost. With always_on=False the stream is
+    opened per capture instead (no pre-roll, the old behaviour).
+    """
+
+    def __init__(self, device_index=None, preroll_ms: int = 300, always_on: bool = True,
+                 frames_per_buffer: int = 1024, on_audio=None):
+        self.device_index = device_index
+        self.always_on = always_on
+        self.frames_per_buffer = frames_per_buffer
+        # Called as on_audio(pcm_bytes, status) for every chunk while capturing
+        self.on_audio = on_audio
+
+        self._ring = np.zeros(SAMPLE_RATE * preroll_ms // 1000 if always_on else 0, dtype=np.int16)
+        self._ring_pos = 0
+        self._ring_filled = 0
+
+        self.pa = None
+        self.stream = None
+        self.buffer: Optional[PcmBuffer] = None
+        self.capturing = False
+        self.begin_time = None
+        self.first_sample_latency = None
+        self.preroll_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Initialize PortAudio and, in always-on mode, open the input stream"""
+        import pyaudio
+
+        self.pa = pyaudio.PyAudio()
+        if self.device_index is not None:
+            device_info = self.pa.get_device_info_by_index(self.device_index)
+        else:
+            device_info = self.pa.get_default_input_device_info()
+        print(f"   🎤 Input device [{device_info['index']}]: {device_info['name']}")
+        if self.always_on:
+            self._open()
+
+    def _open(self):
+        import pyaudio
+
+        self.stream = self.pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=SAMPLE_RATE,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self._callback
+        )
+        self.stream.start_stream()
+
+    def _close_stream(self):
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        import pyaudio
+
+        with self._lock:
+            capturing = self.capturing
+            if capturing:
+                if self.first_sample_latency is None:
+                    self.first_sample_latency = time.monotonic() - self.begin_time
+                if self.buffer is not None:
+                    self.buffer.append(in_data)
+            else:
+                self._write_ring(np.frombuffer(in_data, dtype=np.int16))
+
+        if capturing and self.on_audio:
+            self.on_audio(in_data, status)
+        return (in_data, pyaudio.paContinue)
+
+    def _write_ring(self, chunk: np.ndarray):
+        size = len(self._ring)
+        if size == 0:
+            return
+        if len(chunk) >= size:
+            self._ring[:] = chunk[-size:]
+            self._ring_pos = 0
+            self._ring_filled = size
+            return
+        end = self._ring_pos + len(chunk)
+        if end <= size:
+            self._ring[self._ring_pos:end] = chunk
+        else:
+            first = size - self._ring_pos
+            self._ring[self._ring_pos:] = chunk[:first]
+            self._ring[:end - size] = chunk[first:]
+        self._ring_pos = end % size
+        self._ring_filled = min(size, self._ring_filled + len(chunk))
+
+    def _preroll(self) -> np.ndarray:
+        """Ring contents in chronological order"""
+        if self._ring_filled < len(self._ring):
+            return self._ring[:self._ring_filled].copy()
+        return np.concatenate((self._ring[self._ring_pos:], self._ring[:self._ring_pos]))
+
+    def begin(self, pressed_at: Optional[float] = None, buffered: bool = True,
+              on_preroll: Optional[Callable[[bytes], None]] = None) -> PcmBuffer:
+        """
+        Start a capture (pre-roll included) and return its buffer
+
+        Args:
+            pressed_at: time.monotonic() of the hotkey press, used to measure
+                hotkey-to-first-sample latency (defaults to now)
+            buffered: False leaves the audio to on_audio alone (long
+                dictation); the returned buffer then holds only the pre-roll
+            on_preroll: called with the pre-roll PCM before the first live
+                chunk reaches on_audio, so consumers get the audio in order
+        """
+        buffer = PcmBuffer()
+        with self._lock:
+            preroll = self._preroll()
+            if len(preroll):
+                buffer.append(preroll.tobytes())
+                if on_preroll:
+                    on_preroll(preroll.tobytes())
+            self.preroll_seconds = len(preroll) / SAMPLE_RATE
+            self._ring_filled = 0
+            self._ring_pos = 0
+            self.buffer = buffer if buffered else None
+            self.begin_time = pressed_at if pressed_at is not None else time.monotonic()
+            self.first_sample_latency = None
+            self.capturing = True
+        if not self.always_on:
+            self._open()
+        return buffer
+
+    def end(self) -> PcmBuffer:
+        """Finish the current capture and return its buffer"""
+        if not self.always_on:
+            self._close_stream()
+        with self._lock:
+            self.capturing = False
+            buffer, self.buffer = self.buffer, None
+        return buffer
+
+    def close(self):
+        """Stop the stream and release PortAudio"""
+        self._close_stream()
+        if self.pa:
+            self.pa.terminate()
+            self.pa = None
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Batch transcription
+Transcribes a directory or glob of recordings on a pool of worker processes, each with its own
+resident Whisper model, and appends results to a resumable JSONL file
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+from stt_engine import ENGINE_CONFIG_KEYS, SAMPLE_RATE, get_engine, load_audio_file
+
+CONFIG_FILE = Path(__file__).parent / "config.json"
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".ogg", ".opus", ".flac", ".aiff", ".webm", ".mp4"}
+
+# Per-process settings, filled in by the pool initializer
+_worker_config: Dict[str, object] = {}
+
+
+def _init_worker(engine_config: dict, threads: int):
+    """Pool initializer: load the model once per worker process"""
+    _worker_config.update(engine_config)
+    # Keep workers from oversubscribing the CPU between them
+    if _worker_config.get("sttBackend", "whisper") == "whisper":
+        import torch
+
+        torch.set_num_threads(threads)
+    else:
+        # faster-whisper takes its thread count from the config; torch may not even be installed
+        _worker_config["sttThreads"] = threads
+    get_engine(_worker_config).load()
+
+
+def _transcribe_file(path: str) -> dict:
+    """Worker task: decode and transcribe one file"""
+    record = {"file": path, "worker": os.getpid()}
+    try:
+        start = time.monotonic()
+        audio = load_audio_file(path)
+        decoded = time.monotonic()
+        text = get_engine(_worker_config).transcribe(audio)
+        finished = time.monotonic()
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        return record
+
+    audio_seconds = len(audio) / SAMPLE_RATE
+    record.update({
+        "text": text,
+        "audioSeconds": round(audio_seconds, 3),
+        "decodeSeconds": round(decoded - start, 3),
+        "transcribeSeconds": round(finished - decoded, 3),
+        "rtf": round((finished - decoded) / audio_seconds, 4) if audio_seconds else None,
+    })
+    return record
+
+
+def find_audio_files(inputs: Iterable[str], recursive: bool = False) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of audio files"""
+    files = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = path.rglob("*") if recursive else path.iterdir()
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = (Path(p) for p in glob.glob(item, recursive=recursive))
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in AUDIO_EXTENSIONS:
+                files.add(str(candidate.resolve()))
+    return sorted(files)
+
+
+def completed_files(output: Path, retry_errors: bool = False) -> Set[str]:
+    """Files that already have a transcript in the output (for resuming)"""
+    done = set()
+    if not output.exists():
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interruption; the file is redone
+                continue
+            if "error" in record and retry_errors:
+                continue
+            done.add(record.get("file"))
+    return done
+
+
+def main():
+    import argparse
+
+    with open(CONFIG_FILE) as f:
+        config = json.load(f)
+
+    parser = argparse.ArgumentParser(description="Transcribe a batch of recordings with Whisper")
+    parser.add_argument("inputs", nargs="+", help="audio files, directories or glob patterns")
+    parser.add_argument("--output", default="transcripts.jsonl", help="JSONL output, appended to (default: transcripts.jsonl)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="worker processes, each with its own model (default: half the CPUs)")
+    parser.add_argument("--model", default=config.get("whisperModel", "base"))
+    parser.add_argument("--language", default=config.get("language", "uk"))
+    parser.add_argument("--recursive", action="store_true", help="descend into subdirectories")
+    parser.add_argument("--no-resume", action="store_true", help="redo files already in the output")
+    parser.add_argument("--retry-errors", action="store_true", help="redo files that failed last time")
+    args = parser.parse_args()
+
+    files = find_audio_files(args.inputs, args.recursive)
+    if not files:
+        print("❌ No audio files found")
+        return 1
+
+    output = Path(args.output)
+    if args.no_resume and output.exists():
+        output.unlink()
+    done = completed_files(output, args.retry_errors)
+    todo = [f for f in files if f not in done]
+    if done:
+        print(f"⏭️  Resuming: {len(files) - len(todo)} of {len(files)} files already transcribed")
+    if not todo:
+        print("✅ Nothing left to do")
+        return 0
+
+    engine_config = {key: config[key] for key in ENGINE_CONFIG_KEYS if key in config}
+    engine_config.update({"whisperModel": args.model, "language": args.language})
+    workers = max(1, min(args.workers, len(todo)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"🗂️  Transcribing {len(todo)} files with {workers} worker(s) × {threads} thread(s), "
+          f"{engine_config.get('sttBackend', 'whisper')} model {args.model}")
+
+    started = time.monotonic()
+    audio_seconds = 0.0
+    failures = 0
+    with open(output, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(workers, initializer=_init_worker,
+                                initargs=(engine_config, threads)) as pool:
+        futures = {pool.submit(_transcribe_file, path): path for path in todo}
+        try:
+            for count, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                # One complete line per file, flushed, so an interruption loses at most the files in flight
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+                name = Path(record["file"]).name
+                if "error" in record:
+                    failures += 1
+                    print(f"   [{count}/{len(todo)}] ❌ {name}: {record['error']}")
+                    continue
+                audio_seconds += record["audioSeconds"]
+                print(f"   [{count}/{len(todo)}] {name}: {record['audioSeconds']:.1f}s audio in "
+                      f"{record['transcribeSeconds']:.1f}s (RTF {record['rtf'] or 0:.2f})")
+        except BrokenProcessPool:
+            # Usually the initializer failing (Whisper missing, model download failed)
+            print("❌ Worker process failed to start or crashed; check that Whisper loads: "
+                  "python3 test_components.py")
+            return 1
+        except KeyboardInterrupt:
+            print("\n⏸️  Interrupted; run again to resume")
+            pool.shutdown(wait=False, cancel_futures=True)
+            return 130
+
+    wall = time.monotonic() - started
+    print(f"📊 {len(todo) - failures} transcribed, {failures} failed: {audio_seconds:.1f}s of audio "
+          f"in {wall:.1f}s ({audio_seconds / wall:.2f} audio-s per wall-s)")
+    print(f"💾 Transcripts in {output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end latency benchmark
+Replays WAV files through the app's VAD → Whisper → agent → TTS stages with a stand-in
+gateway and a null audio sink, and reports latency percentiles, real-time factors and peak RSS
+"""
+
+import datetime
+import json
+import platform
+import sys
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from audio_capture import PcmBuffer
+from piper_stream import PcmClip
+from stt_engine import SAMPLE_RATE
+from tracing import Trace, peak_rss_mb, percentile, stage_durations
+from tts_engine import Clip, PipelinedSpeaker, create_engine
+
+# Stand-in replies are cut from this text (repeated as needed)
+LOREM = ("The quick brown fox jumps over the lazy dog. Pack my box with five dozen liquor jugs. "
+         "How vexingly quick daft zebras jump! Sphinx of black quartz, judge my vow. ")
+
+
+class FakeGateway:
+    """
+    Stand-in for BackgroundClient
+
+    Replies after ``delay`` seconds with ``reply`` or, if that is None,
+    with ``reply_chars`` characters of filler text, streamed in chunks of
+    ``chunk_chars`` with ``chunk_delay`` seconds between them.
+    """
+
+    def __init__(self, delay: float = 0.5, reply: Optional[str] = None, reply_chars: int = 200,
+                 chunk_chars: int = 20, chunk_delay: float = 0.02):
+        self.delay = delay
+        self.reply = reply
+        self.reply_chars = reply_chars
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.connected = True
+
+    def _text(self) -> str:
+        if self.reply is not None:
+            return self.reply
+        return (LOREM * (self.reply_chars // len(LOREM) + 1))[:self.reply_chars]
+
+    def stream_message(self, text, to=None, channel="telegram", timeout=60, cancel_token=None):
+        self.requests += 1
+        time.sleep(self.delay)
+        reply = self._text()
+        for i in range(0, len(reply), self.chunk_chars):
+            if cancel_token is not None and cancel_token.cancelled:
+                return
+            if i:
+                time.sleep(self.chunk_delay)
+            yield reply[i:i + self.chunk_chars]
+
+    def send_message(self, text, to=None, channel="telegram", timeout=60, connect_timeout=10):
+        return "".join(self.stream_message(text, to, channel, timeout))
+
+    def stop(self):
+        pass
+
+
+class NullClip(Clip):
+    """Synthesized audio that is measured instead of played"""
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__([], path)
+        self.audio_seconds = wav_duration(path) if path and path.endswith(".wav") else None
+
+    def play(self):
+        pass
+
+
+class NullSinkEngine:
+    """
+    TTS engine wrapper that keeps synthesis but discards playback
+
+    With engine=None nothing is synthesized at all, which isolates the
+    STT and agent stages.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.audio_seconds = 0.0
+        self.synth_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.engine.name if self.engine else "null"
+
+    def synthesize(self, text: str) -> Clip:
+        if self.engine is None:
+            return NullClip()
+        start = time.monotonic()
+        clip = self.engine.synthesize(text)
+        if isinstance(clip, PcmClip):
+            # Streamed audio only exists once it has been read out
+            clip.drain()
+        elapsed = time.monotonic() - start
+        null_clip = NullClip(clip.path)
+        if isinstance(clip, PcmClip):
+            null_clip.audio_seconds = clip.audio_seconds
+        with self._lock:
+            self.synth_seconds += elapsed
+            if null_clip.audio_seconds:
+                self.audio_seconds += null_clip.audio_seconds
+        return null_clip
+
+
+def wav_duration(path: str) -> Optional[float]:
+    try:
+        with wave.open(path, "rb") as wf:
+            return wf.getnframes() / wf.getframerate()
+    except (OSError, wave.Error):
+        return None
+
+
+def load_wav(path: Path) -> PcmBuffer:
+    """Read a 16-bit WAV into a capture buffer, downmixed and resampled to 16 kHz"""
+    with wave.open(str(path), "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != SAMPLE_RATE:
+        count = int(len(samples) * SAMPLE_RATE / rate)
+        positions = np.linspace(0, len(samples) - 1, count)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+    buffer = PcmBuffer(seconds=max(1.0, len(samples) / SAMPLE_RATE))
+    buffer.append(samples.tobytes())
+    return buffer
+
+
+def distribution(values: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def run_utterance(app, number: int, path: Path) -> dict:
+    """Push one recording through the app's pipeline stage functions in order"""
+    buffer = load_wav(path)
+    utterance = app.Utterance(number, buffer, buffer.duration, trace=Trace(number))
+    utterance.trace.attributes.update({"file": path.name, "audioSeconds": round(buffer.duration, 3)})
+
+    item = utterance
+    for stage in (app.preprocess_stage, app.stt_stage, app.agent_stage, app.tts_stage):
+        item = stage(item)
+        if item is None:
+            break
+    utterance.trace.add("total", utterance.trace.origin, time.monotonic())
+
+    outcome = "ok" if item is not None else "dropped"
+    return utterance.trace.to_record(outcome)
+
+
+def summarize(records: List[dict], sink: NullSinkEngine) -> dict:
+    stages = {name: distribution(values) for name, values in stage_durations(records).items()}
+
+    rtf = {}
+    whisper_rtf = [r["spans"]["whisper"]["duration"] / r["attributes"]["audioSeconds"]
+                   for r in records if "whisper" in r["spans"] and r["attributes"]["audioSeconds"]]
+    if whisper_rtf:
+        rtf["whisper"] = distribution(whisper_rtf)
+    if sink.audio_seconds:
+        rtf["tts"] = round(sink.synth_seconds / sink.audio_seconds, 4)
+
+    return {"stages": stages, "rtf": rtf}
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> List[str]:
+    """Per-stage p50/p95 changes against a baseline; returns the regressions"""
+    regressions = []
+    print(f"\n📏 Compared with baseline from {baseline.get('meta', {}).get('date', '?')}:")
+    print(f"   {'stage':<24}{'p50':>10}{'Δ':>9}{'p95':>10}{'Δ':>9}")
+    for name, current in sorted(result["stages"].items()):
+        before = baseline.get("stages", {}).get(name)
+        if not before:
+            print(f"   {name:<24}{current['p50']:>10.3f}{'new':>9}{current['p95']:>10.3f}{'':>9}")
+            continue
+        changes = []
+        for key in ("p50", "p95"):
+            change = (current[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            changes.append(change)
+            if change > threshold:
+                regressions.append(f"{name} {key} {before[key]:.3f}s → {current[key]:.3f}s ({change:+.0f}%)")
+        print(f"   {name:<24}{current['p50']:>10.3f}{changes[0]:>+8.0f}%{current['p95']:>10.3f}{changes[1]:>+8.0f}%")
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay WAV files through STT → agent → TTS and measure latency")
+    parser.add_argument("corpus", help="directory of .wav files (or a single file)")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the corpus (default: 1)")
+    parser.add_argument("--gateway-delay", type=float, default=0.5,
+                        help="seconds before the stand-in gateway replies (default: 0.5)")
+    parser.add_argument("--reply", default=None, help="canned reply text")
+    parser.add_argument("--reply-chars", type=int, default=200,
+                        help="length of the generated reply when --reply is not given (default: 200)")
+    parser.add_argument("--tts", choices=["config", "null"], default="config",
+                        help="synthesize with the configured engine, or skip synthesis (default: config)")
+    parser.add_argument("--output", default="./benchmarks/latest.json", help="where to save the results")
+    parser.add_argument("--baseline", default=None, help="results file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="also store the results as the baseline")
+    parser.add_argument("--fail-above", type=float, default=20.0,
+                        help="exit 1 if a stage's p50/p95 regresses by more than this percent (default: 20)")
+    args = parser.parse_args()
+
+    corpus = Path(args.corpus)
+    files = sorted(corpus.glob("*.wav")) if corpus.is_dir() else [corpus]
+    if not files:
+        print(f"❌ No WAV files in {corpus}")
+        return 1
+
+    # The app module holds the pipeline stages; point its transport and speaker at the stand-ins
+    import voice_hotkey as app
+
+    app.CONFIG.update({"gatewayTransport": "websocket", "streamingTranscription": False,
+                       "saveRecordings": False, "tracing": False, "bargeIn": False})
+    gateway = FakeGateway(delay=args.gateway_delay, reply=args.reply, reply_chars=args.reply_chars)
+    app._gateway = gateway
+    sink = NullSinkEngine(create_engine(app.CONFIG) if args.tts == "config" else None)
+    app._speaker = PipelinedSpeaker(sink)
+
+    print(f"🏁 Benchmark: {len(files)} files × {args.repeat}, Whisper {app.CONFIG.get('whisperModel', 'base')}, "
+          f"TTS {sink.name}, gateway delay {args.gateway_delay}s")
+
+    engine = app.get_engine(app.CONFIG)
+    engine.load()
+
+    records = []
+    started = time.monotonic()
+    for _ in range(args.repeat):
+        for path in files:
+            records.append(run_utterance(app, len(records) + 1, path))
+    wall = time.monotonic() - started
+
+    summary = summarize(records, sink)
+    audio_seconds = sum(r["attributes"]["audioSeconds"] for r in records)
+    result = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "corpus": str(corpus),
+            "files": len(files),
+            "repeat": args.repeat,
+            "sttBackend": engine.backend,
+            "whisperModel": engine.model_name,
+            "language": engine.language,
+            "tts": sink.name,
+            "gatewayDelay": args.gateway_delay,
+            "replyChars": len(gateway._text()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "modelLoadSeconds": round(engine.load_time or 0.0, 3),
+        "stt": engine.stats(),
+        "wallSeconds": round(wall, 3),
+        "audioSeconds": round(audio_seconds, 3),
+        "peakRssMB": round(peak_rss_mb(), 1),
+        **summary,
+        "utterances": records,
+    }
+
+    print(f"\n📊 {len(records)} utterances, {audio_seconds:.1f}s of audio in {wall:.1f}s, "
+          f"peak RSS {result['peakRssMB']:.0f} MB")
+    print(f"   {'stage':<24}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, d in sorted(result["stages"].items()):
+        print(f"   {name:<24}{d['n']:>6}{d['p50']:>9.3f}{d['p95']:>9.3f}{d['p99']:>9.3f}{d['max']:>9.3f}")
+    if "whisper" in result["rtf"]:
+        print(f"   Whisper RTF p50 {result['rtf']['whisper']['p50']:.3f}, p95 {result['rtf']['whisper']['p95']:.3f}")
+    if "tts" in result["rtf"]:
+        print(f"   TTS RTF {result['rtf']['tts']:.3f}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"💾 Results saved to {output}")
+
+    baseline_path = Path(args.baseline) if args.baseline else output.parent / "baseline.json"
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+        print(f"💾 Stored as baseline: {baseline_path}")
+    elif baseline_path.exists():
+        regressions = compare(result, json.loads(baseline_path.read_text()), args.fail_above)
+        if regressions:
+            print(f"❌ Regressions over {args.fail_above:.0f}%:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Config file watcher
+Polls config.json and reports which keys changed, so components can be rebuilt without a restart
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+
+
+def changed_keys(old: Dict, new: Dict) -> Set[str]:
+    """Keys added, removed or given a different value"""
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+
+class ConfigWatcher:
+    """
+    Calls ``on_change(new_config, changed_keys)`` after config.json is saved
+
+    The file is polled by mtime and size (editors that save by renaming a
+    temp file are handled too). Invalid JSON is reported and ignored, and
+    the previous config stays in effect. Callbacks run on the watcher
+    thread, one at a time.
+    """
+
+    def __init__(self, path, config: Dict, on_change: Callable[[Dict, Set[str]], None],
+                 interval: float = 1.0):
+        self.path = Path(path)
+        self.config = dict(config)
+        self.on_change = on_change
+        self.interval = interval
+        self.reloads = 0
+        self._stamp = self._read_stamp()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _read_stamp(self):
+        try:
+            stat = self.path.stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            stamp = self._read_stamp()
+            if stamp is None or stamp == self._stamp:
+                continue
+            self._stamp = stamp
+            self.check()
+
+    def check(self):
+        """Reload now; returns the changed keys (empty if none or the file is invalid)"""
+        try:
+            with open(self.path) as f:
+                new = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring {self.path.name} change: {e}")
+            return set()
+
+        keys = changed_keys(self.config, new)
+        if not keys:
+            return keys
+        self.reloads += 1
+        try:
+            self.on_change(new, keys)
+            self.config = new
+        except Exception as e:
+            print(f"❌ Could not apply {self.path.name} change: {e}")
+            import traceback
+            traceback.print_exc()
+        return keys
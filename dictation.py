@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Long-form dictation
+Splits a live audio stream into segments at pauses, transcribes them as they close and appends
+the text to a transcript file; memory stays flat however long the dictation runs
+"""
+
+import datetime
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from stt_engine import SAMPLE_RATE, get_engine
+from tracing import peak_rss_mb
+from vad import FRAME_MS, FRAME_SAMPLES, Endpointer, VoiceActivityDetector, frame_features
+
+CONFIG_FILE = Path(__file__).parent / "config.json"
+
+# Committed text handed to Whisper as context for the next segment
+PROMPT_CHARS = 200
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class DictationSegment:
+    """A stretch of speech between pauses, ready to transcribe"""
+
+    def __init__(self, number: int, start: float, audio: np.ndarray):
+        self.number = number
+        self.start = start
+        self.audio = audio
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / SAMPLE_RATE
+
+
+class Segmenter:
+    """
+    Streaming pause detector that cuts int16 audio into segments
+
+    A segment opens at the first speech frame (with ``padding`` of lead-in)
+    and closes after ``pause_ms`` of non-speech. One that reaches
+    ``max_seconds`` is split at the quietest frame of its last few seconds,
+    so no segment outgrows Whisper's 30 s window. The open segment lives
+    in a preallocated array of ``max_seconds``; nothing else is kept.
+    """
+
+    def __init__(self, detector: VoiceActivityDetector, pause_ms: int = 700, max_seconds: float = 25.0):
+        self.detector = detector
+        # Only its running noise floor is used
+        self.endpointer = Endpointer(detector)
+        self.pause_frames = max(1, pause_ms // FRAME_MS)
+        self.max_frames = max(1, int(max_seconds * 1000) // FRAME_MS)
+        self.lead_frames = detector.padding // FRAME_SAMPLES
+        self.split_search_frames = max(1, min(self.max_frames // 4, 3000 // FRAME_MS))
+
+        self._frames = np.zeros((self.max_frames, FRAME_SAMPLES), dtype=np.int16)
+        self._energy = np.zeros(self.max_frames, dtype=np.float32)
+        self._is_speech = np.zeros(self.max_frames, dtype=bool)
+        self._count = 0
+        self._silent = 0
+        self._start_frame = 0
+        self._lead: deque = deque(maxlen=self.lead_frames)
+        self._pending = np.zeros(0, dtype=np.int16)
+        self.frames_seen = 0
+        self.segments = 0
+
+    @property
+    def seconds_seen(self) -> float:
+        return self.frames_seen * FRAME_MS / 1000.0
+
+    def feed(self, chunk: np.ndarray) -> List[DictationSegment]:
+        """Add int16 samples; return the segments that closed"""
+        samples = np.concatenate((self._pending, chunk)) if len(self._pending) else chunk
+        energy_db, zcr = frame_features(samples)
+        used = len(energy_db) * FRAME_SAMPLES
+        frames = samples[:used].reshape(-1, FRAME_SAMPLES)
+        self._pending = samples[used:].copy()
+
+        closed = []
+        for frame, db, rate in zip(frames, energy_db, zcr):
+            speech = self.endpointer.classify_frame(db, rate)
+            self.frames_seen += 1
+
+            if self._count == 0:
+                if not speech:
+                    self._lead.append((frame.copy(), db))
+                    continue
+                self._start_frame = self.frames_seen - 1 - len(self._lead)
+                for lead, lead_db in self._lead:
+                    self._append(lead, lead_db, False)
+                self._lead.clear()
+
+            self._append(frame, db, speech)
+            self._silent = 0 if speech else self._silent + 1
+
+            if self._silent >= self.pause_frames:
+                segment = self._close(self._count - self._silent + self.lead_frames)
+                if segment:
+                    closed.append(segment)
+            elif self._count == self.max_frames:
+                closed.append(self._split())
+        return closed
+
+    def flush(self) -> Optional[DictationSegment]:
+        """Close the open segment at the end of the stream"""
+        if self._count == 0:
+            return None
+        return self._close(self._count - max(0, self._silent - self.lead_frames))
+
+    def _append(self, frame: np.ndarray, db: float, speech: bool):
+        self._frames[self._count] = frame
+        self._energy[self._count] = db
+        self._is_speech[self._count] = speech
+        self._count += 1
+
+    def _segment(self, end: int) -> DictationSegment:
+        self.segments += 1
+        audio = self._frames[:end].reshape(-1).astype(np.float32) / 32768.0
+        return DictationSegment(self.segments, self._start_frame * FRAME_MS / 1000.0, audio)
+
+    def _close(self, end: int) -> Optional[DictationSegment]:
+        end = min(end, self._count)
+        enough = np.count_nonzero(self._is_speech[:end]) >= self.detector.min_speech_frames
+        segment = self._segment(end) if enough else None
+        # Trailing silence is the lead-in for whatever comes next
+        for index in range(max(end, self._count - self.lead_frames), self._count):
+            self._lead.append((self._frames[index].copy(), self._energy[index]))
+        self._count = 0
+        self._silent = 0
+        return segment
+
+    def _split(self) -> DictationSegment:
+        search_from = self._count - self.split_search_frames
+        cut = search_from + int(np.argmin(self._energy[search_from:self._count]))
+        cut = max(1, cut)
+        segment = self._segment(cut)
+
+        rest = self._count - cut
+        self._frames[:rest] = self._frames[cut:self._count].copy()
+        self._energy[:rest] = self._energy[cut:self._count].copy()
+        self._is_speech[:rest] = self._is_speech[cut:self._count].copy()
+        self._count = rest
+        self._silent = min(self._silent, rest)
+        self._start_frame += cut
+        return segment
+
+
+class AudioSpill:
+    """
+    Compresses the raw audio to a file as it is captured (ffmpeg picks the codec from the extension)
+
+    write() only queues the PCM; a writer thread feeds ffmpeg, so a slow
+    encoder or disk never blocks the audio callback.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.proc = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-y", "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1",
+             "-i", "-", str(path)],
+            stdin=subprocess.PIPE,
+        )
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="dictation-audio", daemon=True)
+        self._thread.start()
+
+    def write(self, pcm: bytes):
+        self._chunks.put(pcm)
+
+    def _run(self):
+        while True:
+            pcm = self._chunks.get()
+            if pcm is None:
+                return
+            try:
+                self.proc.stdin.write(pcm)
+            except OSError as e:
+                print(f"   ⚠️  Audio copy stopped: {e}")
+                return
+
+    def close(self):
+        self._chunks.put(None)
+        self._thread.join()
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.wait()
+
+
+class SpooledSegment:
+    """A segment parked on disk until transcription catches up"""
+
+    def __init__(self, number: int, start: float, path: Path):
+        self.number = number
+        self.start = start
+        self.path = path
+        self.error: Optional[str] = None
+        self.written = threading.Event()
+
+    def load(self) -> DictationSegment:
+        """Read the audio back (waiting for the write if needed) and delete the file"""
+        self.written.wait()
+        if self.error:
+            raise OSError(self.error)
+        audio = np.fromfile(self.path, dtype=np.int16).astype(np.float32) / 32768.0
+        self.path.unlink()
+        return DictationSegment(self.number, self.start, audio)
+
+
+class SegmentSpool:
+    """
+    Writes segments to a directory when too many are waiting in memory
+
+    put() hands the audio to a writer thread and returns at once, so the
+    audio callback never waits for the disk. The directory is created on
+    first use and removed by close() once it is empty.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.spooled = 0
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def put(self, segment: DictationSegment) -> SpooledSegment:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="dictation-spool", daemon=True)
+            self._thread.start()
+        spooled = SpooledSegment(segment.number, segment.start, self.directory / f"{segment.number:06d}.pcm")
+        self._jobs.put((spooled, segment.audio))
+        self.spooled += 1
+        return spooled
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            spooled, audio = job
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                # Back to the captured int16: half the size, and lossless
+                (audio * 32768.0).astype(np.int16).tofile(spooled.path)
+            except OSError as e:
+                spooled.error = str(e)
+            spooled.written.set()
+
+    def close(self):
+        if self._thread:
+            self._jobs.put(None)
+            self._thread.join()
+            self._thread = None
+        try:
+            self.directory.rmdir()
+        except OSError:
+            pass
+
+
+class DictationSession:
+    """
+    One dictation from first to last word
+
+    feed() is called with captured PCM (cheap enough for the audio
+    callback). Closed segments queue for a transcription thread that
+    appends ``[hh:mm:ss] text`` lines to the transcript and flushes each
+    one. At most ``max_pending`` segments wait in memory; if transcription
+    falls further behind, later segments are parked in ``spool`` and
+    transcribed in order once it catches up, so nothing is lost and
+    memory stays bounded.
+    """
+
+    def __init__(self, engine, segmenter: Segmenter, transcript: Path,
+                 spill: Optional[AudioSpill] = None, max_pending: int = 8,
+                 spool: Optional[SegmentSpool] = None):
+        self.engine = engine
+        self.segmenter = segmenter
+        self.transcript = transcript
+        self.spill = spill
+        self.spool = spool or SegmentSpool(transcript.with_suffix(".spool"))
+        # Holds DictationSegments (at most max_pending) and SpooledSegments, in order
+        self.queue: "queue.Queue" = queue.Queue()
+        self.memory_limit = max_pending
+        self.transcribed = 0
+        self.words = 0
+        self.speech_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.max_pending = 0
+        self._in_memory = 0
+        self._prompt = ""
+        self._thread: Optional[threading.Thread] = None
+        self._feed_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+
+    @property
+    def backlogged(self) -> bool:
+        """Whether the next segment would have to go to the spool"""
+        return self._in_memory >= self.memory_limit
+
+    def start(self):
+        self.transcript.parent.mkdir(parents=True, exist_ok=True)
+        self._out = open(self.transcript, "a", encoding="utf-8")
+        self._out.write(f"# Dictation {datetime.datetime.now():%Y-%m-%d %H:%M}\n")
+        self._out.flush()
+        self._thread = threading.Thread(target=self._run, name="dictation", daemon=True)
+        self._thread.start()
+
+    def feed(self, pcm: bytes):
+        """Add captured 16-bit PCM"""
+        with self._feed_lock:
+            if self.spill:
+                self.spill.write(pcm)
+            for segment in self.segmenter.feed(np.frombuffer(pcm, dtype=np.int16)):
+                self._enqueue(segment)
+
+    def _enqueue(self, segment: DictationSegment):
+        with self._count_lock:
+            in_memory = self._in_memory < self.memory_limit
+            if in_memory:
+                self._in_memory += 1
+        if in_memory:
+            self.queue.put(segment)
+        else:
+            print(f"   💾 Transcription is behind, parked segment at {format_timestamp(segment.start)} on disk")
+            self.queue.put(self.spool.put(segment))
+        self.max_pending = max(self.max_pending, self.queue.qsize())
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                if isinstance(item, SpooledSegment):
+                    segment = item.load()
+                else:
+                    segment = item
+                    with self._count_lock:
+                        self._in_memory -= 1
+                start = time.monotonic()
+                parts = self.engine.transcribe_segments(segment.audio, prompt=self._prompt or None)
+                self.decode_seconds += time.monotonic() - start
+            except Exception as e:
+                print(f"   ❌ Segment {item.number} failed: {e}")
+                continue
+            text = " ".join(part[2] for part in parts if part[2]).strip()
+            self.speech_seconds += segment.duration
+            self.transcribed += 1
+            if not text:
+                continue
+            self._prompt = (self._prompt + " " + text)[-PROMPT_CHARS:]
+            self.words += len(text.split())
+            self._out.write(f"[{format_timestamp(segment.start)}] {text}\n")
+            self._out.flush()
+            print(f"   📝 [{format_timestamp(segment.start)}] {text}")
+
+    def finish(self):
+        """Close the last segment, wait for the backlog to be transcribed and close the files"""
+        with self._feed_lock:
+            if self.spill:
+                self.spill.close()
+            last = self.segmenter.flush()
+        if last:
+            self._enqueue(last)
+        self.queue.put(None)
+        self._thread.join()
+        self.spool.close()
+        self._out.close()
+
+    def summary(self) -> str:
+        rtf = self.decode_seconds / self.speech_seconds if self.speech_seconds else 0.0
+        spooled = f", {self.spool.spooled} parked on disk" if self.spool.spooled else ""
+        return (f"📝 Dictation: {format_timestamp(self.segmenter.seconds_seen)} of audio, "
+                f"{self.transcribed} segments ({self.words} words{spooled}), RTF {rtf:.2f}, "
+                f"max {self.max_pending} waiting, peak RSS {peak_rss_mb():.0f} MB")
+
+
+def create_session(config: dict, engine=None) -> DictationSession:
+    """Build a dictation session from config (transcript and optional audio under dictationDir)"""
+    directory = Path(config.get("dictationDir", "./dictation"))
+    stem = f"dictation_{datetime.datetime.now():%Y%m%d_%H%M%S}"
+    detector = VoiceActivityDetector(
+        threshold_db=config.get("vadThresholdDb", 10.0),
+        padding_ms=config.get("vadPaddingMs", 200),
+        min_speech_ms=config.get("vadMinSpeechMs", 250),
+    )
+    segmenter = Segmenter(detector, config.get("dictationPauseMs", 700),
+                          config.get("dictationMaxSegmentSeconds", 25.0))
+    spill = None
+    if config.get("dictationSaveAudio", False):
+        directory.mkdir(parents=True, exist_ok=True)
+        spill = AudioSpill(directory / f"{stem}.{config.get('dictationAudioFormat', 'flac')}")
+    return DictationSession(engine or get_engine(config), segmenter, directory / f"{stem}.txt",
+                            spill, config.get("dictationMaxPendingSegments", 8))
+
+
+def stream_file(path: str, chunk_samples: int = 16000):
+    """Yield int16 PCM bytes of an audio file, decoded by ffmpeg a chunk at a time"""
+    proc = subprocess.Popen(
+        ["ffmpeg", "-loglevel", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        while True:
+            pcm = proc.stdout.read(chunk_samples * 2)
+            if not pcm:
+                break
+            yield pcm[:len(pcm) // 2 * 2]
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+def main():
+    import argparse
+
+    with open(CONFIG_FILE) as f:
+        config = json.load(f)
+
+    parser = argparse.ArgumentParser(description="Dictate into a transcript file, segment by segment")
+    parser.add_argument("--file", help="transcribe a recording instead of the microphone")
+    parser.add_argument("--save-audio", action="store_true", help="also keep the audio (compressed)")
+    args = parser.parse_args()
+    if args.save_audio:
+        config["dictationSaveAudio"] = True
+
+    engine = get_engine(config)
+    engine.load()
+    session = create_session(config, engine)
+    session.start()
+    print(f"📝 Writing to {session.transcript}")
+
+    if args.file:
+        for pcm in stream_file(args.file):
+            session.feed(pcm)
+            # Offline input can outrun the decoder; wait instead of spooling to disk
+            while session.backlogged:
+                time.sleep(0.05)
+    else:
+        from audio_capture import AudioEngine
+
+        audio = AudioEngine(config.get("inputDevice"), preroll_ms=0, always_on=False,
+                            on_audio=lambda pcm, status: session.feed(pcm))
+        audio.start()
+        audio.begin(buffered=False)
+        print("🎤 Dictating... press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print()
+        finally:
+            audio.end()
+            audio.close()
+
+    print("⏳ Transcribing the last segment...")
+    session.finish()
+    print(session.summary())
+    print(f"💾 Transcript in {session.transcript}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
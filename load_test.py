@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Gateway load generator
+Runs many concurrent OpenClawClient.send_message calls and reports throughput, tail latency
+and pending_requests growth
+"""
+
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+from openclaw_client import OpenClawClient
+from tracing import percentile
+
+
+async def run_level(clients: List[OpenClawClient], concurrency: int, requests: int,
+                    timeout: float, sample_interval: float = 0.01) -> Dict[str, float]:
+    """
+    Send ``requests`` messages with at most ``concurrency`` in flight,
+    spread round-robin over ``clients``
+    """
+    latencies: List[float] = []
+    failures = 0
+    pending_samples: List[int] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int):
+        nonlocal failures
+        async with semaphore:
+            client = clients[index % len(clients)]
+            start = time.monotonic()
+            reply = await client.send_message(f"load test message {index}", timeout=timeout)
+            if reply is None:
+                failures += 1
+            else:
+                latencies.append(time.monotonic() - start)
+
+    async def sample():
+        while True:
+            pending_samples.append(sum(len(c.pending_requests) for c in clients))
+            await asyncio.sleep(sample_interval)
+
+    sampler = asyncio.ensure_future(sample())
+    started = time.monotonic()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.monotonic() - started
+    sampler.cancel()
+
+    result = {
+        "concurrency": concurrency,
+        "connections": len(clients),
+        "requests": requests,
+        "ok": len(latencies),
+        "failed": failures,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "maxPending": max(pending_samples, default=0),
+        "meanPending": round(sum(pending_samples) / len(pending_samples), 1) if pending_samples else 0.0,
+    }
+    if latencies:
+        result.update({f"p{p}": round(percentile(latencies, p), 4) for p in (50, 95, 99)})
+        result["max"] = round(max(latencies), 4)
+    return result
+
+
+async def load_test(url: str, token: Optional[str], levels: List[int], requests: int,
+                    connections: int, timeout: float, mock_options: Optional[dict]) -> List[Dict[str, float]]:
+    gateway = None
+    if mock_options is not None:
+        from mock_gateway import MockGateway
+        gateway = MockGateway(port=0, token=token, **mock_options)
+        await gateway.start()
+        url = gateway.url
+
+    clients = []
+    try:
+        for _ in range(connections):
+            client = OpenClawClient(url, token)
+            if not await client.connect():
+                print(f"❌ Could not connect to {url}")
+                return []
+            clients.append(client)
+
+        results = []
+        for concurrency in levels:
+            result = await run_level(clients, concurrency, requests, timeout)
+            results.append(result)
+            print(f"   c={concurrency:<5} {result['rps']:>8.1f} req/s  "
+                  f"p50 {result.get('p50', 0):.3f}s  p95 {result.get('p95', 0):.3f}s  "
+                  f"p99 {result.get('p99', 0):.3f}s  failed {result['failed']}  "
+                  f"pending max {result['maxPending']} mean {result['meanPending']}")
+        if gateway:
+            print(f"   🧪 Mock gateway: {gateway.stats()}")
+        return results
+    finally:
+        for client in clients:
+            await client.disconnect()
+        if gateway:
+            await gateway.stop()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Concurrent send_message load against a gateway")
+    parser.add_argument("--url", default="ws://127.0.0.1:18789", help="gateway to load (ignored with --mock)")
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--mock", action="store_true", help="start an in-process mock gateway and load that")
+    parser.add_argument("--concurrency", default="1,8,32,128",
+                        help="comma-separated in-flight limits to step through (default: 1,8,32,128)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level (default: 200)")
+    parser.add_argument("--connections", type=int, default=1, help="client connections to spread load over (default: 1)")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds (default: 30)")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock: seconds per run (default: 0.2)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="mock: ± seconds of jitter (default: 0.05)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock: fraction of error replies")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="mock: fraction of runs never answered")
+    parser.add_argument("--output", default=None, help="save results as JSON")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    mock_options = None
+    if args.mock:
+        mock_options = {"latency": args.latency, "jitter": args.jitter,
+                        "error_rate": args.error_rate, "drop_rate": args.drop_rate}
+
+    print(f"🚦 Load test: {args.requests} requests per level over {args.connections} connection(s)")
+    results = asyncio.run(load_test(args.url, args.token, levels, args.requests, args.connections,
+                                    args.timeout, mock_options))
+    if args.output and results:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Mock OpenClaw Gateway
+Local stand-in that speaks the gateway WebSocket protocol, with configurable latency, jitter and errors
+"""
+
+import asyncio
+import json
+import random
+import uuid
+from typing import Any, Dict, Optional
+
+import websockets
+
+REPLY_TEXT = ("Sure. Here is a short answer from the mock gateway. It streams a few sentences "
+              "so clients can be tested with realistic deltas. ")
+
+
+class MockGateway:
+    """
+    In-process gateway for tests and load generation
+
+    Each connection gets a ``connect.challenge`` event, must send a
+    ``connect`` request (checked against ``token`` if one is set) and can
+    then send ``agent.run`` requests, which are answered concurrently: an
+    "accepted" acknowledgement, ``agent`` delta events and a final ``res``.
+    ``chat.abort`` with a runId (or the request id) stops a run.
+
+    Latency per request is ``latency`` plus uniform jitter of ±``jitter``
+    seconds. ``error_rate`` of requests get an error response and
+    ``drop_rate`` are never answered (the client should time out).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 18790, token: Optional[str] = None,
+                 latency: float = 0.2, jitter: float = 0.05, error_rate: float = 0.0,
+                 drop_rate: float = 0.0, reply_chars: int = 120, chunk_chars: int = 24,
+                 seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.reply_chars = reply_chars
+        self.chunk_chars = chunk_chars
+        self.random = random.Random(seed)
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.dropped = 0
+        self.aborted = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle_connection, self.host, self.port)
+        if self.port == 0:
+            # Ephemeral port: report the one the OS picked
+            self.port = next(iter(self._server.sockets)).getsockname()[1]
+        print(f"🧪 Mock gateway listening on {self.url}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _reply(self) -> str:
+        return (REPLY_TEXT * (self.reply_chars // len(REPLY_TEXT) + 1))[:self.reply_chars]
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    async def _send(self, ws, frame: Dict[str, Any]):
+        try:
+            await ws.send(json.dumps(frame))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _handle_connection(self, ws, *args):
+        self.connections += 1
+        authenticated = False
+        tasks = set()
+        # runId and request id -> the task answering it, for chat.abort
+        runs: Dict[str, asyncio.Future] = {}
+
+        def forget(keys):
+            for key in keys:
+                runs.pop(key, None)
+
+        await self._send(ws, {"type": "event", "event": "connect.challenge",
+                              "payload": {"nonce": uuid.uuid4().hex}})
+        try:
+            async for message in ws:
+                try:
+                    frame = json.loads(message)
+                except ValueError:
+                    continue
+                if frame.get("type") != "req":
+                    continue
+                method = frame.get("method")
+                request_id = frame.get("id")
+
+                if method == "connect":
+                    params = frame.get("params") or {}
+                    if self.token and (params.get("auth") or {}).get("token") != self.token:
+                        await self._send(ws, {"type": "res", "id": request_id, "ok": False,
+                                              "error": {"code": "unauthorized", "message": "Invalid token"}})
+                        continue
+                    authenticated = True
+                    await self._send(ws, {"type": "res", "id": request_id, "ok": True,
+                                          "payload": {"protocol": 3}})
+                elif not authenticated:
+                    await self._send(ws, {"type": "res", "id": request_id, "ok": False,
+                                          "error": {"code": "unauthenticated", "message": "connect first"}})
+                elif method == "agent.run":
+                    # Answer concurrently so slow runs don't serialize the socket
+                    run_id = uuid.uuid4().hex
+                    task = asyncio.ensure_future(self._agent_run(ws, request_id, run_id, frame.get("params") or {}))
+                    tasks.add(task)
+                    runs[run_id] = runs[request_id] = task
+                    task.add_done_callback(tasks.discard)
+                    task.add_done_callback(lambda _, keys=(run_id, request_id): forget(keys))
+                elif method == "chat.abort":
+                    task = runs.get((frame.get("params") or {}).get("runId"))
+                    if task:
+                        task.cancel()
+                        self.aborted += 1
+                    await self._send(ws, {"type": "res", "id": request_id, "ok": True,
+                                          "payload": {"aborted": task is not None}})
+                else:
+                    await self._send(ws, {"type": "res", "id": request_id, "ok": False,
+                                          "error": {"code": "unknown_method", "message": f"Unknown method: {method}"}})
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _agent_run(self, ws, request_id: str, run_id: str, params: Dict[str, Any]):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await self._send(ws, {"type": "res", "id": request_id, "ok": True,
+                                  "payload": {"status": "accepted", "runId": run_id}})
+
+            roll = self.random.random()
+            if roll < self.drop_rate:
+                self.dropped += 1
+                return
+            delay = self._delay()
+            if roll < self.drop_rate + self.error_rate:
+                await asyncio.sleep(delay)
+                self.errors += 1
+                await self._send(ws, {"type": "res", "id": request_id, "ok": False,
+                                      "error": {"code": "agent_error", "message": "Mock agent error"}})
+                return
+
+            # Spread the latency over the deltas: first token after half of it
+            reply = self._reply()
+            chunks = [reply[i:i + self.chunk_chars] for i in range(0, len(reply), self.chunk_chars)]
+            await asyncio.sleep(delay / 2)
+            step = delay / 2 / max(1, len(chunks))
+            for chunk in chunks:
+                await self._send(ws, {"type": "event", "event": "agent",
+                                      "payload": {"runId": run_id, "stream": "assistant",
+                                                  "data": {"delta": chunk}}})
+                await asyncio.sleep(step)
+            await self._send(ws, {"type": "res", "id": request_id, "ok": True,
+                                  "payload": {"runId": run_id, "reply": reply,
+                                              "echo": params.get("message", "")}})
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connections": self.connections,
+            "requests": self.requests,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "aborted": self.aborted,
+            "maxInFlight": self.max_in_flight,
+        }
+
+
+async def serve_forever(gateway: MockGateway):
+    await gateway.start()
+    try:
+        await asyncio.Future()
+    finally:
+        await gateway.stop()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local mock OpenClaw gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18790)
+    parser.add_argument("--token", default=None, help="require this auth token")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per agent.run (default: 0.2)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="± seconds of uniform jitter (default: 0.05)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of runs answered with an error")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of runs never answered")
+    parser.add_argument("--reply-chars", type=int, default=120, help="reply length (default: 120)")
+    args = parser.parse_args()
+
+    gateway = MockGateway(args.host, args.port, args.token, args.latency, args.jitter,
+                          args.error_rate, args.drop_rate, args.reply_chars)
+    try:
+        asyncio.run(serve_forever(gateway))
+    except KeyboardInterrupt:
+        print(f"\n👋 {gateway.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,28 +5,126 @@ Handles connection, authentication, and agent messaging
 
 import json
 import asyncio
+import queue
+import random
+import threading
+import time
 import websockets
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Iterator, List, Tuple
 import uuid
 
+# Gateway method that stops a run in progress
+ABORT_METHOD = "chat.abort"
+
+
+class AgentError(Exception):
+    """The gateway answered the agent request with an error"""
+
+
+class Subscription:
+    """
+    Bounded queue of gateway events for one subscriber
+    
+    Usable as an async iterator. The message reader never waits for a
+    subscriber: when the queue is full the new event is dropped, or with
+    drop_oldest the oldest queued one, and ``dropped`` counts them (maxsize=0
+    never drops). Events arriving after close() are dropped. If match is
+    given, only events it returns true for are queued.
+    """
+    
+    def __init__(self, client: "OpenClawClient", event_name: str,
+                 maxsize: int = 100, drop_oldest: bool = False,
+                 match: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.client = client
+        self.event_name = event_name
+        self.drop_oldest = drop_oldest
+        self.match = match
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.closed = False
+    
+    def _offer(self, data: Dict[str, Any]):
+        """Queue an event without waiting; a slow subscriber loses events instead of stalling the reader"""
+        if self.closed:
+            return
+        if self.queue.full():
+            self.dropped += 1
+            if not self.drop_oldest:
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait(data)
+    
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event, or None on timeout or after close()"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+    
+    def get_nowait(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+    
+    def close(self):
+        """Stop receiving events and wake any waiting iterator"""
+        self.closed = True
+        self.client._unsubscribe(self)
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> Dict[str, Any]:
+        data = await self.queue.get()
+        if data is None:
+            raise StopAsyncIteration
+        return data
+
 
 class OpenClawClient:
     """WebSocket client for OpenClaw Gateway"""
     
-    def __init__(self, url: str = "ws://127.0.0.1:18789", token: Optional[str] = None):
+    def __init__(self, url: str = "ws://127.0.0.1:18789", token: Optional[str] = None,
+                 ping_interval: float = 20):
         self.url = url
         self.token = token
+        self.ping_interval = ping_interval
         self.ws = None
         self.connected = False
+        self.closed: Optional[asyncio.Event] = None
         self.pending_requests = {}
+        # request id -> runId from an "accepted" acknowledgement
+        self.run_ids: Dict[str, str] = {}
+        # stream_message() calls in progress
+        self.active_streams = 0
+        self.subscribers: Dict[str, List[Subscription]] = {}
+        self.callbacks: Dict[str, List[Callable]] = {}
+        self.unhandled_events = 0
+        self._reader_task = None
         
     async def connect(self):
         """Connect and authenticate with the gateway"""
         try:
-            self.ws = await websockets.connect(self.url)
+            # WebSocket pings double as the heartbeat that keeps idle connections alive
+            self.ws = await websockets.connect(
+                self.url,
+                ping_interval=self.ping_interval,
+                ping_timeout=self.ping_interval,
+            )
+            self.closed = asyncio.Event()
             
             # Start message handler
-            asyncio.create_task(self._handle_messages())
+            self._reader_task = asyncio.create_task(self._handle_messages())
             
             # Wait for connect.challenge
             challenge = await self._wait_for_event("connect.challenge")
@@ -62,10 +160,12 @@ class OpenClawClient:
                 return True
             else:
                 print(f"❌ Connection failed: {response.get('error')}")
+                await self.disconnect()
                 return False
                 
         except Exception as e:
             print(f"❌ Connection error: {e}")
+            await self.disconnect()
             return False
     
     async def disconnect(self):
@@ -75,7 +175,7 @@ class OpenClawClient:
             self.connected = False
     
     async def send_message(self, text: str, to: Optional[str] = None, 
-                          channel: str = "telegram") -> Optional[str]:
+                          channel: str = "telegram", timeout: int = 60) -> Optional[str]:
         """
         Send a message to the agent and get response
         
@@ -83,6 +183,7 @@ class OpenClawClient:
             text: Message text
             to: Target user ID (optional, uses main session if not provided)
             channel: Channel name (telegram, whatsapp, etc.)
+            timeout: Seconds to wait for the agent reply
             
         Returns:
             Agent response text or None
@@ -102,7 +203,7 @@ class OpenClawClient:
                 params["to"] = to
             
             # Send request and wait for response
-            response = await self._request("agent.run", params, timeout=60)
+            response = await self._request("agent.run", params, timeout=timeout)
             
             if response.get("ok"):
                 payload = response.get("payload", {})
@@ -120,10 +221,191 @@ class OpenClawClient:
             print(f"❌ Error sending message: {e}")
             return None
     
-    async def _request(self, method: str, params: Dict[str, Any], 
-                      timeout: int = 30) -> Dict[str, Any]:
-        """Send a request and wait for response"""
+    async def stream_message(self, text: str, to: Optional[str] = None,
+                             channel: str = "telegram", timeout: int = 60) -> AsyncIterator[str]:
+        """
+        Send a message to the agent and yield reply text as it is generated
+        
+        Deltas come from "agent" events on the assistant stream for this
+        run. If the gateway emits none, the final reply is yielded whole.
+        A reply that does not complete raises instead of just ending, so a
+        partial reply is never mistaken for a whole one. A run abandoned
+        before its final response (timeout, task cancelled) is aborted on
+        the gateway with ``chat.abort``.
+        
+        Args:
+            text: Message text
+            to: Target user ID (optional, uses main session if not provided)
+            channel: Channel name (telegram, whatsapp, etc.)
+            timeout: Seconds to wait for the complete reply
+        
+        Raises:
+            ConnectionError: not connected, or the connection dropped mid-reply
+            TimeoutError: the reply did not complete within timeout
+            AgentError: the gateway returned an error
+        """
+        if not self.connected:
+            raise ConnectionError("Not connected to gateway")
+        
+        params = {
+            "message": text,
+            "channel": channel
+        }
+        if to:
+            params["to"] = to
+        
         request_id = str(uuid.uuid4())
+        self.active_streams += 1
+        try:
+            # Unbounded: this is the one consumer that must not lose deltas, and it reads until the reply ends
+            with self.subscribe("agent", maxsize=0,
+                                match=lambda event: self._is_for_request(request_id, event)) as events:
+                _, future = await self._send_request("agent.run", params, request_id)
+                deadline = time.monotonic() + timeout
+                streamed = ""
+                
+                try:
+                    while True:
+                        if future.done():
+                            # Deltas queued before the final response still belong to it
+                            event = events.get_nowait()
+                            if event is None:
+                                break
+                        else:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                raise TimeoutError("Gateway stream timeout")
+                            next_event = asyncio.ensure_future(events.get())
+                            await asyncio.wait({next_event, future}, timeout=remaining,
+                                               return_when=asyncio.FIRST_COMPLETED)
+                            if not next_event.done():
+                                next_event.cancel()
+                                continue
+                            event = next_event.result()
+                            if event is None:
+                                continue
+                        
+                        delta = self._reply_delta(request_id, event, streamed)
+                        if delta:
+                            streamed += delta
+                            yield delta
+                
+                    response = future.result()
+                finally:
+                    if not future.done() and self.connected:
+                        # Abandoned (cancelled or timed out): stop the run on the gateway as well
+                        asyncio.ensure_future(self.abort_run(self.run_ids.get(request_id) or request_id))
+                    self.pending_requests.pop(request_id, None)
+                    self.run_ids.pop(request_id, None)
+        finally:
+            self.active_streams -= 1
+        
+        if not response.get("ok"):
+            error = response.get("error", {})
+            raise AgentError(error.get("message", "Unknown error"))
+        
+        reply = response.get("payload", {}).get("reply", "")
+        if reply.startswith(streamed) and len(reply) > len(streamed):
+            yield reply[len(streamed):]
+    
+    async def abort_run(self, run_id: str, timeout: float = 5) -> bool:
+        """Ask the gateway to stop a run (best effort); True if it confirmed"""
+        try:
+            response = await self._request(ABORT_METHOD, {"runId": run_id}, timeout=timeout)
+        except Exception:
+            return False
+        return bool(response.get("ok"))
+    
+    def _is_for_request(self, request_id: str, event: Dict[str, Any]) -> bool:
+        """
+        Whether an agent event belongs to this request's run
+
+        An event without a runId is only attributable when a single stream
+        is active; with several, it is dropped rather than mixed into all.
+        """
+        run_id = (event.get("payload") or {}).get("runId")
+        if run_id is None:
+            return self.active_streams == 1
+        return run_id in (request_id, self.run_ids.get(request_id))
+    
+    def _reply_delta(self, request_id: str, event: Dict[str, Any], streamed: str) -> str:
+        """Extract new assistant text for this request from an agent event"""
+        payload = event.get("payload") or {}
+        if not self._is_for_request(request_id, event):
+            return ""
+        if payload.get("stream", "assistant") != "assistant":
+            return ""
+        
+        data = payload.get("data") or {}
+        if data.get("delta"):
+            return data["delta"]
+        # Some events carry the cumulative text instead of a delta
+        text = data.get("text") or ""
+        if text.startswith(streamed):
+            return text[len(streamed):]
+        return ""
+    
+    def subscribe(self, event_name: str, maxsize: int = 100, drop_oldest: bool = False,
+                  match: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Subscription:
+        """
+        Subscribe to a gateway event ("*" for all events)
+        
+        match, if given, filters the events further. Returns a Subscription
+        to iterate over; close it when done.
+        """
+        sub = Subscription(self, event_name, maxsize, drop_oldest, match)
+        self.subscribers.setdefault(event_name, []).append(sub)
+        return sub
+    
+    def _unsubscribe(self, sub: Subscription):
+        subs = self.subscribers.get(sub.event_name, [])
+        if sub in subs:
+            subs.remove(sub)
+    
+    def on(self, event_name: str, callback: Callable[[Dict[str, Any]], Any]) -> Callable[[], None]:
+        """
+        Call callback for every matching event ("*" for all events)
+        
+        Coroutine callbacks are scheduled as tasks. Returns a function that
+        removes the callback.
+        """
+        self.callbacks.setdefault(event_name, []).append(callback)
+        
+        def remove():
+            callbacks = self.callbacks.get(event_name, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+        
+        return remove
+    
+    async def _dispatch_event(self, data: Dict[str, Any]):
+        """Deliver an event to callbacks and subscribers"""
+        event_name = data.get("event")
+        handled = False
+        
+        for key in (event_name, "*"):
+            for callback in list(self.callbacks.get(key, ())):
+                handled = True
+                try:
+                    result = callback(data)
+                    if asyncio.iscoroutine(result):
+                        asyncio.ensure_future(result)
+                except Exception as e:
+                    print(f"⚠️  Event callback error ({event_name}): {e}")
+            
+            for sub in list(self.subscribers.get(key, ())):
+                if sub.match is not None and not sub.match(data):
+                    continue
+                handled = True
+                sub._offer(data)
+        
+        if not handled:
+            self.unhandled_events += 1
+    
+    async def _send_request(self, method: str, params: Dict[str, Any],
+                            request_id: Optional[str] = None) -> Tuple[str, asyncio.Future]:
+        """Send a request and return its id and the future for its response"""
+        request_id = request_id or str(uuid.uuid4())
         
         request = {
             "type": "req",
@@ -137,7 +419,18 @@ class OpenClawClient:
         self.pending_requests[request_id] = future
         
         # Send request
-        await self.ws.send(json.dumps(request))
+        try:
+            await self.ws.send(json.dumps(request))
+        except Exception:
+            self.pending_requests.pop(request_id, None)
+            raise
+        
+        return request_id, future
+    
+    async def _request(self, method: str, params: Dict[str, Any], 
+                      timeout: int = 30) -> Dict[str, Any]:
+        """Send a request and wait for response"""
+        request_id, future = await self._send_request(method, params)
         
         # Wait for response with timeout
         try:
@@ -146,18 +439,12 @@ class OpenClawClient:
         finally:
             # Clean up
             self.pending_requests.pop(request_id, None)
+            self.run_ids.pop(request_id, None)
     
     async def _wait_for_event(self, event_name: str, timeout: int = 10) -> Optional[Dict[str, Any]]:
         """Wait for a specific event"""
-        future = asyncio.Future()
-        self.pending_requests[f"event:{event_name}"] = future
-        
-        try:
-            return await asyncio.wait_for(future, timeout=timeout)
-        except asyncio.TimeoutError:
-            return None
-        finally:
-            self.pending_requests.pop(f"event:{event_name}", None)
+        with self.subscribe(event_name, maxsize=1, drop_oldest=True) as sub:
+            return await sub.get(timeout)
     
     async def _handle_messages(self):
         """Handle incoming messages"""
@@ -169,6 +456,11 @@ class OpenClawClient:
                 if msg_type == "res":
                     # Response to a request
                     request_id = data.get("id")
+                    payload = data.get("payload") or {}
+                    if payload.get("status") == "accepted":
+                        # Long-running run acknowledged; the final res follows
+                        self.run_ids[request_id] = payload.get("runId")
+                        continue
                     if request_id in self.pending_requests:
                         future = self.pending_requests[request_id]
                         if not future.done():
@@ -176,19 +468,155 @@ class OpenClawClient:
                 
                 elif msg_type == "event":
                     # Event notification
-                    event_name = data.get("event")
-                    event_key = f"event:{event_name}"
-                    if event_key in self.pending_requests:
-                        future = self.pending_requests[event_key]
-                        if not future.done():
-                            future.set_result(data)
+                    await self._dispatch_event(data)
         
         except websockets.exceptions.ConnectionClosed:
             print("🔌 Connection closed")
-            self.connected = False
         except Exception as e:
             print(f"❌ Message handler error: {e}")
+        finally:
             self.connected = False
+            # Nothing will answer outstanding requests on this socket any more
+            for future in self.pending_requests.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Gateway connection closed"))
+            self.closed.set()
+
+
+class BackgroundClient:
+    """
+    OpenClawClient kept connected on its own event-loop thread
+    
+    The connect challenge/handshake runs at start-up and, after a drop, in
+    the background with exponential backoff, so callers on other threads
+    only wait for the agent.run round trip.
+    """
+    
+    def __init__(self, url: str = "ws://127.0.0.1:18789", token: Optional[str] = None,
+                 min_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.client = OpenClawClient(url, token)
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.reconnects = 0
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="openclaw-gateway", daemon=True)
+        self._connected: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._supervisor = None
+    
+    def start(self):
+        """Start the loop thread and begin connecting"""
+        self._thread.start()
+        self._supervisor = asyncio.run_coroutine_threadsafe(self._supervise(), self.loop)
+    
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    async def _supervise(self):
+        """Keep the connection up, reconnecting with backoff"""
+        self._connected = asyncio.Event()
+        backoff = self.min_backoff
+        
+        while not self._stopping:
+            if await self.client.connect():
+                backoff = self.min_backoff
+                self._connected.set()
+                await self.client.closed.wait()
+                self._connected.clear()
+                if self._stopping:
+                    break
+                self.reconnects += 1
+                print("🔌 Gateway connection lost, reconnecting...")
+            else:
+                delay = backoff * random.uniform(0.5, 1.0)
+                print(f"   Retrying gateway connection in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+    
+    @property
+    def connected(self) -> bool:
+        return self.client.connected
+    
+    def wait_connected(self, timeout: float) -> bool:
+        """Block until the handshake has completed (True) or timeout passes (False)"""
+        deadline = time.monotonic() + timeout
+        while not self.client.connected:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+    
+    def send_message(self, text: str, to: Optional[str] = None, channel: str = "telegram",
+                     timeout: int = 60, connect_timeout: float = 5) -> Optional[str]:
+        """
+        Send a message from any thread and block until the reply arrives
+        
+        Waits up to connect_timeout for a reconnect in progress before giving up.
+        """
+        async def run():
+            try:
+                await asyncio.wait_for(self._connected.wait(), connect_timeout)
+            except asyncio.TimeoutError:
+                print("❌ Not connected to gateway")
+                return None
+            return await self.client.send_message(text, to, channel, timeout=timeout)
+        
+        future = asyncio.run_coroutine_threadsafe(run(), self.loop)
+        return future.result(timeout + connect_timeout + 1)
+    
+    def stream_message(self, text: str, to: Optional[str] = None, channel: str = "telegram",
+                       timeout: int = 60, connect_timeout: float = 5,
+                       cancel_token=None) -> Iterator[str]:
+        """
+        Like send_message, but yield reply deltas on the calling thread as they arrive
+        
+        If cancel_token (a pipeline.CancelToken) is cancelled, the run is
+        aborted on the gateway and concurrent.futures.CancelledError is raised. A reply
+        that does not complete raises after the deltas received so far
+        (see OpenClawClient.stream_message).
+        """
+        deltas: queue.Queue = queue.Queue()
+        
+        async def run():
+            try:
+                await asyncio.wait_for(self._connected.wait(), connect_timeout)
+            except asyncio.TimeoutError:
+                raise ConnectionError("Not connected to gateway")
+            try:
+                async for delta in self.client.stream_message(text, to, channel, timeout=timeout):
+                    deltas.put(delta)
+            finally:
+                deltas.put(None)
+        
+        future = asyncio.run_coroutine_threadsafe(run(), self.loop)
+        if cancel_token is not None:
+            cancel_token.add_callback(future.cancel)
+        deadline = time.monotonic() + timeout + connect_timeout + 1
+        
+        while True:
+            try:
+                # Short polls so a cancel before run() even started is noticed
+                delta = deltas.get(timeout=0.05)
+            except queue.Empty:
+                if future.done() and deltas.empty():
+                    break
+                if time.monotonic() > deadline:
+                    future.cancel()
+                    raise TimeoutError("Gateway stream timeout")
+                continue
+            if delta is None:
+                break
+            yield delta
+        
+        future.result()
+    
+    def stop(self):
+        """Disconnect and stop the loop thread"""
+        self._stopping = True
+        asyncio.run_coroutine_threadsafe(self.client.disconnect(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
 
 
 async def test_client():
@@ -0,0 +1,191 @@
+"""
+Staged worker pipeline
+Each stage has its own queue and worker thread, so a slow stage never blocks the hotkey
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+_STOP = object()
+
+
+class CancelToken:
+    """Cancellation flag shared by everything working on one item"""
+
+    def __init__(self):
+        self.cancelled = False
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Run callback on cancel (immediately if already cancelled)"""
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self) -> bool:
+        """Cancel; returns False if it was already cancelled"""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️  Cancel callback error: {e}")
+        return True
+
+
+class Stage:
+    """
+    One pipeline step running on its own worker thread
+
+    ``func`` receives an item and returns the item for the next stage, or
+    None to drop it (e.g. no speech detected). With a single worker, items
+    leave a stage in the order they entered it. Items whose ``cancel_token``
+    has been cancelled are dropped without being processed.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], maxsize: int = 0):
+        self.name = name
+        self.func = func
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.next: Optional["Stage"] = None
+        self.busy_time = 0.0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.current: Any = None
+        # Called with every item that leaves the pipeline at this stage
+        self.on_done: Optional[Callable[[Any], None]] = None
+        self._thread = threading.Thread(target=self._run, name=f"stage-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                if self.next:
+                    self.next.queue.put(_STOP)
+                return
+
+            if _is_cancelled(item):
+                self.cancelled += 1
+                self._finished(item)
+                continue
+
+            self.current = item
+            start = time.monotonic()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                print(f"❌ {self.name} stage error: {e}")
+                import traceback
+                traceback.print_exc()
+                result = None
+                self.errors += 1
+            self.busy_time += time.monotonic() - start
+            self.processed += 1
+
+            if result is None:
+                self.dropped += 1
+                self._finished(item)
+            elif self.next:
+                self.next.queue.put(result)
+            else:
+                self._finished(result)
+            # Cleared only after hand-off so cancel_from() never misses the item
+            self.current = None
+
+    def _finished(self, item: Any):
+        if self.on_done:
+            try:
+                self.on_done(item)
+            except Exception as e:
+                print(f"⚠️  {self.name} stage on_done error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "active": self.current is not None,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "busy": round(self.busy_time, 3),
+        }
+
+
+def _is_cancelled(item: Any) -> bool:
+    token = getattr(item, "cancel_token", None)
+    return token is not None and token.cancelled
+
+
+class Pipeline:
+    """
+    Chain of stages fed from the hotkey thread
+
+    ``on_done``, if given, is called once per item when it leaves the
+    pipeline: completed, dropped, failed or cancelled.
+    """
+
+    def __init__(self, stages: List[Stage], on_done: Optional[Callable[[Any], None]] = None):
+        self.stages = stages
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+        for stage in stages:
+            stage.on_done = on_done
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, item: Any):
+        """Queue an item at the first stage; returns immediately"""
+        self.stages[0].queue.put(item)
+
+    def stop(self, timeout: float = 5.0):
+        """Let queued work drain, then stop the workers"""
+        self.stages[0].queue.put(_STOP)
+        for stage in self.stages:
+            stage._thread.join(timeout)
+
+    def cancel_from(self, stage_name: str) -> List[Any]:
+        """
+        Cancel every item being processed or queued at stage_name or later
+
+        Returns the items that were newly cancelled.
+        """
+        names = [stage.name for stage in self.stages]
+        items = []
+        for stage in self.stages[names.index(stage_name):]:
+            with stage.queue.mutex:
+                items.extend(stage.queue.queue)
+            if stage.current is not None:
+                items.append(stage.current)
+
+        cancelled = []
+        for item in items:
+            token = getattr(item, "cancel_token", None)
+            if token is not None and token.cancel():
+                cancelled.append(item)
+        return cancelled
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def summary(self) -> str:
+        parts = []
+        for stage in self.stages:
+            s = stage.stats()
+            parts.append(f"{stage.name} q={s['queued']}{'+1' if s['active'] else ''} busy {s['busy']:.2f}s")
+        return "📊 Pipeline: " + " | ".join(parts)
@@ -0,0 +1,472 @@
+"""
+Streaming Piper TTS
+One resident `piper --output_raw` process per voice; sentences go in on stdin and their PCM is
+played from stdout as it arrives, with no temp files and no per-reply model load
+"""
+
+import json
+import os
+import queue
+import re
+import selectors
+import subprocess
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tts_engine import Clip
+
+DEFAULT_SAMPLE_RATE = 22050
+# Piper logs this after each line: "Real-time factor: 0.07 (infer=0.15 sec, audio=2.1 sec)"
+RTF_LINE = re.compile(rb"infer=([\d.]+) sec, audio=([\d.]+) sec")
+# Audio may still be in the pipe when the log line arrives; how long to wait for the rest
+TAIL_TIMEOUT = 0.25
+# Playback is written in slices this long so a barge-in stops it promptly
+WRITE_SECONDS = 0.05
+
+
+def voice_sample_rate(model: str) -> int:
+    """Sample rate from the voice's .onnx.json config"""
+    try:
+        with open(f"{model}.json") as f:
+            return int(json.load(f)["audio"]["sample_rate"])
+    except (OSError, ValueError, KeyError):
+        return DEFAULT_SAMPLE_RATE
+
+
+class PyAudioSink:
+    """Default output device, opened on first write and kept open between clips"""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.pa = None
+        self.stream = None
+
+    def write(self, pcm: bytes):
+        if self.stream is None:
+            import pyaudio
+
+            self.pa = pyaudio.PyAudio()
+            self.stream = self.pa.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate, output=True)
+        # Blocks while the device buffer is full, which paces playback
+        self.stream.write(pcm)
+
+    def close(self):
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.pa:
+            self.pa.terminate()
+            self.pa = None
+
+
+class WavSink:
+    """Appends everything played to a WAV file (for checking output without a speaker)"""
+
+    def __init__(self, path: str, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.wav = wave.open(path, "wb")
+        self.wav.setnchannels(1)
+        self.wav.setsampwidth(2)
+        self.wav.setframerate(sample_rate)
+
+    def write(self, pcm: bytes):
+        self.wav.writeframes(pcm)
+
+    def close(self):
+        self.wav.close()
+
+
+class NullSink:
+    """Discards audio (benchmarks, headless runs)"""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+
+    def write(self, pcm: bytes):
+        pass
+
+    def close(self):
+        pass
+
+
+def create_sink(output: str, sample_rate: int):
+    """``device`` (default output), ``null``, or a .wav path"""
+    if output in (None, "", "device"):
+        return PyAudioSink(sample_rate)
+    if output == "null":
+        return NullSink(sample_rate)
+    return WavSink(output, sample_rate)
+
+
+class PcmClip(Clip):
+    """
+    One sentence streaming out of a PiperWorker
+
+    play() writes PCM to the worker's sink while Piper is still producing
+    it. ``ttfs`` is the time from Piper starting on the sentence to its
+    first sample; ``rtf`` is Piper's inference time over audio length.
+    The whole sentence's PCM is kept so it can be handed to on_audio()
+    callbacks (the speech cache) once Piper has finished it.
+    """
+
+    def __init__(self, worker: "PiperWorker", text: str):
+        super().__init__([])
+        self.worker = worker
+        self.text = text
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.first_sample_at: Optional[float] = None
+        self.audio_bytes = 0
+        self.infer_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._released = False
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._audio: List[bytes] = []
+        self._finished = False
+        self._callbacks: List[Callable[[bytes], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def audio_seconds(self) -> float:
+        return self.audio_bytes / 2 / self.worker.sample_rate
+
+    @property
+    def ttfs(self) -> Optional[float]:
+        if self.first_sample_at is None or self.started_at is None:
+            return None
+        return self.first_sample_at - self.started_at
+
+    @property
+    def rtf(self) -> Optional[float]:
+        if self.infer_seconds is None or not self.audio_seconds:
+            return None
+        return self.infer_seconds / self.audio_seconds
+
+    def _feed(self, pcm: bytes):
+        if self.first_sample_at is None:
+            self.first_sample_at = time.monotonic()
+        self.audio_bytes += len(pcm)
+        self._audio.append(pcm)
+        self._chunks.put(pcm)
+
+    def _complete(self, infer_seconds: Optional[float] = None, error: Optional[str] = None):
+        self.infer_seconds = infer_seconds
+        self.error = error
+        with self._lock:
+            self._finished = True
+            callbacks, self._callbacks = self._callbacks, []
+        if error is None and self.audio_bytes:
+            for callback in callbacks:
+                callback(b"".join(self._audio))
+        self._chunks.put(None)
+
+    def on_audio(self, callback: Callable[[bytes], None]):
+        """Call callback with the sentence's complete PCM once Piper has produced it (not on failure)"""
+        with self._lock:
+            if not self._finished:
+                self._callbacks.append(callback)
+                return
+        if self.error is None and self.audio_bytes:
+            callback(b"".join(self._audio))
+
+    def _pcm(self):
+        while True:
+            pcm = self._chunks.get()
+            if pcm is None:
+                if self.error:
+                    raise RuntimeError(self.error)
+                return
+            yield pcm
+
+    def play(self):
+        sink = self.worker.sink
+        step = int(self.worker.sample_rate * WRITE_SECONDS) * 2
+        try:
+            for pcm in self._pcm():
+                for i in range(0, len(pcm), step):
+                    if self._stopped:
+                        return
+                    sink.write(pcm[i:i + step])
+        finally:
+            self.cleanup()
+
+    def drain(self):
+        """Wait for the sentence without playing it"""
+        try:
+            for _ in self._pcm():
+                pass
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        # Called after playback, and for clips dropped unplayed (barge-in)
+        if not self._released:
+            self._released = True
+            self.worker.clip_done()
+
+    def stats(self) -> Dict[str, float]:
+        result = {}
+        if self.ttfs is not None:
+            result["ttfs"] = self.ttfs
+        if self.rtf is not None:
+            result["rtf"] = self.rtf
+        return result
+
+
+class PiperWorker:
+    """
+    Resident ``piper --output_raw`` process for one voice
+
+    Lines of text are written to stdin in order; PCM read from stdout
+    belongs to the oldest unfinished clip. Piper logs a real-time factor
+    line (with the audio length) on stderr after each line, which marks
+    where one sentence's audio ends and the next one's begins.
+    """
+
+    def __init__(self, binary: str, model: str, speed: float = 1.0, output: str = "device"):
+        self.binary = binary
+        self.model = model
+        self.speed = speed
+        self.sample_rate = voice_sample_rate(model)
+        self.sink = create_sink(output, self.sample_rate)
+        self.proc: Optional[subprocess.Popen] = None
+        self.clips = 0
+        self.audio_seconds = 0.0
+        self.infer_seconds = 0.0
+        self.ttfs: List[float] = []
+        self._queue: List[PcmClip] = []
+        self._outstanding = 0
+        self._closing = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self._ensure_running()
+
+    def _ensure_running(self):
+        if self.proc and self.proc.poll() is None:
+            return
+        self.proc = subprocess.Popen(
+            [self.binary, "--model", self.model, "--length_scale", str(1.0 / self.speed), "--output_raw"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+        )
+        threading.Thread(target=self._read_loop, args=(self.proc,), name="piper-reader", daemon=True).start()
+
+    def submit(self, text: str) -> PcmClip:
+        """Queue a sentence; its audio streams into the returned clip"""
+        # One line of stdin is one utterance for Piper
+        line = " ".join(text.split())
+        with self._lock:
+            self._ensure_running()
+            clip = PcmClip(self, line)
+            if not self._queue:
+                clip.started_at = clip.submitted_at
+            self._queue.append(clip)
+            self._outstanding += 1
+            try:
+                self.proc.stdin.write((line + "\n").encode("utf-8"))
+            except OSError:
+                # Piper died; the reader fails the queued clips when it sees the exit
+                pass
+        return clip
+
+    def replay(self, pcm: bytes, text: str) -> PcmClip:
+        """A clip that plays stored PCM (a speech cache hit) through this worker's sink"""
+        clip = PcmClip(self, text)
+        with self._lock:
+            self._outstanding += 1
+        clip._feed(pcm)
+        clip._complete()
+        return clip
+
+    def _finish_current(self, infer_seconds: Optional[float], error: Optional[str] = None):
+        with self._lock:
+            if not self._queue:
+                return
+            clip = self._queue.pop(0)
+            now = time.monotonic()
+            if self._queue:
+                self._queue[0].started_at = now
+            if error is None:
+                self.clips += 1
+                self.audio_seconds += clip.audio_seconds
+                self.infer_seconds += infer_seconds or 0.0
+                if clip.ttfs is not None:
+                    self.ttfs.append(clip.ttfs)
+                    del self.ttfs[:-1000]
+        clip._complete(infer_seconds, error)
+
+    def _read_loop(self, proc: subprocess.Popen):
+        selector = selectors.DefaultSelector()
+        selector.register(proc.stdout, selectors.EVENT_READ)
+        selector.register(proc.stderr, selectors.EVENT_READ)
+        stderr = b""
+        last_error = ""
+        # (infer seconds, audio bytes) from RTF lines whose sentence is still open
+        ended: List[Tuple[float, int]] = []
+        received = 0
+        odd = b""
+        while True:
+            events = selector.select(TAIL_TIMEOUT if ended else None)
+            if not events:
+                # Quiet since the end marker: the sentence is complete
+                self._finish_current(ended.pop(0)[0])
+                received = 0
+                continue
+
+            # End markers first, so audio read in the same pass is split at the right byte
+            for key, _ in sorted(events, key=lambda event: event[0].fileobj is proc.stdout):
+                data = os.read(key.fileobj.fileno(), 65536)
+                if not data:
+                    selector.close()
+                    self._fail_all(proc, last_error or f"piper exited with code {proc.wait()}")
+                    return
+                if key.fileobj is proc.stderr:
+                    stderr += data
+                    *lines, stderr = stderr.split(b"\n")
+                    for line in lines:
+                        match = RTF_LINE.search(line)
+                        if match:
+                            expected = int(float(match.group(2)) * self.sample_rate) * 2
+                            ended.append((float(match.group(1)), expected))
+                        elif line.strip():
+                            last_error = line.decode("utf-8", "replace").strip()
+                    continue
+
+                data, odd = odd + data, b""
+                if len(data) % 2:
+                    data, odd = data[:-1], data[-1:]
+                while data:
+                    if ended and ended[0][1] - received <= len(data):
+                        take = max(0, ended[0][1] - received)
+                        self._feed_current(data[:take])
+                        data = data[take:]
+                        self._finish_current(ended.pop(0)[0])
+                        received = 0
+                    else:
+                        self._feed_current(data)
+                        received += len(data)
+                        data = b""
+
+            # A marker whose audio has all arrived already
+            while ended and received >= ended[0][1]:
+                self._finish_current(ended.pop(0)[0])
+                received = 0
+
+    def _feed_current(self, pcm: bytes):
+        if not pcm:
+            return
+        with self._lock:
+            current = self._queue[0] if self._queue else None
+        if current:
+            current._feed(pcm)
+
+    def _fail_all(self, proc: subprocess.Popen, error: str):
+        with self._lock:
+            if proc is not self.proc:
+                return
+            # The next submit() starts a fresh process
+            self.proc = None
+            pending, self._queue = self._queue, []
+        for clip in pending:
+            clip._complete(error=error)
+
+    def clip_done(self):
+        """A clip finished playing (or was drained); the sink can close once a closing worker is idle"""
+        with self._lock:
+            self._outstanding -= 1
+            idle = self._closing and self._outstanding <= 0
+        if idle:
+            self.sink.close()
+
+    def close(self):
+        """Let Piper finish the queued sentences and exit; the sink closes after the last one plays"""
+        with self._lock:
+            self._closing = True
+            idle = self._outstanding <= 0
+            if self.proc and self.proc.poll() is None:
+                self.proc.stdin.close()
+        if idle:
+            self.sink.close()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            ttfs = sorted(self.ttfs)
+            return {
+                "voice": Path(self.model).stem,
+                "sampleRate": self.sample_rate,
+                "clips": self.clips,
+                "audioSeconds": round(self.audio_seconds, 2),
+                "rtf": round(self.infer_seconds / self.audio_seconds, 4) if self.audio_seconds else None,
+                "ttfsMedian": round(ttfs[len(ttfs) // 2], 4) if ttfs else None,
+            }
+
+
+_workers: Dict[Tuple[str, str, float, str], PiperWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(binary: str, model: str, speed: float = 1.0, output: str = "device") -> PiperWorker:
+    """The resident worker for a voice, started on first use"""
+    key = (binary, model, speed, output)
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None or worker._closing:
+            worker = _workers[key] = PiperWorker(binary, model, speed, output)
+    return worker
+
+
+class PiperStreamEngine:
+    """Piper voice served by a resident worker; clips stream PCM instead of pointing at files"""
+
+    name = "piper"
+    # The speech cache stores each finished sentence's raw PCM and replays it through the sink
+    suffix = ".pcm"
+
+    def __init__(self, binary: str, model: str, speed: float = 1.0, output: str = "device"):
+        self.binary = binary
+        self.model = model
+        self.speed = speed
+        self.output = output
+
+    @property
+    def voice(self) -> str:
+        return self.model
+
+    @property
+    def key(self) -> Tuple[str, str, float, str]:
+        return (self.binary, self.model, self.speed, self.output)
+
+    @property
+    def worker(self) -> PiperWorker:
+        return get_worker(*self.key)
+
+    def synthesize(self, text: str) -> PcmClip:
+        return self.worker.submit(text)
+
+    def replay(self, pcm: bytes, text: str) -> PcmClip:
+        return self.worker.replay(pcm, text)
+
+    def warm_up(self):
+        """Start Piper and render one throwaway sentence so the voice is loaded"""
+        self.synthesize("OK").drain()
+
+    def close(self):
+        with _workers_lock:
+            worker = _workers.pop(self.key, None)
+        if worker:
+            worker.close()
+
+    def summary(self) -> str:
+        s = self.worker.stats()
+        if not s["clips"]:
+            return f"🗣️  Piper {s['voice']}: no sentences yet"
+        return (f"🗣️  Piper {s['voice']}: {s['clips']} sentences, {s['audioSeconds']}s audio, "
+                f"RTF {s['rtf']}, median time to first sample {s['ttfsMedian'] * 1000:.0f}ms")
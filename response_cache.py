@@ -0,0 +1,108 @@
+"""
+Agent response cache
+TTL + LRU cache of gateway replies for repeated spoken questions
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_query(text: str) -> str:
+    """Fold case, punctuation and whitespace: "What's on my calendar?" → "whats on my calendar" """
+    return " ".join(PUNCTUATION.sub("", text.casefold()).split())
+
+
+class ResponseCache:
+    """
+    Recent agent replies keyed by normalized transcript, user and channel
+
+    Entries expire ``ttl`` seconds after they were stored; beyond
+    ``max_items`` the least recently used entry is evicted. Transcripts
+    containing any of the ``bypass_phrases`` (e.g. "what time is it") as
+    whole words are never cached or served from the cache.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_items: int = 64, bypass_phrases: Iterable[str] = ()):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.bypass_phrases = [normalize_query(p) for p in bypass_phrases if normalize_query(p)]
+        self.entries: "OrderedDict[Tuple[str, str, str], Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _key(self, text: str, to: Optional[str], channel: str) -> Optional[Tuple[str, str, str]]:
+        query = normalize_query(text)
+        if not query or self.bypassed_by(query):
+            return None
+        return (query, str(to or ""), channel)
+
+    def bypassed_by(self, query: str) -> Optional[str]:
+        """The bypass phrase found in a normalized query as a whole-word sequence, if any"""
+        # Normalized text is single-space separated, so padding makes this a token match ("now" ≠ "know")
+        padded = f" {query} "
+        for phrase in self.bypass_phrases:
+            if f" {phrase} " in padded:
+                return phrase
+        return None
+
+    def get(self, text: str, to: Optional[str], channel: str) -> Optional[Tuple[str, float]]:
+        """Return (reply, age in seconds) for a fresh entry, or None"""
+        key = self._key(text, to, channel)
+        with self._lock:
+            if key is None:
+                self.bypassed += 1
+                return None
+            entry = self.entries.get(key)
+            if entry is not None:
+                stored_at, reply = entry
+                age = time.monotonic() - stored_at
+                if age <= self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return reply, age
+                del self.entries[key]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, text: str, to: Optional[str], channel: str, reply: str):
+        key = self._key(text, to, channel)
+        if key is None or not reply:
+            return
+        with self._lock:
+            self.entries[key] = (time.monotonic(), reply)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_items:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "items": len(self.entries),
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        total = s["hits"] + s["misses"]
+        rate = s["hits"] / total * 100 if total else 0.0
+        return (f"🗂️  Response cache: {s['hits']}/{total} hits ({rate:.0f}%), "
+                f"{s['bypassed']} bypassed, {s['expired']} expired, {s['items']} stored")
@@ -0,0 +1,191 @@
+"""
+Speculative agent requests
+Asks the agent from a partial transcript once the speaker pauses, before the recording ends,
+and keeps the reply if the final transcript turns out the same
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from pipeline import CancelToken
+from response_cache import normalize_query
+from vad import Endpointer, VoiceActivityDetector
+
+
+class Speculation:
+    """
+    One early agent request running on its own thread
+
+    Reply deltas are buffered until attach() hands them (and everything
+    after) to the real consumer, so a hit streams into TTS exactly like a
+    normal request.
+    """
+
+    def __init__(self, text: str, send: Callable):
+        self.text = text
+        self.key = normalize_query(text)
+        self.cancel_token = CancelToken()
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        # When the final transcript confirmed it
+        self.resolved_at: Optional[float] = None
+        self.reply: Optional[str] = None
+        self.done = threading.Event()
+        self._deltas: List[str] = []
+        self._listener: Optional[Callable[[str], None]] = None
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, args=(send,), name="speculation", daemon=True).start()
+
+    def _run(self, send: Callable):
+        try:
+            self.reply = send(self.text, on_delta=self._on_delta, cancel_token=self.cancel_token)
+        finally:
+            self.finished_at = time.monotonic()
+            self.done.set()
+
+    def _on_delta(self, delta: str):
+        with self._lock:
+            self._deltas.append(delta)
+            if self._listener:
+                self._listener(delta)
+
+    def attach(self, on_delta: Callable[[str], None]):
+        """Replay the deltas received so far into on_delta and forward the rest as they come"""
+        with self._lock:
+            for delta in self._deltas:
+                on_delta(delta)
+            self._listener = on_delta
+
+    def result(self) -> Optional[str]:
+        self.done.wait()
+        return self.reply
+
+    def cancel(self):
+        self.cancel_token.cancel()
+
+
+class SpeculationStats:
+    """Hit rate and latency saved across utterances"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record(self, hit: bool, saved: float = 0.0):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.saved_seconds += saved
+            else:
+                self.misses += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            total = self.hits + self.misses
+            rate = self.hits / total * 100 if total else 0.0
+            saved = self.saved_seconds / self.hits if self.hits else 0.0
+            wasted = self.requests - self.hits
+            return (f"🔮 Speculation: {self.hits}/{total} hits ({rate:.0f}%), "
+                    f"{saved:.2f}s saved per hit, {wasted} wasted request(s)")
+
+
+class Speculator:
+    """
+    Decides when to speculate for one recording
+
+    feed_audio() tracks trailing silence in the captured audio and
+    observe() is fed every partial hypothesis from the streaming
+    transcriber. The request is sent only once the speaker has been quiet
+    for ``end_silence_ms`` and the hypothesis has stayed the same for
+    ``stable_seconds``, i.e. close to the end of the utterance. Speech
+    resuming cancels it; a later pause with a different hypothesis sends
+    a new one, up to ``max_requests`` per recording. resolve() compares the
+    final transcript.
+    """
+
+    def __init__(self, send: Callable, stats: SpeculationStats, detector: VoiceActivityDetector,
+                 stable_seconds: float = 0.8, end_silence_ms: int = 400, max_requests: int = 2):
+        self.send = send
+        self.stats = stats
+        self.stable_seconds = stable_seconds
+        self.max_requests = max_requests
+        self.endpointer = Endpointer(detector, end_silence_ms)
+        self.current: Optional[Speculation] = None
+        self.requests = 0
+        self._paused = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def feed_audio(self, chunk: np.ndarray):
+        """Add captured int16 samples (cheap enough for the audio callback)"""
+        was_paused = self._paused
+        self._paused = self.endpointer.feed(chunk)
+        if was_paused and self.endpointer.silent_frames == 0:
+            with self._lock:
+                speculation, self.current = self.current, None
+            if speculation:
+                # Still talking: the early question is out of date, stop the run
+                print(f"   🔮 Still talking, cancelled early request ({speculation.text})")
+                speculation.cancel()
+                self.stats.record(hit=False)
+
+    def observe(self, text: str, unchanged_for: float):
+        if not self._paused or unchanged_for < self.stable_seconds or not normalize_query(text):
+            return
+        with self._lock:
+            if self._closed or (self.current and self.current.key == normalize_query(text)):
+                return
+            if self.requests >= self.max_requests:
+                return
+            if self.current:
+                # The hypothesis changed at a later pause: the earlier request can't be used
+                self.current.cancel()
+                self.stats.record(hit=False)
+            self.requests += 1
+            self.stats.record_request()
+            print(f"   🔮 Asking early: {text}")
+            self.current = Speculation(text, self.send)
+
+    def resolve(self, final_text: str) -> Optional[Speculation]:
+        """The speculation to use for final_text, or None (any mismatch is cancelled)"""
+        with self._lock:
+            self._closed = True
+            speculation, self.current = self.current, None
+        if speculation is None:
+            return None
+        if speculation.key == normalize_query(final_text):
+            speculation.resolved_at = time.monotonic()
+            return speculation
+        print(f"   🔮 Speculation missed (asked: {speculation.text})")
+        speculation.cancel()
+        self.stats.record(hit=False)
+        return None
+
+    def settle(self, speculation: Speculation) -> float:
+        """Record a used speculation once its reply is in; returns the seconds it saved"""
+        if not speculation.reply:
+            self.stats.record(hit=False)
+            return 0.0
+        # Without speculation the same request would only have started once the transcript was final
+        duration = speculation.finished_at - speculation.started_at
+        saved = max(0.0, min(duration, speculation.resolved_at - speculation.started_at))
+        self.stats.record(hit=True, saved=saved)
+        return saved
+
+    def cancel(self):
+        """The recording was dropped; abandon any request in flight"""
+        with self._lock:
+            self._closed = True
+            speculation, self.current = self.current, None
+        if speculation:
+            speculation.cancel()
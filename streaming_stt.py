@@ -0,0 +1,157 @@
+"""
+Streaming transcription
+Decodes audio in the background while the hotkey is still held
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+from stt_engine import SAMPLE_RATE, WhisperEngine, pcm16_to_float32
+
+BYTES_PER_SAMPLE = 2
+
+
+def _common_prefix(a: List[str], b: List[str]) -> List[str]:
+    prefix = []
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        prefix.append(x)
+    return prefix
+
+
+class StreamingTranscriber:
+    """
+    Incremental transcriber fed from the audio callback
+
+    A background thread re-decodes the uncommitted audio every ``step``
+    seconds. Words that agree between two consecutive hypotheses are
+    printed as stable partials. Once the uncommitted audio is longer than
+    ``window`` seconds, every finished Whisper segment except the last is
+    committed and its audio dropped, so the tail left for ``finish()`` stays
+    roughly ``window`` seconds long however long the utterance is.
+
+    ``on_partial(text, unchanged_for)``, if given, receives the full
+    hypothesis after every decode together with how many seconds it has
+    gone without changing.
+    """
+
+    def __init__(self, engine: WhisperEngine, step: float = 1.0, window: float = 8.0,
+                 on_partial: Optional[Callable[[str, float], None]] = None):
+        self.engine = engine
+        self.step = step
+        self.window = window
+        self.on_partial = on_partial
+
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.committed: List[str] = []
+        self._prev_words: List[str] = []
+        self._printed_words = 0
+        self._decoded_bytes = 0
+        self.decode_count = 0
+        self._hypothesis = ""
+        self._hypothesis_since = time.monotonic()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="streaming-stt", daemon=True)
+        self._thread.start()
+
+    def feed(self, pcm: bytes):
+        """Append captured PCM (called from the audio callback, must stay cheap)"""
+        with self._lock:
+            self._pcm.extend(pcm)
+
+    def cancel(self):
+        """Stop the background decoder and discard everything"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def finish(self) -> str:
+        """Stop streaming, decode the remaining tail and return the full transcript"""
+        self.cancel()
+
+        with self._lock:
+            tail = bytes(self._pcm)
+
+        start = time.monotonic()
+        if len(tail) >= SAMPLE_RATE * BYTES_PER_SAMPLE * 0.1:
+            segments = self.engine.transcribe_segments(pcm16_to_float32(tail), prompt=self._prompt())
+            self.committed.extend(text for _, _, text in segments if text)
+        elapsed = time.monotonic() - start
+
+        tail_seconds = len(tail) / (SAMPLE_RATE * BYTES_PER_SAMPLE)
+        print(f"   Tail decode: {tail_seconds:.1f}s of audio in {elapsed:.2f}s "
+              f"({self.decode_count} partial decodes while recording)")
+        return " ".join(self.committed).strip()
+
+    def _prompt(self) -> Optional[str]:
+        if not self.committed:
+            return None
+        # Only the most recent context matters to Whisper
+        return " ".join(self.committed)[-200:]
+
+    def _run(self):
+        while not self._stop.wait(self.step):
+            with self._lock:
+                if len(self._pcm) - self._decoded_bytes < self.step * SAMPLE_RATE * BYTES_PER_SAMPLE:
+                    continue
+                pcm = bytes(self._pcm)
+            self._decoded_bytes = len(pcm)
+
+            try:
+                segments = self.engine.transcribe_segments(pcm16_to_float32(pcm), prompt=self._prompt())
+            except Exception as e:
+                print(f"   ⚠️  Partial decode failed: {e}")
+                continue
+            self.decode_count += 1
+            if self._stop.is_set():
+                return
+
+            self._update_partial(segments)
+
+            if len(pcm) / (SAMPLE_RATE * BYTES_PER_SAMPLE) >= self.window:
+                self._commit(segments, len(pcm))
+
+    def _update_partial(self, segments):
+        words = " ".join(text for _, _, text in segments).split()
+        stable = _common_prefix(self._prev_words, words)
+        self._prev_words = words
+
+        if len(stable) > self._printed_words:
+            self._printed_words = len(stable)
+            partial = " ".join(self.committed + stable)
+            print(f"   … {partial}")
+
+        hypothesis = " ".join(self.committed + words)
+        now = time.monotonic()
+        if hypothesis != self._hypothesis:
+            self._hypothesis, self._hypothesis_since = hypothesis, now
+        if self.on_partial and hypothesis:
+            self.on_partial(hypothesis, now - self._hypothesis_since)
+
+    def _commit(self, segments, decoded_bytes: int):
+        if len(segments) >= 2:
+            # Keep the last (possibly unfinished) segment for the next pass
+            done, cut = segments[:-1], segments[-1][0]
+            cut_bytes = int(cut * SAMPLE_RATE) * BYTES_PER_SAMPLE
+        elif len(segments) == 1 and decoded_bytes >= 2 * self.window * SAMPLE_RATE * BYTES_PER_SAMPLE:
+            # One very long segment with no break: commit it whole
+            done, cut_bytes = segments, decoded_bytes
+        else:
+            return
+
+        if cut_bytes <= 0:
+            return
+
+        self.committed.extend(text for _, _, text in done if text)
+        with self._lock:
+            del self._pcm[:cut_bytes]
+        self._decoded_bytes = max(0, self._decoded_bytes - cut_bytes)
+        self._prev_words = []
+        self._printed_words = 0
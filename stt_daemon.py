@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Shared transcription daemon
+One resident copy of each STT model behind a Unix socket; utterances arriving together are
+decoded as one batch, and requests are refused once the queue is too deep
+"""
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from stt_engine import SAMPLE_RATE, create_backend
+from tracing import percentile
+
+CONFIG_FILE = Path(__file__).parent / "config.json"
+DEFAULT_SOCKET = "/tmp/openclaw-stt.sock"
+
+# Wire format: one JSON header line, then (for "transcribe") `samples` float32 values.
+# Every request gets exactly one JSON line back.
+# Longest utterance accepted (10 minutes); anything longer is refused before it is read
+MAX_SAMPLES = SAMPLE_RATE * 600
+# Languages the clients map config "language" to
+LANGUAGES = ("uk", "en")
+
+
+class OverloadedError(Exception):
+    """The daemon refused the request because its queue is full"""
+
+
+class UnknownModelError(ValueError):
+    """The request named a model or language the daemon doesn't serve"""
+
+
+class Job:
+    def __init__(self, audio: np.ndarray):
+        self.audio = audio
+        self.queued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result: Dict[str, object] = {}
+
+
+class ModelWorker:
+    """
+    Batching decode loop for one model
+
+    The first queued job opens a batch; jobs arriving within ``window``
+    seconds (up to ``max_batch``) join it and are decoded together.
+    """
+
+    def __init__(self, engine, window: float, max_batch: int, stats: "DaemonStats"):
+        self.engine = engine
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = stats
+        self.queue: "queue.Queue[Job]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"stt-{engine.model_name}", daemon=True)
+        self._thread.start()
+
+    def _collect(self) -> List[Job]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            try:
+                if len(batch) == 1:
+                    # A lone utterance gets the full decoder (temperature fallback etc.)
+                    texts = [self.engine.transcribe(batch[0].audio)]
+                else:
+                    texts = self.engine.transcribe_batch([job.audio for job in batch])
+                error = None
+            except Exception as e:
+                texts, error = [None] * len(batch), f"{type(e).__name__}: {e}"
+            decode = time.monotonic() - started
+
+            self.stats.record_batch(batch, started, failed=error is not None)
+            for job, text in zip(batch, texts):
+                job.result = {"ok": error is None, "text": text, "error": error,
+                              "queueWait": round(started - job.queued_at, 4),
+                              "decode": round(decode, 4), "batchSize": len(batch)}
+                job.done.set()
+
+
+class DaemonStats:
+    """Queue wait, batch sizes and throughput since start-up"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self.audio_seconds = 0.0
+        self.queue_waits: List[float] = []
+        self.batch_sizes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def record_batch(self, batch: List[Job], started: float, failed: bool = False):
+        with self._lock:
+            self.requests += len(batch)
+            if failed:
+                self.errors += len(batch)
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+            for job in batch:
+                self.queue_waits.append(started - job.queued_at)
+                self.audio_seconds += len(job.audio) / SAMPLE_RATE
+            # Bounded memory for long-running daemons
+            del self.queue_waits[:-10000]
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self, queued: int) -> Dict[str, object]:
+        with self._lock:
+            uptime = time.monotonic() - self.started
+            waits = list(self.queue_waits)
+            result = {
+                "uptime": round(uptime, 1),
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "queued": queued,
+                "batchSizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                "audioSeconds": round(self.audio_seconds, 1),
+                "audioSecondsPerSecond": round(self.audio_seconds / uptime, 3) if uptime else 0.0,
+                "requestsPerSecond": round(self.requests / uptime, 3) if uptime else 0.0,
+            }
+        if waits:
+            result["queueWait"] = {f"p{p}": round(percentile(waits, p), 4) for p in (50, 95, 99)}
+        return result
+
+
+class SttDaemon:
+    """
+    Holds the models, the per-model workers and admission control
+
+    Only the ``models`` it was started with are served (by default the
+    configured whisperModel); a client can't make it load anything else.
+    """
+
+    def __init__(self, config: dict, window: float = 0.05, max_batch: int = 8, max_queue: int = 16,
+                 models: Optional[List[str]] = None):
+        self.config = config
+        self.window = window
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.models = list(models or [config.get("whisperModel", "base")])
+        self.stats = DaemonStats()
+        self.workers: Dict[Tuple[str, str], ModelWorker] = {}
+        self._lock = threading.Lock()
+        # One lock per model being loaded, so a load never blocks submits for loaded models
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+        # Admission check and enqueue happen together, so max_queue can't be overshot
+        self._admit_lock = threading.Lock()
+
+    def worker(self, model: str, language: str) -> ModelWorker:
+        if model not in self.models or language not in LANGUAGES:
+            raise UnknownModelError(f"not served: model {model!r}, language {language!r} "
+                                    f"(models: {', '.join(self.models)})")
+        key = (model, language)
+        with self._lock:
+            worker = self.workers.get(key)
+            if worker is not None:
+                return worker
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                worker = self.workers.get(key)
+            if worker is None:
+                engine = create_backend(self.config, model, language)
+                engine.load()
+                worker = ModelWorker(engine, self.window, self.max_batch, self.stats)
+                with self._lock:
+                    self.workers[key] = worker
+            return worker
+
+    def queued(self) -> int:
+        return sum(w.queue.qsize() for w in list(self.workers.values()))
+
+    def submit(self, audio: np.ndarray, model: str, language: str) -> Job:
+        worker = self.worker(model, language)
+        job = Job(audio)
+        with self._admit_lock:
+            if self.queued() >= self.max_queue:
+                self.stats.record_rejected()
+                raise OverloadedError(f"queue full ({self.max_queue} waiting)")
+            worker.queue.put(job)
+        return job
+
+    def snapshot(self) -> Dict[str, object]:
+        result = self.stats.snapshot(self.queued())
+        result["models"] = [w.engine.stats() for w in self.workers.values()]
+        return result
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon: SttDaemon = self.server.stt
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            try:
+                header = json.loads(line)
+            except ValueError:
+                header = None
+            if not isinstance(header, dict):
+                self._reply({"ok": False, "error": "invalid header"})
+                return
+
+            op = header.get("op")
+            if op == "ping":
+                self._reply({"ok": True})
+            elif op == "stats":
+                self._reply({"ok": True, "stats": daemon.snapshot()})
+            elif op == "transcribe":
+                try:
+                    samples = int(header["samples"])
+                    if not 0 <= samples <= MAX_SAMPLES:
+                        raise ValueError(samples)
+                except (KeyError, TypeError, ValueError):
+                    # Without a usable payload length the stream can't be resynchronized
+                    self._reply({"ok": False, "error": f"transcribe needs an integer 'samples' "
+                                                       f"from 0 to {MAX_SAMPLES}"})
+                    return
+                # Always consume the payload so the stream stays in sync
+                payload = self.rfile.read(samples * 4)
+                if len(payload) < samples * 4:
+                    return
+                audio = np.frombuffer(payload, dtype=np.float32)
+                model = header.get("model") or daemon.config.get("whisperModel", "base")
+                language = header.get("language") or "uk"
+                try:
+                    job = daemon.submit(audio, model, language)
+                except OverloadedError as e:
+                    self._reply({"ok": False, "error": str(e), "overloaded": True})
+                    continue
+                except UnknownModelError as e:
+                    self._reply({"ok": False, "error": str(e)})
+                    continue
+                job.done.wait()
+                self._reply(job.result)
+            else:
+                self._reply({"ok": False, "error": f"unknown op: {op}"})
+
+    def _reply(self, body: Dict[str, object]):
+        try:
+            self.wfile.write((json.dumps(body, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+        except OSError:
+            # The client gave up (timeout) before its reply; the next readline ends the connection
+            pass
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Bursts of clients connecting at once are what the batching is for
+    request_queue_size = 64
+
+
+class DaemonEngine:
+    """
+    Client side: transcribes through a running daemon
+
+    Offers the transcribe()/load() subset of the engine interface, so
+    transcribe_audio can use it in place of an in-process model.
+    """
+
+    backend = "daemon"
+
+    def __init__(self, path: str = DEFAULT_SOCKET, model_name: str = "base", language: str = "uk",
+                 timeout: float = 120):
+        self.path = path
+        self.model_name = model_name
+        self.language = language
+        self.timeout = timeout
+        self.last: Dict[str, object] = {}
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._sock, self._file = sock, sock.makefile("rb")
+
+    def _close(self):
+        if self._sock:
+            self._sock.close()
+        self._sock = self._file = None
+
+    def _call(self, header: Dict[str, object], payload: bytes = b"") -> Dict[str, object]:
+        with self._lock:
+            # One reconnect attempt covers a daemon restart between calls. Only a failed
+            # connect or send is retried: once the request is out it may already be decoding.
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall((json.dumps(header) + "\n").encode("utf-8") + payload)
+                    break
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+            try:
+                line = self._file.readline()
+            except OSError:
+                self._close()
+                raise
+            if not line:
+                self._close()
+                raise ConnectionError("STT daemon closed the connection")
+            return json.loads(line)
+
+    def close(self):
+        """Drop the connection to the daemon"""
+        with self._lock:
+            self._close()
+
+    def load(self):
+        """Check that the daemon is reachable (the model lives there)"""
+        self._call({"op": "ping"})
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        reply = self._call({"op": "transcribe", "samples": len(audio),
+                            "model": self.model_name, "language": self.language}, audio.tobytes())
+        self.last = reply
+        if reply.get("overloaded"):
+            raise OverloadedError(reply.get("error"))
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error"))
+        return reply.get("text") or ""
+
+    def stats(self) -> Dict[str, object]:
+        return self._call({"op": "stats"}).get("stats", {})
+
+    def summary(self) -> str:
+        if not self.last:
+            return f"daemon {self.path}"
+        return (f"daemon: waited {self.last.get('queueWait', 0):.2f}s, "
+                f"batch of {self.last.get('batchSize', 1)}")
+
+
+def print_stats(stats: Dict[str, object]):
+    print(f"📊 STT daemon: {stats['requests']} requests ({stats['rejected']} rejected, {stats['errors']} failed, "
+          f"{stats['queued']} queued), {stats['audioSeconds']}s audio, "
+          f"{stats['audioSecondsPerSecond']} audio-s/s over {stats['uptime']}s")
+    if "queueWait" in stats:
+        waits = stats["queueWait"]
+        print(f"   Queue wait p50 {waits['p50']:.3f}s, p95 {waits['p95']:.3f}s, p99 {waits['p99']:.3f}s")
+    print("   Batch sizes: " + ", ".join(f"{size}×{count}" for size, count in stats["batchSizes"].items()))
+    for model in stats.get("models", []):
+        print(f"   {model['backend']}/{model['model']}: load {model['loadSeconds']}s, "
+              f"+{model['memoryMB']} MB, RTF {model['rtf']}")
+
+
+def main():
+    import argparse
+
+    with open(CONFIG_FILE) as f:
+        config = json.load(f)
+
+    parser = argparse.ArgumentParser(description="Shared STT daemon on a Unix socket")
+    parser.add_argument("--socket", default=config.get("sttDaemonSocket", DEFAULT_SOCKET))
+    parser.add_argument("--batch-window-ms", type=float, default=50,
+                        help="how long a batch stays open for more utterances (default: 50)")
+    parser.add_argument("--max-batch", type=int, default=8, help="utterances per decode (default: 8)")
+    parser.add_argument("--max-queue", type=int, default=16,
+                        help="refuse new requests beyond this many waiting (default: 16)")
+    parser.add_argument("--models", default=config.get("whisperModel", "base"),
+                        help="comma-separated models to load and serve (default: whisperModel)")
+    parser.add_argument("--stats", action="store_true", help="print a running daemon's stats and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        print_stats(DaemonEngine(args.socket).stats())
+        return 0
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    daemon = SttDaemon(config, args.batch_window_ms / 1000.0, args.max_batch, args.max_queue, models)
+    language = "uk" if config.get("language", "uk") == "uk" else "en"
+    # Preloaded, so the first requests don't wait for a model load
+    for model in models:
+        daemon.worker(model, language)
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+    server = _Server(args.socket, _Handler)
+    server.stt = daemon
+    print(f"🎧 STT daemon listening on {args.socket} (batch window {args.batch_window_ms:.0f}ms, "
+          f"max batch {args.max_batch}, max queue {args.max_queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+        print_stats(daemon.snapshot())
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,520 @@
+"""
+Speech-to-text engines
+Keeps a Whisper model (openai-whisper or faster-whisper) resident in memory and transcribes in-memory audio
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tracing import peak_rss_mb
+
+SAMPLE_RATE = 16000
+
+# (start seconds, end seconds, text)
+Segment = Tuple[float, float, str]
+
+# openai-whisper transcribe() defaults: when to retry at a higher temperature, and when a window is silence
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def pcm16_to_float32(pcm: bytes) -> np.ndarray:
+    """Convert 16-bit mono PCM bytes to the float32 [-1, 1] array Whisper expects"""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def load_audio_file(path: str) -> np.ndarray:
+    """Decode any ffmpeg-readable audio file to float32 mono at 16 kHz"""
+    try:
+        from whisper.audio import load_audio
+    except ImportError:
+        # Torch-free installs only have faster-whisper (PyAV)
+        from faster_whisper.audio import decode_audio
+
+        return decode_audio(path, sampling_rate=SAMPLE_RATE)
+    return load_audio(path, sr=SAMPLE_RATE)
+
+
+class SttEngine:
+    """
+    Resident speech-to-text model (base class for the backends)
+
+    Subclasses implement _load_model() and _run(), returning Whisper-style
+    results: {"text": ..., "segments": [{"start", "end", "text",
+    "avg_logprob", "no_speech_prob", "compression_ratio"}, ...]}. The base
+    class loads lazily, serializes decoding and keeps the numbers used to
+    compare backends: load time, memory taken by the model and real-time
+    factor (decode time / audio duration).
+    """
+
+    backend = "base"
+
+    def __init__(self, model_name: str = "base", language: str = "uk"):
+        self.model_name = model_name
+        self.language = language
+        self.model = None
+        self.load_time: Optional[float] = None
+        self.memory_mb: Optional[float] = None
+        self.decodes = 0
+        self.audio_seconds = 0.0
+        self.decode_seconds = 0.0
+        # Models are not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        raise NotImplementedError
+
+    def _run(self, model, audio: np.ndarray, **options) -> dict:
+        raise NotImplementedError
+
+    def load(self):
+        """Load the model once; later calls return the cached instance"""
+        with self._lock:
+            if self.model is None:
+                rss_before = peak_rss_mb()
+                start = time.monotonic()
+                self.model = self._load_model()
+                self.load_time = time.monotonic() - start
+                # Growth of peak RSS: what the model costs this process
+                self.memory_mb = max(0.0, peak_rss_mb() - rss_before)
+                print(f"   ✅ {self.backend} model '{self.model_name}' loaded in {self.load_time:.1f}s "
+                      f"(+{self.memory_mb:.0f} MB)")
+        return self.model
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    @property
+    def rtf(self) -> Optional[float]:
+        return self.decode_seconds / self.audio_seconds if self.audio_seconds else None
+
+    def _decode(self, audio: np.ndarray, **options) -> dict:
+        model = self.load()
+        with self._lock:
+            start = time.monotonic()
+            result = self._run(model, audio, **options)
+            self.decode_seconds += time.monotonic() - start
+            self.audio_seconds += len(audio) / SAMPLE_RATE
+            self.decodes += 1
+        return result
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        """
+        Transcribe audio
+
+        Args:
+            audio: float32 mono samples at 16 kHz
+
+        Returns:
+            Transcribed text (may be empty)
+        """
+        return self._decode(audio).get("text", "").strip()
+
+    def transcribe_scored(self, audio: np.ndarray) -> Tuple[str, Dict[str, float]]:
+        """
+        Transcribe audio and summarize Whisper's confidence signals
+
+        Returns:
+            (text, scores) where scores holds the duration-weighted
+            avg_logprob and the worst no_speech_prob and compression_ratio
+            over all segments
+        """
+        result = self._decode(audio)
+        return result.get("text", "").strip(), confidence_scores(result.get("segments", []))
+
+    def transcribe_segments(self, audio: np.ndarray,
+                            prompt: Optional[str] = None) -> List[Segment]:
+        """
+        Transcribe audio and keep Whisper's segment timing
+
+        Args:
+            audio: float32 mono samples at 16 kHz
+            prompt: Previously committed text, used as decoding context
+
+        Returns:
+            List of (start, end, text) tuples, times in seconds
+        """
+        result = self._decode(audio, initial_prompt=prompt, condition_on_previous_text=False)
+        return [
+            (seg["start"], seg["end"], seg["text"].strip())
+            for seg in result.get("segments", [])
+        ]
+
+    def transcribe_batch(self, audios: List[np.ndarray]) -> List[str]:
+        """Transcribe several utterances; backends that can decode them together override this"""
+        return [self.transcribe(audio) for audio in audios]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": self.backend,
+            "model": self.model_name,
+            "loadSeconds": round(self.load_time, 3) if self.load_time is not None else None,
+            "memoryMB": round(self.memory_mb, 1) if self.memory_mb is not None else None,
+            "decodes": self.decodes,
+            "rtf": round(self.rtf, 4) if self.rtf is not None else None,
+        }
+
+    def summary(self) -> str:
+        load = f"loaded in {self.load_time:.1f}s, +{self.memory_mb:.0f} MB" if self.loaded else "not loaded"
+        rtf = f"RTF {self.rtf:.2f}" if self.rtf is not None else "RTF n/a"
+        return f"{self.backend}/{self.model_name}: {load}, {rtf} over {self.decodes} decodes"
+
+
+class WhisperEngine(SttEngine):
+    """openai-whisper on torch (fp16 on GPU, fp32 on CPU)"""
+
+    backend = "whisper"
+
+    def _load_model(self):
+        import whisper
+
+        return whisper.load_model(self.model_name)
+
+    def _run(self, model, audio: np.ndarray, **options) -> dict:
+        return model.transcribe(
+            audio,
+            language=self.language,
+            fp16=model.device.type != "cpu",
+            **options,
+        )
+
+    def transcribe_batch(self, audios: List[np.ndarray]) -> List[str]:
+        """
+        Decode all utterances of up to 30 s in one batched forward pass
+
+        Each is padded to Whisper's 30 s window and their mel spectrograms
+        are stacked into one batch, decoded with the same options as
+        transcribe() (timestamps on, temperature 0). A result transcribe()
+        would have retried at a higher temperature is decoded again on its
+        own, and one it would have treated as silence becomes empty, so a
+        clip comes out the same batched or alone. Longer audio needs the
+        sliding-window transcribe() and is decoded on its own.
+        """
+        import torch
+        import whisper
+
+        model = self.load()
+        texts: List[Optional[str]] = [None] * len(audios)
+        short = [i for i, audio in enumerate(audios) if len(audio) <= whisper.audio.N_SAMPLES]
+
+        if short:
+            with self._lock:
+                start = time.monotonic()
+                mels = [whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), model.dims.n_mels)
+                        for i in short]
+                options = whisper.DecodingOptions(language=self.language, temperature=0.0,
+                                                  fp16=model.device.type != "cpu")
+                batch = whisper.decode(model, torch.stack(mels).to(model.device), options)
+                self.decode_seconds += time.monotonic() - start
+                self.audio_seconds += sum(len(audios[i]) for i in short) / SAMPLE_RATE
+                self.decodes += len(short)
+            for i, result in zip(short, batch):
+                silent = result.no_speech_prob > NO_SPEECH_THRESHOLD
+                if silent and result.avg_logprob <= LOGPROB_THRESHOLD:
+                    texts[i] = ""
+                elif silent or (result.compression_ratio <= COMPRESSION_RATIO_THRESHOLD
+                                and result.avg_logprob >= LOGPROB_THRESHOLD):
+                    texts[i] = result.text.strip()
+                # Otherwise left as None: transcribe() below applies the temperature fallback
+
+        for i, text in enumerate(texts):
+            if text is None:
+                texts[i] = self.transcribe(audios[i])
+        return texts
+
+
+class FasterWhisperEngine(SttEngine):
+    """
+    CTranslate2 Whisper (faster-whisper), int8-quantized on the CPU by default
+
+    Needs neither torch nor a GPU, loads faster and uses a fraction of
+    the memory of the torch backend.
+    """
+
+    backend = "faster-whisper"
+
+    def __init__(self, model_name: str = "base", language: str = "uk",
+                 compute_type: str = "int8", device: str = "cpu", threads: int = 0):
+        super().__init__(model_name, language)
+        self.compute_type = compute_type
+        self.device = device
+        self.threads = threads
+
+    def _load_model(self):
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(self.model_name, device=self.device,
+                            compute_type=self.compute_type, cpu_threads=self.threads)
+
+    def _run(self, model, audio: np.ndarray, **options) -> dict:
+        segments, _info = model.transcribe(audio, language=self.language, **options)
+        # Segments are decoded lazily while iterating
+        segments = [
+            {
+                "start": seg.start,
+                "end": seg.end,
+                "text": seg.text,
+                "avg_logprob": seg.avg_logprob,
+                "no_speech_prob": seg.no_speech_prob,
+                "compression_ratio": seg.compression_ratio,
+            }
+            for seg in segments
+        ]
+        return {"text": "".join(seg["text"] for seg in segments), "segments": segments}
+
+
+BACKENDS = {
+    WhisperEngine.backend: WhisperEngine,
+    FasterWhisperEngine.backend: FasterWhisperEngine,
+}
+
+
+def create_backend(config: dict, model_name: str, language: str) -> SttEngine:
+    """Instantiate the backend selected by sttBackend"""
+    backend = config.get("sttBackend", "whisper")
+    if backend == FasterWhisperEngine.backend:
+        return FasterWhisperEngine(model_name, language,
+                                   compute_type=config.get("sttComputeType", "int8"),
+                                   device=config.get("sttDevice", "cpu"),
+                                   threads=config.get("sttThreads", 0))
+    if backend != WhisperEngine.backend:
+        raise ValueError(f"Unknown sttBackend '{backend}' (choose from: {', '.join(BACKENDS)})")
+    return WhisperEngine(model_name, language)
+
+
+def confidence_scores(segments: List[dict]) -> Dict[str, float]:
+    """Aggregate per-segment Whisper scores for the whole utterance"""
+    if not segments:
+        # Nothing decoded at all: treat as maximally unsure
+        return {"avg_logprob": float("-inf"), "no_speech_prob": 1.0, "compression_ratio": 0.0}
+    weights = [max(seg["end"] - seg["start"], 0.01) for seg in segments]
+    return {
+        "avg_logprob": sum(seg["avg_logprob"] * w for seg, w in zip(segments, weights)) / sum(weights),
+        "no_speech_prob": max(seg["no_speech_prob"] for seg in segments),
+        "compression_ratio": max(seg["compression_ratio"] for seg in segments),
+    }
+
+
+class TieredEngine:
+    """
+    Two Whisper models: a fast one for every utterance and an accurate
+    one that re-decodes only when the fast result looks unreliable
+
+    The fast result is escalated when its avg_logprob falls below
+    ``min_avg_logprob``, or its no_speech_prob or compression_ratio (a
+    sign of repetition loops) rises above the respective maximum.
+    """
+
+    def __init__(self, fast: SttEngine, accurate: SttEngine,
+                 min_avg_logprob: float = -0.8, max_no_speech_prob: float = 0.6,
+                 max_compression_ratio: float = 2.4):
+        self.fast = fast
+        self.accurate = accurate
+        self.min_avg_logprob = min_avg_logprob
+        self.max_no_speech_prob = max_no_speech_prob
+        self.max_compression_ratio = max_compression_ratio
+        self.decodes = 0
+        self.escalations = 0
+        self.fast_time = 0.0
+        self.accurate_time = 0.0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def model_name(self) -> str:
+        return f"{self.fast.model_name}→{self.accurate.model_name}"
+
+    @property
+    def language(self) -> str:
+        return self.accurate.language
+
+    @property
+    def load_time(self) -> Optional[float]:
+        times = [t for t in (self.fast.load_time, self.accurate.load_time) if t is not None]
+        return sum(times) if times else None
+
+    @property
+    def loaded(self) -> bool:
+        return self.fast.loaded and self.accurate.loaded
+
+    def load(self):
+        self.fast.load()
+        return self.accurate.load()
+
+    def escalation_reasons(self, scores: Dict[str, float]) -> List[str]:
+        reasons = []
+        if scores["avg_logprob"] < self.min_avg_logprob:
+            reasons.append(f"avg_logprob {scores['avg_logprob']:.2f}")
+        if scores["no_speech_prob"] > self.max_no_speech_prob:
+            reasons.append(f"no_speech_prob {scores['no_speech_prob']:.2f}")
+        if scores["compression_ratio"] > self.max_compression_ratio:
+            reasons.append(f"compression_ratio {scores['compression_ratio']:.2f}")
+        return reasons
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        start = time.monotonic()
+        text, scores = self.fast.transcribe_scored(audio)
+        fast_elapsed = time.monotonic() - start
+        reasons = self.escalation_reasons(scores)
+
+        accurate_elapsed = 0.0
+        if reasons:
+            print(f"   ⤴️  Escalating to '{self.accurate.model_name}' ({', '.join(reasons)})")
+            start = time.monotonic()
+            text = self.accurate.transcribe(audio)
+            accurate_elapsed = time.monotonic() - start
+
+        with self._stats_lock:
+            self.decodes += 1
+            self.fast_time += fast_elapsed
+            if reasons:
+                self.escalations += 1
+                self.accurate_time += accurate_elapsed
+        print(f"   🪜 STT tiers: {self.fast.model_name} {fast_elapsed:.2f}s"
+              + (f" + {self.accurate.model_name} {accurate_elapsed:.2f}s" if reasons else "")
+              + f" | {self.summary()}")
+        return text
+
+    @property
+    def backend(self) -> str:
+        return self.accurate.backend
+
+    # The accurate model is the larger one: report its memory and RTF, and batch-decode on it
+
+    @property
+    def memory_mb(self) -> Optional[float]:
+        return self.accurate.memory_mb
+
+    @property
+    def rtf(self) -> Optional[float]:
+        return self.accurate.rtf
+
+    def transcribe_batch(self, audios: List[np.ndarray]) -> List[str]:
+        return self.accurate.transcribe_batch(audios)
+
+    def stats(self) -> Dict[str, object]:
+        return {"fast": self.fast.stats(), "accurate": self.accurate.stats(),
+                "decodes": self.decodes, "escalations": self.escalations}
+
+    def transcribe_segments(self, audio: np.ndarray,
+                            prompt: Optional[str] = None) -> List[Segment]:
+        # Streaming partials are re-decoded over and over; keep them on one model
+        return self.accurate.transcribe_segments(audio, prompt)
+
+    def summary(self) -> str:
+        with self._stats_lock:
+            if not self.decodes:
+                return "no decodes yet"
+            rate = self.escalations / self.decodes * 100
+            fast_avg = self.fast_time / self.decodes
+            accurate_avg = self.accurate_time / self.escalations if self.escalations else 0.0
+            return (f"escalated {self.escalations}/{self.decodes} ({rate:.0f}%), "
+                    f"avg {fast_avg:.2f}s fast / {accurate_avg:.2f}s accurate")
+
+
+# Config keys build_engine() reads: everything needed to rebuild the same engine elsewhere
+ENGINE_CONFIG_KEYS = ("sttBackend", "sttComputeType", "sttDevice", "sttThreads", "whisperModel", "language",
+                      "sttEscalation", "whisperFastModel", "escalationMinAvgLogprob",
+                      "escalationMaxNoSpeechProb", "escalationMaxCompressionRatio")
+
+_engine = None
+_engine_key_current = None
+_engine_lock = threading.Lock()
+
+
+def _engine_key(config: dict) -> tuple:
+    # Only what decides which models are loaded; language and thresholds are set by apply_decode_options()
+    escalation = config.get("sttEscalation", False)
+    return (config.get("sttBackend", "whisper"), config.get("sttComputeType", "int8"),
+            config.get("sttDevice", "cpu"), config.get("sttThreads", 0),
+            config.get("whisperModel", "base"),
+            config.get("whisperFastModel", "tiny") if escalation else None)
+
+
+def _whisper_language(config: dict) -> str:
+    # Map language codes
+    return "uk" if config.get("language", "uk") == "uk" else "en"
+
+
+def apply_decode_options(engine, config: dict):
+    """Set the language and escalation thresholds from config on an engine, without reloading it"""
+    language = _whisper_language(config)
+    if isinstance(engine, TieredEngine):
+        engine.fast.language = engine.accurate.language = language
+        engine.min_avg_logprob = config.get("escalationMinAvgLogprob", -0.8)
+        engine.max_no_speech_prob = config.get("escalationMaxNoSpeechProb", 0.6)
+        engine.max_compression_ratio = config.get("escalationMaxCompressionRatio", 2.4)
+    else:
+        engine.language = language
+
+
+def build_engine(config: dict):
+    """Create a new (unloaded) engine for config, without touching the shared one"""
+    model = config.get("whisperModel", "base")
+    whisper_lang = _whisper_language(config)
+    if config.get("sttEscalation", False):
+        return TieredEngine(
+            create_backend(config, config.get("whisperFastModel", "tiny"), whisper_lang),
+            create_backend(config, model, whisper_lang),
+            min_avg_logprob=config.get("escalationMinAvgLogprob", -0.8),
+            max_no_speech_prob=config.get("escalationMaxNoSpeechProb", 0.6),
+            max_compression_ratio=config.get("escalationMaxCompressionRatio", 2.4),
+        )
+    return create_backend(config, model, whisper_lang)
+
+
+def get_engine(config: dict):
+    """
+    Return the shared engine for the configured backend, model and language
+
+    With sttEscalation enabled this is a TieredEngine that tries
+    whisperFastModel first and falls back to whisperModel.
+    """
+    global _engine, _engine_key_current
+
+    key = _engine_key(config)
+    with _engine_lock:
+        if _engine is None or _engine_key_current != key:
+            _engine = build_engine(config)
+            _engine_key_current = key
+        else:
+            apply_decode_options(_engine, config)
+        return _engine
+
+
+def swap_engine(config: dict, commit: Optional[Callable[[], None]] = None) -> bool:
+    """
+    Load the engine for config next to the current one, then make it the shared engine
+
+    The old engine keeps serving get_engine() callers until the new model
+    has loaded. ``commit`` runs under the same lock as the switch, so the
+    caller can replace its config dict without another thread seeing the
+    new config paired with the old engine. A change of language or
+    escalation thresholds alone is applied to the current engine in place.
+    Returns False if no new model was loaded.
+    """
+    global _engine, _engine_key_current
+
+    key = _engine_key(config)
+    with _engine_lock:
+        # Nothing loaded yet (e.g. STT daemon in use, which only reads the language): stay
+        # lazy; get_engine() builds the engine for the new config when it is first needed
+        unchanged = _engine is None or not _engine.loaded or _engine_key_current == key
+        if unchanged and _engine is not None:
+            apply_decode_options(_engine, config)
+        if unchanged and commit:
+            commit()
+    if unchanged:
+        return False
+
+    engine = build_engine(config)
+    engine.load()
+    with _engine_lock:
+        _engine, _engine_key_current = engine, key
+        if commit:
+            commit()
+    return True
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the capture buffer and the warm audio engine's pre-roll (no microphone needed)
+Run with: python3 -m pytest test_audio_capture.py
+"""
+
+import numpy as np
+
+from audio_capture import AudioEngine, PcmBuffer
+from stt_engine import SAMPLE_RATE
+
+
+def ramp(start: int, count: int) -> np.ndarray:
+    return np.arange(start, start + count, dtype=np.int16)
+
+
+def test_buffer_grows_past_its_initial_capacity():
+    buffer = PcmBuffer(seconds=0.01)
+    chunks = [ramp(start, 100) for start in range(0, 1000, 100)]
+    for chunk in chunks:
+        buffer.append(chunk.tobytes())
+    expected = np.concatenate(chunks)
+    assert len(buffer) == 1000 and buffer.chunks == 10
+    assert np.array_equal(buffer.samples(), expected)
+    assert np.allclose(buffer.float32(), expected / 32768.0)
+
+
+def test_cleared_buffer_keeps_its_allocation():
+    buffer = PcmBuffer(seconds=0.01)
+    buffer.append(ramp(0, 500).tobytes())
+    grown = buffer._int16
+    buffer.clear()
+    buffer.append(ramp(7, 3).tobytes())
+    assert buffer._int16 is grown
+    assert np.array_equal(buffer.samples(), ramp(7, 3))
+
+
+def test_preroll_is_the_most_recent_audio_in_order():
+    engine = AudioEngine(preroll_ms=100)
+    size = SAMPLE_RATE // 10
+    for start in range(0, 5000, 700):
+        engine._write_ring(ramp(start, 700))
+    assert np.array_equal(engine._preroll(), ramp(5600 - size, size))
+
+
+def test_short_preroll_before_the_ring_fills():
+    engine = AudioEngine(preroll_ms=100)
+    engine._write_ring(ramp(0, 300))
+    assert np.array_equal(engine._preroll(), ramp(0, 300))
+
+
+def test_preroll_reaches_consumers_before_capture_starts():
+    engine = AudioEngine(preroll_ms=100)
+    engine._write_ring(ramp(0, 1000))
+    seen = []
+    buffer = engine.begin(on_preroll=lambda pcm: seen.append((engine.capturing, pcm)))
+    # Live chunks only go to on_audio once capturing is set, so the pre-roll is always first
+    assert seen == [(False, ramp(0, 1000).tobytes())]
+    assert engine.capturing
+    assert np.array_equal(buffer.samples(), ramp(0, 1000))
+    # The next capture starts with an empty ring
+    engine.end()
+    assert len(engine.begin(on_preroll=seen.append)) == 0
+    assert len(seen) == 1
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Tests for batch transcription's file discovery and resuming
+Run with: python3 -m pytest test_batch_transcribe.py
+"""
+
+import json
+
+from batch_transcribe import completed_files, find_audio_files
+
+
+def test_resume_skips_finished_files_and_redoes_cut_lines(tmp_path):
+    output = tmp_path / "transcripts.jsonl"
+    output.write_text(json.dumps({"file": "/a.wav", "text": "one"}) + "\n"
+                      + json.dumps({"file": "/b.wav", "error": "RuntimeError: boom"}) + "\n"
+                      + '{"file": "/c.wav", "te')
+    assert completed_files(output) == {"/a.wav", "/b.wav"}
+    assert completed_files(output, retry_errors=True) == {"/a.wav"}
+
+
+def test_missing_output_means_nothing_done(tmp_path):
+    assert completed_files(tmp_path / "none.jsonl") == set()
+
+
+def test_only_audio_files_are_found(tmp_path):
+    for name in ("b.wav", "a.MP3", "notes.txt", "sub/c.flac"):
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"")
+    names = lambda files: [f[len(str(tmp_path.resolve())) + 1:] for f in files]
+    assert names(find_audio_files([str(tmp_path)])) == ["a.MP3", "b.wav"]
+    assert names(find_audio_files([str(tmp_path)], recursive=True)) == ["a.MP3", "b.wav", "sub/c.flac"]
+    assert names(find_audio_files([str(tmp_path / "*.wav")])) == ["b.wav"]
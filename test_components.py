@@ -15,20 +15,28 @@ with open(CONFIG_FILE) as f:
 def test_whisper():
     """Test Whisper installation"""
     print("🎤 Testing Whisper...")
+    if CONFIG.get("sttBackend", "whisper") == "faster-whisper":
+        try:
+            import faster_whisper
+            print(f"  ✅ faster-whisper {faster_whisper.__version__} is installed "
+                  f"(model: {CONFIG.get('whisperModel', 'base')}, {CONFIG.get('sttComputeType', 'int8')})")
+            return True
+        except ImportError:
+            print("  ❌ faster-whisper package not found")
+            print("     Run: pip3 install faster-whisper")
+            return False
     try:
-        result = subprocess.run(
-            ["whisper", "--help"],
-            capture_output=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            print("  ✅ Whisper CLI is installed")
+        import whisper
+        model = CONFIG.get("whisperModel", "base")
+        if model in whisper.available_models():
+            print(f"  ✅ Whisper package is installed (model: {model})")
             return True
         else:
-            print("  ❌ Whisper CLI not working")
+            print(f"  ❌ Unknown Whisper model: {model}")
+            print(f"     Available: {', '.join(whisper.available_models())}")
             return False
-    except FileNotFoundError:
-        print("  ❌ Whisper CLI not found")
+    except ImportError:
+        print("  ❌ Whisper package not found")
         print("     Run: pip3 install openai-whisper")
         return False
     except Exception as e:
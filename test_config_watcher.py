@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for reloading config.json while running
+Run with: python3 -m pytest test_config_watcher.py
+"""
+
+import json
+import os
+import threading
+
+from config_watcher import ConfigWatcher, changed_keys
+
+
+def test_changed_keys_covers_added_removed_and_edited():
+    old = {"language": "uk", "whisperModel": "base", "ttsSpeed": 1.0}
+    new = {"language": "en", "whisperModel": "base", "sttDaemon": True}
+    assert changed_keys(old, new) == {"language", "ttsSpeed", "sttDaemon"}
+    assert changed_keys(old, dict(old)) == set()
+
+
+def watcher_for(tmp_path, config, **kwargs):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(config))
+    calls = []
+    watcher = ConfigWatcher(path, config, lambda new, keys: calls.append((new, keys)), **kwargs)
+    return path, watcher, calls
+
+
+def test_only_real_changes_are_applied(tmp_path):
+    path, watcher, calls = watcher_for(tmp_path, {"language": "uk"})
+    assert watcher.check() == set() and calls == []
+    path.write_text(json.dumps({"language": "en"}))
+    assert watcher.check() == {"language"}
+    assert calls == [({"language": "en"}, {"language"})]
+    assert watcher.config == {"language": "en"}
+
+
+def test_invalid_json_keeps_the_previous_config(tmp_path):
+    path, watcher, calls = watcher_for(tmp_path, {"language": "uk"})
+    path.write_text('{"language": "en",')
+    assert watcher.check() == set()
+    assert calls == [] and watcher.config == {"language": "uk"}
+
+
+def test_failed_apply_is_retried_on_the_next_check(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"language": "uk"}))
+
+    def on_change(new, keys):
+        raise RuntimeError("engine busy")
+
+    watcher = ConfigWatcher(path, {"language": "uk"}, on_change)
+    path.write_text(json.dumps({"language": "en"}))
+    assert watcher.check() == {"language"}
+    assert watcher.config == {"language": "uk"}
+    assert watcher.check() == {"language"}
+
+
+def test_saving_the_file_triggers_a_reload(tmp_path):
+    path, watcher, _ = watcher_for(tmp_path, {"language": "uk"}, interval=0.02)
+    applied = threading.Event()
+    watcher.on_change = lambda new, keys: applied.set()
+    watcher.start()
+    try:
+        # Save by renaming a temp file, as many editors do
+        temp = tmp_path / "config.json.tmp"
+        temp.write_text(json.dumps({"language": "en", "ttsSpeed": 1.2}))
+        os.replace(temp, path)
+        assert applied.wait(2)
+    finally:
+        watcher.stop()
+    assert watcher.reloads == 1
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for dictation segmentation and the transcription backlog
+Run with: python3 -m pytest test_dictation.py
+"""
+
+import time
+
+import numpy as np
+
+from dictation import DictationSession, Segmenter, format_timestamp
+from stt_engine import SAMPLE_RATE
+from vad import VoiceActivityDetector
+
+RNG = np.random.default_rng(0)
+
+
+def tone(seconds: float, amplitude: int = 8000) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * 200 * t) * amplitude).astype(np.int16)
+
+
+def quiet(seconds: float) -> np.ndarray:
+    return RNG.normal(0, 30, int(SAMPLE_RATE * seconds)).astype(np.int16)
+
+
+def feed_all(segmenter: Segmenter, *parts: np.ndarray):
+    segments = []
+    for part in parts:
+        # Capture-sized chunks, not frame-aligned
+        for i in range(0, len(part), 1000):
+            segments.extend(segmenter.feed(part[i:i + 1000]))
+    return segments
+
+
+def test_format_timestamp():
+    assert format_timestamp(3725.9) == "01:02:05"
+
+
+def test_pauses_close_segments():
+    segmenter = Segmenter(VoiceActivityDetector(), pause_ms=500, max_seconds=25)
+    segments = feed_all(segmenter, quiet(1), tone(2), quiet(1), tone(1), quiet(1))
+    assert [s.number for s in segments] == [1, 2]
+    assert abs(segments[0].start - 0.8) < 0.1
+    assert abs(segments[1].start - 3.8) < 0.1
+    assert 2.0 <= segments[0].duration <= 2.6
+    assert segmenter.flush() is None
+
+
+def test_short_noise_is_not_a_segment():
+    segmenter = Segmenter(VoiceActivityDetector(min_speech_ms=250), pause_ms=500, max_seconds=25)
+    assert feed_all(segmenter, quiet(1), tone(0.06), quiet(1)) == []
+
+
+def test_long_speech_is_split_below_the_limit():
+    segmenter = Segmenter(VoiceActivityDetector(), pause_ms=500, max_seconds=5)
+    # A quieter dip inside the search window is where the cut should go
+    speech = np.concatenate((tone(4.2), tone(0.1, amplitude=1500), tone(3)))
+    segments = feed_all(segmenter, quiet(0.5), speech)
+    segments.append(segmenter.flush())
+    assert len(segments) == 2
+    assert all(s.duration <= 5 for s in segments)
+    assert abs(segments[1].start - (segments[0].start + segments[0].duration)) < 0.05
+    assert abs(segments[0].start + segments[0].duration - 4.7) < 0.15
+
+
+def test_open_segment_is_flushed_at_the_end():
+    segmenter = Segmenter(VoiceActivityDetector(), pause_ms=500, max_seconds=25)
+    assert feed_all(segmenter, quiet(0.5), tone(1.5)) == []
+    last = segmenter.flush()
+    assert last is not None and last.duration >= 1.5
+
+
+class SlowEngine:
+    """Stand-in STT engine that falls behind real time"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe_segments(self, audio, prompt=None):
+        self.calls += 1
+        time.sleep(0.02)
+        return [(0.0, 1.0, f"segment {self.calls}")]
+
+
+def test_backlog_is_parked_on_disk_not_dropped(tmp_path):
+    session = DictationSession(SlowEngine(), Segmenter(VoiceActivityDetector(), pause_ms=300),
+                               tmp_path / "dictation.txt", max_pending=2)
+    session.start()
+    session.feed(quiet(0.5).tobytes())
+    for _ in range(12):
+        session.feed(tone(1).tobytes())
+        session.feed(quiet(0.5).tobytes())
+    session.finish()
+
+    lines = [line for line in (tmp_path / "dictation.txt").read_text().splitlines() if line.startswith("[")]
+    assert [line.split("] ")[1] for line in lines] == [f"segment {i}" for i in range(1, 13)]
+    assert session.spool.spooled > 0
+    # Spooled files are removed once transcribed, and the spool directory with them
+    assert not (tmp_path / "dictation.spool").exists()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests for OpenClawClient subscriptions and streamed replies (against the mock gateway)
+Run with: python3 -m pytest test_openclaw_client.py
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from mock_gateway import MockGateway
+from openclaw_client import AgentError, BackgroundClient, OpenClawClient
+from pipeline import CancelToken
+
+
+def event(run_id=None, delta="x"):
+    payload = {"stream": "assistant", "data": {"delta": delta}}
+    if run_id:
+        payload["runId"] = run_id
+    return {"type": "event", "event": "agent", "payload": payload}
+
+
+def test_full_subscription_drops_instead_of_waiting():
+    async def run():
+        client = OpenClawClient()
+        newest = client.subscribe("agent", maxsize=2)
+        oldest = client.subscribe("agent", maxsize=2, drop_oldest=True)
+        # Nobody reads either subscription; the reader must not stall
+        for i in range(5):
+            await asyncio.wait_for(client._dispatch_event(event(delta=str(i))), 0.5)
+        return ([newest.get_nowait()["payload"]["data"]["delta"] for _ in range(2)], newest.dropped,
+                [oldest.get_nowait()["payload"]["data"]["delta"] for _ in range(2)], oldest.dropped)
+
+    assert asyncio.run(run()) == (["0", "1"], 3, ["3", "4"], 3)
+
+
+def test_closed_subscription_ends_iteration_and_ignores_events():
+    async def run():
+        client = OpenClawClient()
+        sub = client.subscribe("agent", maxsize=2)
+        await client._dispatch_event(event())
+        sub.close()
+        await client._dispatch_event(event())
+        return [item async for item in sub], client.unhandled_events
+
+    received, unhandled = asyncio.run(run())
+    assert len(received) == 1
+    assert unhandled == 1
+
+
+def test_events_without_run_id_go_to_a_lone_stream_only():
+    client = OpenClawClient()
+    client.run_ids["a"] = "run-a"
+    client.active_streams = 1
+    assert client._is_for_request("a", event())
+    assert client._is_for_request("a", event("run-a"))
+    assert not client._is_for_request("a", event("run-b"))
+    client.active_streams = 2
+    assert not client._is_for_request("a", event())
+
+
+def with_gateway(test, **options):
+    async def run():
+        gateway = MockGateway(**{"port": 0, "latency": 0.05, "jitter": 0, "seed": 1, **options})
+        await gateway.start()
+        client = OpenClawClient(gateway.url)
+        try:
+            assert await client.connect()
+            return await test(client, gateway)
+        finally:
+            await client.disconnect()
+            await gateway.stop()
+    return asyncio.run(run())
+
+
+async def collect(client, text, timeout=5):
+    return [delta async for delta in client.stream_message(text, timeout=timeout)]
+
+
+def test_stream_message_yields_the_whole_reply():
+    async def test(client, gateway):
+        return await collect(client, "hello"), gateway._reply()
+
+    deltas, reply = with_gateway(test)
+    assert len(deltas) > 1
+    assert "".join(deltas) == reply
+
+
+def test_concurrent_streams_get_only_their_own_deltas():
+    async def test(client, gateway):
+        results = await asyncio.gather(*(collect(client, f"question {i}") for i in range(3)))
+        return results, gateway._reply(), client.active_streams
+
+    results, reply, active = with_gateway(test)
+    assert all("".join(deltas) == reply for deltas in results)
+    assert active == 0
+
+
+def test_gateway_error_raises():
+    async def test(client, gateway):
+        with pytest.raises(AgentError):
+            await collect(client, "hello")
+
+    with_gateway(test, error_rate=1.0)
+
+
+def test_slow_run_times_out_and_is_aborted():
+    async def test(client, gateway):
+        with pytest.raises(TimeoutError):
+            await collect(client, "hello", timeout=0.3)
+        # The abort is sent in the background once the stream gives up
+        for _ in range(50):
+            if gateway.aborted:
+                break
+            await asyncio.sleep(0.02)
+        return gateway.aborted
+
+    assert with_gateway(test, latency=5) == 1
+
+
+class GatewayThread:
+    """A mock gateway on its own event loop, as the real one runs in another process"""
+
+    def __init__(self, **options):
+        self.gateway = MockGateway(**{"port": 0, "latency": 0.05, "jitter": 0, "seed": 1, **options})
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.call(self.gateway.start())
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(5)
+
+    def close(self):
+        self.call(self.gateway.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+@pytest.fixture
+def background():
+    server = GatewayThread(latency=0.3)
+    client = BackgroundClient(server.gateway.url, min_backoff=0.05, max_backoff=0.2)
+    client.start()
+    assert client.wait_connected(5)
+    yield server, client
+    client.stop()
+    server.close()
+
+
+def test_background_client_streams_on_the_calling_thread(background):
+    server, client = background
+    deltas = list(client.stream_message("hello", timeout=5))
+    assert "".join(deltas) == server.gateway._reply()
+    assert client.send_message("hello again", timeout=5) == server.gateway._reply()
+
+
+def test_cancelling_a_background_stream_aborts_the_run(background):
+    server, client = background
+    token = CancelToken()
+    stream = client.stream_message("hello", timeout=5, cancel_token=token)
+    with pytest.raises(concurrent.futures.CancelledError):
+        for _ in stream:
+            token.cancel()
+    for _ in range(50):
+        if server.gateway.aborted:
+            break
+        threading.Event().wait(0.02)
+    assert server.gateway.aborted == 1
+
+
+def test_background_client_reconnects_after_a_drop(background):
+    server, client = background
+    port = server.gateway.port
+    server.call(server.gateway.stop())
+    server.gateway.port = port
+    server.call(server.gateway.start())
+    for _ in range(100):
+        if client.reconnects and client.connected:
+            break
+        threading.Event().wait(0.05)
+    assert client.reconnects == 1 and client.connected
+    assert client.send_message("after the drop", timeout=5) == server.gateway._reply()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the staged worker pipeline (ordering, dropping, errors, cancellation)
+Run with: python3 -m pytest test_pipeline.py
+"""
+
+import threading
+import time
+
+from pipeline import CancelToken, Pipeline, Stage
+
+
+class Item:
+    def __init__(self, number: int):
+        self.number = number
+        self.cancel_token = CancelToken()
+        self.seen = []
+
+
+def record(name: str, delay: float = 0.0):
+    def func(item):
+        time.sleep(delay)
+        item.seen.append(name)
+        return item
+    return func
+
+
+def run(stages, items, on_done):
+    pipeline = Pipeline(stages, on_done=on_done)
+    pipeline.start()
+    for item in items:
+        pipeline.submit(item)
+    pipeline.stop()
+    return pipeline
+
+
+def test_items_leave_in_submission_order():
+    done = []
+    items = [Item(i) for i in range(10)]
+    run([Stage("stt", record("stt", 0.002)), Stage("agent", record("agent")), Stage("tts", record("tts", 0.001))],
+        items, done.append)
+    assert [item.number for item in done] == list(range(10))
+    assert all(item.seen == ["stt", "agent", "tts"] for item in done)
+
+
+def test_dropped_and_failed_items_are_reported_once():
+    def stt(item):
+        if item.number == 1:
+            return None
+        if item.number == 2:
+            raise ValueError("bad audio")
+        return item
+
+    done = []
+    pipeline = run([Stage("stt", stt), Stage("tts", record("tts"))], [Item(i) for i in range(4)], done.append)
+    assert sorted(item.number for item in done) == [0, 1, 2, 3]
+    assert [item.number for item in done if item.seen] == [0, 3]
+    stats = pipeline.stats()["stt"]
+    assert stats["dropped"] == 2 and stats["errors"] == 1
+
+
+def test_cancel_from_reaches_active_and_queued_items():
+    started = threading.Event()
+    release = threading.Event()
+
+    def agent(item):
+        started.set()
+        release.wait(2)
+        # A cancelled item still finishes its current step
+        return item
+
+    done = []
+    pipeline = Pipeline([Stage("stt", record("stt")), Stage("agent", agent), Stage("tts", record("tts"))],
+                        on_done=done.append)
+    pipeline.start()
+    first, second = Item(0), Item(1)
+    pipeline.submit(first)
+    started.wait(2)
+    pipeline.submit(second)
+    time.sleep(0.05)
+
+    cancelled = pipeline.cancel_from("agent")
+    assert {item.number for item in cancelled} == {0, 1}
+    # Cancelling again returns nothing new
+    assert pipeline.cancel_from("stt") == []
+    release.set()
+    pipeline.stop()
+
+    assert sorted(item.number for item in done) == [0, 1]
+    assert "tts" not in first.seen and "tts" not in second.seen
+    assert pipeline.stats()["tts"]["cancelled"] == 1
+    assert pipeline.stats()["agent"]["cancelled"] == 1
+
+
+def test_cancel_callbacks_run_once():
+    token = CancelToken()
+    calls = []
+    token.add_callback(lambda: calls.append("first"))
+    assert token.cancel()
+    assert not token.cancel()
+    # Added after the cancel: runs straight away
+    token.add_callback(lambda: calls.append("late"))
+    assert calls == ["first", "late"]
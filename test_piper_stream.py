@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming Piper: splitting the raw PCM stream into sentences, and caching it
+Run with: python3 -m pytest test_piper_stream.py
+"""
+
+import os
+import stat
+import sys
+import textwrap
+
+import numpy as np
+import pytest
+
+from piper_stream import DEFAULT_SAMPLE_RATE, PiperStreamEngine, PiperWorker
+from tts_cache import CachedEngine, SpeechCache
+
+# Stands in for `piper --output_raw`: each line of stdin becomes 0.1 s of audio per word, every
+# sample set to the line's number. The audio is written in odd-sized pieces, and the RTF line
+# goes to stderr before the last piece, as real Piper can interleave them.
+FAKE_PIPER = textwrap.dedent("""\
+    #!{python}
+    import sys, time
+    count = 0
+    for line in sys.stdin:
+        with open({log!r}, "a") as log:
+            log.write(line)
+        if line.strip() == "crash":
+            sys.stderr.write("[error] voice crashed\\n")
+            sys.exit(3)
+        count += 1
+        samples = 2205 * len(line.split())
+        pcm = count.to_bytes(2, "little") * samples
+        cut = len(pcm) // 3 + 1
+        sys.stdout.buffer.write(pcm[:cut])
+        sys.stdout.buffer.flush()
+        sys.stderr.write(f"[info] Real-time factor: 0.1 (infer=0.01 sec, audio={{samples / {rate}}} sec)\\n")
+        sys.stderr.flush()
+        time.sleep(0.02)
+        sys.stdout.buffer.write(pcm[cut:])
+        sys.stdout.buffer.flush()
+""")
+
+
+@pytest.fixture
+def piper(tmp_path):
+    path = tmp_path / "piper"
+    log = tmp_path / "lines.txt"
+    path.write_text(FAKE_PIPER.format(python=sys.executable, log=str(log), rate=DEFAULT_SAMPLE_RATE))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path), log
+
+
+def samples(clip) -> np.ndarray:
+    return np.frombuffer(b"".join(clip._audio), dtype=np.int16)
+
+
+def test_stream_is_split_at_sentence_boundaries(piper, tmp_path):
+    binary, _log = piper
+    worker = PiperWorker(binary, str(tmp_path / "voice.onnx"), output="null")
+    clips = [worker.submit(text) for text in ("One two three.", "Four.", "Five six.")]
+    for clip in clips:
+        clip.drain()
+    worker.close()
+
+    for number, (clip, words) in enumerate(zip(clips, (3, 1, 2)), start=1):
+        assert clip.error is None
+        audio = samples(clip)
+        assert len(audio) == 2205 * words
+        assert (audio == number).all()
+        assert clip.infer_seconds == pytest.approx(0.01)
+    assert worker.stats()["clips"] == 3
+
+
+def test_piper_exit_fails_the_queued_clips(piper, tmp_path):
+    binary, _log = piper
+    worker = PiperWorker(binary, str(tmp_path / "voice.onnx"), output="null")
+    ok = worker.submit("Fine.")
+    crashed = worker.submit("crash")
+    ok.drain()
+    with pytest.raises(RuntimeError, match="voice crashed"):
+        crashed.drain()
+    assert (samples(ok) == 1).all()
+
+
+def test_streamed_sentences_are_cached_and_replayed(piper, tmp_path):
+    binary, log = piper
+    engine = PiperStreamEngine(binary, str(tmp_path / "voice.onnx"), output="null")
+    cache = SpeechCache(str(tmp_path / "cache"))
+    cached = CachedEngine(engine, cache)
+    try:
+        first = cached.synthesize("Hello there.")
+        first.drain()
+        second = cached.synthesize("hello  there.")
+        second.drain()
+    finally:
+        engine.close()
+
+    # The second request never reached Piper
+    assert log.read_text().splitlines() == ["Hello there."]
+    assert samples(second).tobytes() == samples(first).tobytes()
+    assert cache.stats()["memoryHits"] == 1
+    assert [p.suffix for p in (tmp_path / "cache").iterdir()] == [".pcm"]
+
+
+def test_failed_sentence_is_not_cached(piper, tmp_path):
+    binary, _log = piper
+    engine = PiperStreamEngine(binary, str(tmp_path / "voice.onnx"), output="null")
+    cache = SpeechCache(str(tmp_path / "cache"))
+    try:
+        with pytest.raises(RuntimeError):
+            CachedEngine(engine, cache).synthesize("crash").drain()
+    finally:
+        engine.close()
+    assert not os.listdir(tmp_path / "cache")
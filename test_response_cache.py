@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the agent response cache (TTL, LRU eviction, bypass phrases)
+Run with: python3 -m pytest test_response_cache.py
+"""
+
+import time
+
+from response_cache import ResponseCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  What's on my  Calendar? ") == "whats on my calendar"
+
+
+def test_hit_ignores_case_and_punctuation():
+    cache = ResponseCache()
+    cache.put("What's the weather?", "42", "telegram", "Sunny")
+    reply, age = cache.get("whats the weather", "42", "telegram")
+    assert reply == "Sunny" and age >= 0
+    assert cache.get("whats the weather", "43", "telegram") is None
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl=0.05)
+    cache.put("hello", None, "telegram", "Hi")
+    time.sleep(0.1)
+    assert cache.get("hello", None, "telegram") is None
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["items"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = ResponseCache(max_items=2)
+    cache.put("one", None, "telegram", "1")
+    cache.put("two", None, "telegram", "2")
+    # Touching "one" makes "two" the oldest
+    assert cache.get("one", None, "telegram")
+    cache.put("three", None, "telegram", "3")
+    assert cache.get("two", None, "telegram") is None
+    assert cache.get("one", None, "telegram")[0] == "1"
+    assert cache.get("three", None, "telegram")[0] == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_bypass_matches_whole_words_only():
+    cache = ResponseCache(bypass_phrases=["now", "What time is it"])
+    assert cache.bypassed_by("do you know my schedule") is None
+    assert cache.bypassed_by("what is on right now") == "now"
+    assert cache.bypassed_by("tell me what time is it please") == "what time is it"
+    assert cache.bypassed_by("what time is italy in") is None
+
+    cache.put("do you know my schedule", None, "telegram", "Yes")
+    assert cache.get("do you know my schedule", None, "telegram")[0] == "Yes"
+    cache.put("what's on now", None, "telegram", "News")
+    assert cache.get("what's on now", None, "telegram") is None
+    assert cache.stats()["bypassed"] == 1
+
+
+def test_empty_reply_is_not_stored():
+    cache = ResponseCache()
+    cache.put("hello", None, "telegram", "")
+    assert cache.get("hello", None, "telegram") is None
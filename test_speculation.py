@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for speculative agent requests: when they are sent, resolved and counted
+Run with: python3 -m pytest test_speculation.py
+"""
+
+import threading
+
+import numpy as np
+
+from speculation import SpeculationStats, Speculator
+from stt_engine import SAMPLE_RATE
+from vad import VoiceActivityDetector
+
+RNG = np.random.default_rng(0)
+
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * 200 * t) * 8000).astype(np.int16)
+
+
+def quiet(seconds: float) -> np.ndarray:
+    return RNG.normal(0, 30, int(SAMPLE_RATE * seconds)).astype(np.int16)
+
+
+class FakeAgent:
+    """Streams one delta, then answers once released (None if the run was cancelled)"""
+
+    def __init__(self):
+        self.asked = []
+        self.release = threading.Event()
+
+    def __call__(self, text, on_delta, cancel_token):
+        self.asked.append(text)
+        on_delta("Sure. ")
+        self.release.wait(2)
+        return None if cancel_token.cancelled else f"Answer to {text}"
+
+
+def paused_speculator(agent, stats, **kwargs) -> Speculator:
+    speculator = Speculator(agent, stats, VoiceActivityDetector(), end_silence_ms=300, **kwargs)
+    speculator.feed_audio(quiet(0.3))
+    speculator.feed_audio(tone(1))
+    speculator.feed_audio(quiet(0.5))
+    return speculator
+
+
+def test_nothing_is_sent_while_still_talking():
+    agent = FakeAgent()
+    speculator = Speculator(agent, SpeculationStats(), VoiceActivityDetector(), end_silence_ms=300)
+    speculator.feed_audio(tone(1))
+    speculator.observe("what is the weather", unchanged_for=5)
+    assert agent.asked == [] and speculator.current is None
+
+
+def test_matching_final_transcript_uses_the_early_reply():
+    agent, stats = FakeAgent(), SpeculationStats()
+    speculator = paused_speculator(agent, stats)
+    speculator.observe("What is the weather", unchanged_for=0.2)
+    assert agent.asked == []
+    speculator.observe("What is the weather", unchanged_for=1.0)
+    assert agent.asked == ["What is the weather"]
+
+    speculation = speculator.resolve("what is the weather?")
+    assert speculation is not None
+    deltas = []
+    speculation.attach(deltas.append)
+    agent.release.set()
+    assert speculation.result() == "Answer to What is the weather"
+    assert deltas == ["Sure. "]
+    assert speculator.settle(speculation) >= 0
+    assert (stats.hits, stats.misses, stats.requests) == (1, 0, 1)
+
+
+def test_mismatch_is_cancelled_and_counted():
+    agent, stats = FakeAgent(), SpeculationStats()
+    speculator = paused_speculator(agent, stats)
+    speculator.observe("turn on the", unchanged_for=1.0)
+    assert speculator.resolve("turn on the lights") is None
+    assert (stats.hits, stats.misses) == (0, 1)
+    agent.release.set()
+
+
+def test_replaced_speculation_counts_as_a_miss():
+    agent, stats = FakeAgent(), SpeculationStats()
+    speculator = paused_speculator(agent, stats, max_requests=2)
+    speculator.observe("set a timer", unchanged_for=1.0)
+    first = speculator.current
+    speculator.observe("set a timer for ten minutes", unchanged_for=1.0)
+    second = speculator.current
+    assert first.cancel_token.cancelled and second is not first
+    assert stats.misses == 1 and stats.requests == 2
+    assert speculator.resolve("set a timer for ten minutes") is second
+    agent.release.set()
+
+
+def test_speech_resuming_cancels_the_request():
+    agent, stats = FakeAgent(), SpeculationStats()
+    speculator = paused_speculator(agent, stats)
+    speculator.observe("remind me", unchanged_for=1.0)
+    speculation = speculator.current
+    speculator.feed_audio(tone(0.3))
+    assert speculation.cancel_token.cancelled and speculator.current is None
+    assert stats.misses == 1
+    agent.release.set()
+
+
+def test_failed_reply_settles_as_a_miss():
+    agent, stats = FakeAgent(), SpeculationStats()
+    speculator = paused_speculator(agent, stats)
+    speculator.observe("what time", unchanged_for=1.0)
+    speculation = speculator.resolve("what time")
+    speculation.cancel()
+    agent.release.set()
+    assert speculation.result() is None
+    assert speculator.settle(speculation) == 0.0
+    assert (stats.hits, stats.misses) == (0, 1)
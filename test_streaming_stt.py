@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming transcription: committing finished segments and decoding the tail
+Run with: python3 -m pytest test_streaming_stt.py
+"""
+
+from stt_engine import SAMPLE_RATE
+from streaming_stt import BYTES_PER_SAMPLE, StreamingTranscriber
+
+BYTES_PER_SECOND = SAMPLE_RATE * BYTES_PER_SAMPLE
+
+
+class FakeEngine:
+    """Returns preset segments and remembers what it was asked to decode"""
+
+    def __init__(self, segments=()):
+        self.segments = list(segments)
+        self.calls = []
+
+    def transcribe_segments(self, audio, prompt=None):
+        self.calls.append((len(audio), prompt))
+        return self.segments
+
+
+def silence(seconds: float) -> bytes:
+    return bytes(int(seconds * BYTES_PER_SECOND))
+
+
+def test_finished_segments_are_committed_and_their_audio_dropped():
+    streamer = StreamingTranscriber(FakeEngine(), window=4.0)
+    streamer.feed(silence(5))
+    streamer._decoded_bytes = len(streamer._pcm)
+    streamer._commit([(0.0, 2.0, "One."), (2.0, 3.5, "Two."), (3.5, 5.0, "Three")], streamer._decoded_bytes)
+    assert streamer.committed == ["One.", "Two."]
+    # The last segment's audio stays for the next pass
+    assert len(streamer._pcm) == 1.5 * BYTES_PER_SECOND
+    assert streamer._decoded_bytes == 1.5 * BYTES_PER_SECOND
+
+
+def test_one_unbroken_segment_waits_until_twice_the_window():
+    streamer = StreamingTranscriber(FakeEngine(), window=4.0)
+    streamer.feed(silence(6))
+    streamer._commit([(0.0, 6.0, "Still talking")], len(streamer._pcm))
+    assert streamer.committed == [] and len(streamer._pcm) == 6 * BYTES_PER_SECOND
+
+    streamer.feed(silence(2))
+    streamer._commit([(0.0, 8.0, "Still talking")], len(streamer._pcm))
+    assert streamer.committed == ["Still talking"] and len(streamer._pcm) == 0
+
+
+def test_finish_decodes_the_tail_after_the_committed_text():
+    engine = FakeEngine([(0.0, 1.0, "and the tail.")])
+    streamer = StreamingTranscriber(engine)
+    streamer.committed = ["The committed part"]
+    streamer.feed(silence(1))
+    assert streamer.finish() == "The committed part and the tail."
+    assert engine.calls == [(SAMPLE_RATE, "The committed part")]
+
+
+def test_tail_too_short_to_decode_is_skipped():
+    engine = FakeEngine([(0.0, 0.05, "noise")])
+    streamer = StreamingTranscriber(engine)
+    streamer.feed(silence(0.05))
+    assert streamer.finish() == ""
+    assert engine.calls == []
+
+
+def test_partials_report_how_long_the_hypothesis_held():
+    seen = []
+    streamer = StreamingTranscriber(FakeEngine(), on_partial=lambda text, held: seen.append((text, held)))
+    streamer._update_partial([(0.0, 1.0, "hello")])
+    streamer._hypothesis_since -= 1.0
+    streamer._update_partial([(0.0, 1.0, "hello")])
+    streamer._update_partial([(0.0, 1.0, "hello there")])
+    assert [text for text, _ in seen] == ["hello", "hello", "hello there"]
+    assert seen[1][1] >= 1.0
+    assert seen[2][1] < 1.0
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the STT daemon: batching, admission control, served models and the wire format
+Run with: python3 -m pytest test_stt_daemon.py
+"""
+
+import json
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+import stt_daemon
+from stt_daemon import (MAX_SAMPLES, DaemonStats, ModelWorker, OverloadedError, SttDaemon,
+                        UnknownModelError)
+
+
+class FakeEngine:
+    """Returns each clip's length; blocks while ``gate`` is clear"""
+
+    def __init__(self, model_name: str = "base"):
+        self.model_name = model_name
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+        self.calls = []
+
+    def load(self):
+        pass
+
+    def transcribe(self, audio):
+        self.started.set()
+        self.gate.wait(5)
+        self.calls.append(1)
+        return str(len(audio))
+
+    def transcribe_batch(self, audios):
+        self.calls.append(len(audios))
+        return [str(len(audio)) for audio in audios]
+
+
+def clip(samples: int) -> np.ndarray:
+    return np.zeros(samples, dtype=np.float32)
+
+
+def daemon_with(engine: FakeEngine, **kwargs) -> SttDaemon:
+    daemon = SttDaemon({"whisperModel": "base"}, **kwargs)
+    daemon.workers[("base", "uk")] = ModelWorker(engine, daemon.window, daemon.max_batch, daemon.stats)
+    return daemon
+
+
+def test_jobs_arriving_together_are_decoded_as_one_batch():
+    engine = FakeEngine()
+    worker = ModelWorker(engine, window=0.2, max_batch=8, stats=DaemonStats())
+    jobs = [stt_daemon.Job(clip(n)) for n in (100, 200, 300)]
+    for job in jobs:
+        worker.queue.put(job)
+    for job in jobs:
+        assert job.done.wait(2)
+    assert engine.calls == [3]
+    assert [job.result["text"] for job in jobs] == ["100", "200", "300"]
+    assert all(job.result["batchSize"] == 3 for job in jobs)
+
+
+def test_lone_job_gets_the_full_decoder():
+    engine = FakeEngine()
+    worker = ModelWorker(engine, window=0.01, max_batch=8, stats=DaemonStats())
+    job = stt_daemon.Job(clip(50))
+    worker.queue.put(job)
+    assert job.done.wait(2)
+    assert engine.calls == [1] and job.result["text"] == "50"
+
+
+def test_requests_beyond_the_queue_limit_are_refused():
+    engine = FakeEngine()
+    engine.gate.clear()
+    daemon = daemon_with(engine, window=0.01, max_queue=2)
+    first = daemon.submit(clip(10), "base", "uk")
+    assert engine.started.wait(2)
+    waiting = [daemon.submit(clip(10), "base", "uk") for _ in range(2)]
+    with pytest.raises(OverloadedError):
+        daemon.submit(clip(10), "base", "uk")
+    engine.gate.set()
+    for job in [first] + waiting:
+        assert job.done.wait(2) and job.result["ok"]
+    assert daemon.stats.rejected == 1
+
+
+def test_only_configured_models_are_served(monkeypatch):
+    monkeypatch.setattr(stt_daemon, "create_backend", lambda *args: pytest.fail("must not load"))
+    daemon = SttDaemon({"whisperModel": "base"})
+    with pytest.raises(UnknownModelError):
+        daemon.worker("large-v3", "uk")
+    with pytest.raises(UnknownModelError):
+        daemon.worker("base", "xx")
+
+
+def test_loading_a_model_does_not_block_loaded_ones(monkeypatch):
+    slow = FakeEngine("small")
+    loading = threading.Event()
+    release = threading.Event()
+
+    def create_backend(config, model, language):
+        loading.set()
+        release.wait(5)
+        return slow
+
+    monkeypatch.setattr(stt_daemon, "create_backend", create_backend)
+    engine = FakeEngine()
+    daemon = daemon_with(engine, models=["base", "small"])
+    loader = threading.Thread(target=daemon.worker, args=("small", "uk"))
+    loader.start()
+    assert loading.wait(2)
+    job = daemon.submit(clip(10), "base", "uk")
+    assert job.done.wait(2)
+    release.set()
+    loader.join(2)
+    assert daemon.workers[("small", "uk")].engine is slow
+
+
+def test_oversized_payload_is_refused_before_it_is_read(tmp_path):
+    path = str(tmp_path / "stt.sock")
+    server = stt_daemon._Server(path, stt_daemon._Handler)
+    server.stt = daemon_with(FakeEngine())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            sock.sendall((json.dumps({"op": "transcribe", "samples": MAX_SAMPLES + 1}) + "\n").encode())
+            reply = json.loads(sock.makefile("rb").readline())
+        assert not reply["ok"] and "samples" in reply["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
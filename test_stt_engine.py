@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared STT engine: hot swaps, decode options and tier escalation
+Run with: python3 -m pytest test_stt_engine.py
+"""
+
+import pytest
+
+import stt_engine
+from stt_engine import TieredEngine, get_engine, swap_engine
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine():
+    stt_engine._engine = stt_engine._engine_key_current = None
+    yield
+    stt_engine._engine = stt_engine._engine_key_current = None
+
+
+def test_unloaded_engine_is_not_loaded_by_a_swap():
+    # With sttDaemon on, the hotkey process builds the engine only to read its language
+    config = {"whisperModel": "base", "language": "uk"}
+    engine = get_engine(config)
+    committed = []
+    assert not swap_engine({"whisperModel": "small", "language": "en"}, commit=lambda: committed.append(True))
+    assert committed == [True]
+    assert not engine.loaded
+    assert engine.language == "en"
+
+    replacement = get_engine({"whisperModel": "small", "language": "en"})
+    assert replacement is not engine and not replacement.loaded
+    assert replacement.model_name == "small"
+
+
+def test_language_and_thresholds_change_in_place():
+    config = {"whisperModel": "base", "language": "uk", "sttEscalation": True}
+    engine = get_engine(config)
+    assert isinstance(engine, TieredEngine)
+    edited = dict(config, language="en", escalationMinAvgLogprob=-0.5, escalationMaxNoSpeechProb=0.4)
+    assert get_engine(edited) is engine
+    assert engine.fast.language == engine.accurate.language == "en"
+    assert engine.min_avg_logprob == -0.5 and engine.max_no_speech_prob == 0.4
+
+
+def test_model_change_builds_a_new_engine():
+    engine = get_engine({"whisperModel": "base"})
+    assert get_engine({"whisperModel": "small"}) is not engine
+
+
+class FakeTier:
+    def __init__(self, model_name: str, scores=None):
+        self.model_name = model_name
+        self.scores = scores
+        self.calls = 0
+
+    def transcribe_scored(self, audio):
+        self.calls += 1
+        return self.model_name, self.scores
+
+    def transcribe(self, audio):
+        self.calls += 1
+        return self.model_name
+
+
+CONFIDENT = {"avg_logprob": -0.3, "no_speech_prob": 0.1, "compression_ratio": 1.5}
+
+
+def test_unreliable_scores_give_their_reasons():
+    engine = TieredEngine(FakeTier("base"), FakeTier("small"))
+    assert engine.escalation_reasons(CONFIDENT) == []
+    doubtful = {"avg_logprob": -1.2, "no_speech_prob": 0.7, "compression_ratio": 2.8}
+    assert engine.escalation_reasons(doubtful) == ["avg_logprob -1.20", "no_speech_prob 0.70",
+                                                   "compression_ratio 2.80"]
+    # Thresholds are exclusive
+    at_limits = {"avg_logprob": -0.8, "no_speech_prob": 0.6, "compression_ratio": 2.4}
+    assert engine.escalation_reasons(at_limits) == []
+
+
+def test_only_doubtful_utterances_reach_the_accurate_model():
+    fast, accurate = FakeTier("base", CONFIDENT), FakeTier("small")
+    engine = TieredEngine(fast, accurate)
+    assert engine.transcribe(None) == "base"
+    fast.scores = dict(CONFIDENT, avg_logprob=-1.5)
+    assert engine.transcribe(None) == "small"
+    assert (fast.calls, accurate.calls) == (2, 1)
+    assert (engine.decodes, engine.escalations) == (2, 1)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for latency traces: log rotation, reading the log back and percentiles
+Run with: python3 -m pytest test_tracing.py
+"""
+
+import json
+
+from tracing import Trace, TraceLog, log_files, parse_window, percentile, read_records, stage_durations
+
+
+def write_traces(log: TraceLog, count: int):
+    for utterance in range(count):
+        trace = Trace(utterance, origin=0.0)
+        trace.add("stt", 1.0, 1.5)
+        log.write(trace, "ok")
+
+
+def test_log_rotates_and_keeps_only_the_backups(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    log = TraceLog(str(path), max_bytes=150, backups=2)
+    write_traces(log, 10)
+    files = log_files(str(path))
+    assert [p.name for p in files] == ["metrics.jsonl.2", "metrics.jsonl.1", "metrics.jsonl"]
+    assert all(p.stat().st_size <= 150 for p in files)
+    # Oldest first, and the earliest utterances were rotated away
+    utterances = [record["utterance"] for record in read_records(files)]
+    assert utterances == sorted(utterances) and utterances[-1] == 9 and utterances[0] > 0
+
+
+def test_malformed_and_old_lines_are_skipped(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    path.write_text(json.dumps({"ts": 10, "spans": {}}) + "\nnot json\n"
+                    + json.dumps({"ts": 20, "spans": {}}) + "\n")
+    assert [record["ts"] for record in read_records([path])] == [10, 20]
+    assert [record["ts"] for record in read_records([path], since=15)] == [20]
+
+
+def test_percentiles_interpolate_between_samples():
+    values = [4.0, 1.0, 3.0, 2.0]
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 0) == 1.0 and percentile(values, 100) == 4.0
+    assert percentile([7.0], 95) == 7.0
+
+
+def test_marks_are_reported_from_the_hotkey_press():
+    trace = Trace(1, origin=100.0)
+    trace.add("stt", 100.5, 101.25)
+    trace.mark("first_audio", at=102.0)
+    durations = stage_durations([trace.to_record("ok")])
+    assert durations == {"stt": [0.75], "hotkey→first_audio": [2.0]}
+
+
+def test_window_units():
+    assert parse_window("90s") == 90 and parse_window("15m") == 900
+    assert parse_window("2h") == 7200 and parse_window("30") == 30
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthesized speech cache (disk trimming, memory LRU, keys)
+Run with: python3 -m pytest test_tts_cache.py
+"""
+
+import os
+import time
+from types import SimpleNamespace
+
+from tts_cache import SpeechCache
+
+
+def age(cache: SpeechCache, key: str, seconds: float):
+    then = time.time() - seconds
+    os.utime(cache._path(key, ".pcm"), (then, then))
+
+
+def test_disk_is_trimmed_least_recently_used_first(tmp_path):
+    cache = SpeechCache(str(tmp_path), max_disk_bytes=250)
+    cache.put_bytes("a", ".pcm", bytes(100))
+    cache.put_bytes("b", ".pcm", bytes(100))
+    age(cache, "a", 100)
+    age(cache, "b", 50)
+    # Playing "a" makes "b" the oldest file
+    assert cache.get("a", ".pcm") is not None
+    cache.put_bytes("c", ".pcm", bytes(100))
+    assert sorted(p.stem for p in tmp_path.iterdir()) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_keeps_the_most_recently_used(tmp_path):
+    cache = SpeechCache(str(tmp_path), memory_items=2)
+    cache.put_bytes("a", ".pcm", b"A")
+    cache.put_bytes("b", ".pcm", b"B")
+    assert cache.get_bytes("a", ".pcm") == b"A"
+    cache.put_bytes("c", ".pcm", b"C")
+    assert list(cache.memory) == ["a", "c"]
+    # Evicted from memory, still on disk
+    assert cache.get_bytes("b", ".pcm") == b"B"
+    assert cache.get_bytes("missing", ".pcm") is None
+    stats = cache.stats()
+    assert (stats["memoryHits"], stats["diskHits"], stats["misses"]) == (1, 1, 1)
+    assert list(cache.memory) == ["c", "b"]
+
+
+def test_key_ignores_case_and_spacing_but_not_the_voice():
+    engine = SimpleNamespace(name="piper", voice="uk_UA", speed=1.0, suffix=".pcm")
+    key = SpeechCache.key("Hello  there", engine)
+    assert SpeechCache.key(" hello there ", engine) == key
+    assert SpeechCache.key("Hello there", SimpleNamespace(**dict(vars(engine), speed=1.2))) != key
+    assert SpeechCache.key("Hello there", SimpleNamespace(**dict(vars(engine), suffix=".wav"))) != key
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for splitting replies into sentences and playing them in order
+Run with: python3 -m pytest test_tts_engine.py
+"""
+
+import threading
+import time
+
+from tts_engine import Clip, PipelinedSpeaker, SentenceBuffer, SpeechStream, split_sentences
+
+
+def test_split_at_sentence_ends_and_line_breaks():
+    assert split_sentences("How are you today? I am fine!") == ["How are you today?", "I am fine!"]
+    assert split_sentences("Line one is here\nLine two is here") == ["Line one is here", "Line two is here"]
+
+
+def test_short_fragments_join_the_next_sentence():
+    assert split_sentences("Hi. How are you today? Ok.") == ["Hi. How are you today?", "Ok."]
+
+
+def test_long_sentence_is_broken_at_clauses():
+    text = "This clause is fairly long, " * 12 + "end."
+    chunks = split_sentences(text, max_chars=80)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 80 for chunk in chunks)
+    assert " ".join(chunks) == text.strip()
+
+
+def test_buffer_releases_complete_sentences_only():
+    buffer = SentenceBuffer()
+    released = [buffer.feed(delta) for delta in ("Hello the", "re. Ok. How is", " it going? Fi", "ne")]
+    assert released == [[], ["Hello there."], ["Ok. How is it going?"], []]
+    assert buffer.flush() == ["Fine"]
+    assert buffer.flush() == []
+
+
+def test_buffer_matches_splitting_the_whole_text():
+    text = "First sentence here. Second one follows! A third?\nAnd the end"
+    buffer = SentenceBuffer()
+    chunks = []
+    for i in range(0, len(text), 7):
+        chunks.extend(buffer.feed(text[i:i + 7]))
+    chunks.extend(buffer.flush())
+    assert chunks == split_sentences(text)
+
+
+class FakeClip(Clip):
+    """Plays by sleeping, and records when"""
+
+    def __init__(self, text: str, log: list, seconds: float):
+        super().__init__([])
+        self.text = text
+        self.log = log
+        self.seconds = seconds
+
+    def play(self):
+        start = time.monotonic()
+        time.sleep(self.seconds)
+        self.log.append((self.text, start, time.monotonic()))
+
+
+class FakeEngine:
+    suffix = None
+
+    def __init__(self, seconds: float = 0.3):
+        self.log = []
+        self.seconds = seconds
+
+    def synthesize(self, text: str) -> FakeClip:
+        return FakeClip(text, self.log, self.seconds)
+
+
+def test_discarded_reply_does_not_let_the_next_one_overlap():
+    engine = FakeEngine()
+    speaker = PipelinedSpeaker(engine)
+    first = speaker.stream()
+    first.feed("Reply A, sentence one. Reply A, sentence two. ")
+    finishing = threading.Thread(target=first.finish)
+    finishing.start()
+    time.sleep(0.1)
+
+    # Reply B fails while A is still playing
+    failed = speaker.stream()
+    failed.feed("Reply B never gets spoken. ")
+    failed.discard()
+    assert not failed.done.is_set()
+
+    third = speaker.stream()
+    third.feed("Reply C comes after A.")
+    third.finish()
+    finishing.join()
+
+    spoken = {text: (start, end) for text, start, end in engine.log}
+    assert "Reply B never gets spoken." not in spoken
+    assert spoken["Reply C comes after A."][0] >= spoken["Reply A, sentence two."][1]
+
+
+def test_feed_after_discard_is_ignored():
+    speech = SpeechStream(FakeEngine(0.01))
+    speech.feed("Spoken before the discard. ")
+    speech.discard()
+    speech.feed("A late delta from a cancelled stream. ")
+    speech.finish()
+    assert speech.done.wait(1)
+    for thread in speech._threads:
+        thread.join(1)
+        assert not thread.is_alive()
+    assert speech._texts.empty()
+
+
+def test_discard_after_finish_queued_its_end_marker():
+    engine = FakeEngine(0.2)
+    speech = SpeechStream(engine)
+    speech.feed("First sentence to play. Second sentence to play. Third one. ")
+    finishing = threading.Thread(target=speech.finish)
+    finishing.start()
+    time.sleep(0.05)
+    speech.discard()
+    finishing.join(2)
+    assert not finishing.is_alive()
+    assert [text for text, _, _ in engine.log] == ["First sentence to play."]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for voice activity detection (speech mask, trimming, end-of-utterance)
+Run with: python3 -m pytest test_vad.py
+"""
+
+import numpy as np
+
+from stt_engine import SAMPLE_RATE
+from vad import FRAME_SAMPLES, Endpointer, VoiceActivityDetector
+
+RNG = np.random.default_rng(0)
+
+
+def tone(seconds: float, amplitude: int = 8000) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * 200 * t) * amplitude).astype(np.int16)
+
+
+def quiet(seconds: float) -> np.ndarray:
+    return RNG.normal(0, 30, int(SAMPLE_RATE * seconds)).astype(np.int16)
+
+
+def test_speech_between_silence_is_found():
+    detector = VoiceActivityDetector(hangover_ms=0)
+    speech = detector.speech_frames(np.concatenate((quiet(1), tone(1), quiet(1))))
+    frames = np.flatnonzero(speech)
+    assert abs(frames[0] * FRAME_SAMPLES / SAMPLE_RATE - 1.0) < 0.05
+    assert abs((frames[-1] + 1) * FRAME_SAMPLES / SAMPLE_RATE - 2.0) < 0.05
+
+
+def test_steady_voiced_clip_is_all_speech():
+    # No silence before or after, e.g. with warmAudio off
+    detector = VoiceActivityDetector()
+    assert detector.speech_frames(tone(2)).all()
+    assert detector.trim(tone(2)) == (0, 2 * SAMPLE_RATE)
+
+
+def at_level(signal: np.ndarray, dbfs: float) -> np.ndarray:
+    rms = np.sqrt(np.mean(signal ** 2))
+    return (signal / rms * 32768 * 10 ** (dbfs / 20)).astype(np.int16)
+
+
+def test_steady_background_is_not_speech():
+    detector = VoiceActivityDetector()
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    hiss = RNG.normal(size=len(t))
+    fan = np.convolve(RNG.normal(size=len(t)), np.ones(8) / 8, "same")
+    hum = np.sin(2 * np.pi * 60 * t) + 0.3 * np.sin(2 * np.pi * 120 * t)
+    for signal, dbfs in ((hiss, -44), (hiss, -38), (fan, -40), (hum, -40)):
+        assert detector.trim(at_level(signal, dbfs)) is None
+
+
+def test_quiet_recording_has_no_speech():
+    detector = VoiceActivityDetector()
+    assert not detector.speech_frames(quiet(2)).any()
+    assert detector.trim(quiet(2)) is None
+
+
+def test_trim_keeps_padding_around_speech():
+    detector = VoiceActivityDetector(hangover_ms=0, padding_ms=200)
+    start, end = detector.trim(np.concatenate((quiet(1), tone(1), quiet(1))))
+    assert abs(start / SAMPLE_RATE - 0.8) < 0.05
+    assert abs(end / SAMPLE_RATE - 2.2) < 0.05
+
+
+def test_short_click_is_too_little_speech():
+    detector = VoiceActivityDetector(min_speech_ms=250, hangover_ms=0)
+    assert detector.trim(np.concatenate((quiet(1), tone(0.06), quiet(1)))) is None
+
+
+def test_endpointer_waits_for_speech_then_silence():
+    endpointer = Endpointer(VoiceActivityDetector(), end_silence_ms=600)
+    # Silence before anything is said never ends the utterance
+    assert not endpointer.feed(quiet(2))
+    assert not endpointer.feed(tone(1))
+    assert not endpointer.feed(quiet(0.4))
+    assert endpointer.feed(quiet(0.5))
+
+
+def test_endpointer_handles_chunks_that_split_frames():
+    endpointer = Endpointer(VoiceActivityDetector(), end_silence_ms=300)
+    audio = np.concatenate((quiet(0.5), tone(0.5), quiet(1)))
+    ended_at = None
+    for i in range(0, len(audio), 1000):
+        if endpointer.feed(audio[i:i + 1000]):
+            ended_at = (i + 1000) / SAMPLE_RATE
+            break
+    assert ended_at is not None
+    # The tone ends at 1.0 s; 0.3 s of silence later, give or take a chunk
+    assert 1.3 <= ended_at <= 1.4
@@ -0,0 +1,232 @@
+"""
+Latency tracing
+Monotonic spans per utterance, appended to a rotating JSONL log, with a percentile report CLI
+"""
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class Trace:
+    """
+    Spans for one utterance
+
+    Times are time.monotonic() values stored relative to ``origin`` (the
+    hotkey press), so every span can be read as "seconds after the key
+    went down".
+    """
+
+    def __init__(self, utterance: int, origin: Optional[float] = None):
+        self.utterance = utterance
+        self.origin = origin if origin is not None else time.monotonic()
+        self.created = time.time()
+        self.spans: Dict[str, Dict[str, float]] = {}
+        self.marks: Dict[str, float] = {}
+        self.attributes: Dict[str, object] = {}
+
+    def add(self, name: str, start: float, end: float):
+        """Record a span from monotonic start/end times"""
+        self.spans[name] = {
+            "start": round(start - self.origin, 4),
+            "duration": round(end - start, 4),
+        }
+
+    def add_total(self, name: str, duration: float):
+        """Record time summed over several pieces (e.g. per-sentence synthesis)"""
+        self.spans[name] = {"duration": round(duration, 4)}
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the body of a with-block as one span"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.monotonic())
+
+    def mark(self, name: str, at: Optional[float] = None):
+        """Record a point in time, e.g. the first audible sample of the reply"""
+        at = at if at is not None else time.monotonic()
+        self.marks[name] = round(at - self.origin, 4)
+
+    def to_record(self, outcome: str) -> dict:
+        return {
+            "ts": round(self.created, 3),
+            "utterance": self.utterance,
+            "outcome": outcome,
+            "spans": self.spans,
+            "marks": self.marks,
+            **({"attributes": self.attributes} if self.attributes else {}),
+        }
+
+
+class StartupTimeline:
+    """When each component became ready, relative to process start"""
+
+    def __init__(self, origin: Optional[float] = None):
+        self.origin = origin if origin is not None else time.monotonic()
+        self.events: List[Tuple[float, str, bool]] = []
+        self._lock = threading.Lock()
+
+    def mark(self, name: str, ok: bool = True):
+        with self._lock:
+            self.events.append((time.monotonic() - self.origin, name, ok))
+
+    def report(self) -> str:
+        with self._lock:
+            events = sorted(self.events)
+        lines = ["🚀 Start-up timeline:"]
+        for at, name, ok in events:
+            lines.append(f"   +{at:6.2f}s  {'✅' if ok else '❌'} {name}")
+        return "\n".join(lines)
+
+
+class TraceLog:
+    """
+    Append-only JSONL log of finished traces
+
+    When the file grows past ``max_bytes`` it is rotated to ``path.1``,
+    ``path.1`` to ``path.2`` and so on, keeping ``backups`` old files.
+    """
+
+    def __init__(self, path: str = "./logs/metrics.jsonl", max_bytes: int = 10 * 1024 * 1024,
+                 backups: int = 3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def write(self, trace: Trace, outcome: str):
+        line = json.dumps(trace.to_record(outcome), ensure_ascii=False) + "\n"
+        with self._lock:
+            if self.path.exists() and self.path.stat().st_size + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            older = Path(f"{self.path}.{index}")
+            if older.exists():
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            self.path.unlink()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def log_files(path: str) -> List[Path]:
+    """The log and its rotated backups, oldest first"""
+    base = Path(path)
+    backups = sorted(base.parent.glob(base.name + ".*"),
+                     key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0,
+                     reverse=True)
+    files = [p for p in backups if p.suffix[1:].isdigit()]
+    if base.exists():
+        files.append(base)
+    return files
+
+
+def read_records(paths: Iterable[Path], since: Optional[float] = None) -> List[dict]:
+    """Load trace records, skipping malformed lines and those older than since"""
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or record.get("ts", 0) >= since:
+                    records.append(record)
+    return records
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a non-empty list"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def stage_durations(records: Iterable[dict]) -> Dict[str, List[float]]:
+    """Durations per span name, plus marks (seconds after the hotkey press)"""
+    durations: Dict[str, List[float]] = {}
+    for record in records:
+        for name, span in record.get("spans", {}).items():
+            durations.setdefault(name, []).append(span["duration"])
+        for name, at in record.get("marks", {}).items():
+            durations.setdefault(f"hotkey→{name}", []).append(at)
+    return durations
+
+
+def parse_window(text: str) -> float:
+    """'90s', '15m', '2h', '7d' or plain seconds → seconds"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if text[-1:] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def report(records: List[dict]) -> str:
+    durations = stage_durations(records)
+    if not durations:
+        return "No traces in the selected window"
+    outcomes: Dict[str, int] = {}
+    for record in records:
+        outcome = record.get("outcome", "?")
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    lines = [
+        f"{len(records)} utterances ("
+        + ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())) + ")",
+        f"{'stage':<24}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}",
+    ]
+    for name in sorted(durations):
+        values = durations[name]
+        lines.append(f"{name:<24}{len(values):>6}"
+                     + "".join(f"{percentile(values, p):>9.3f}" for p in (50, 95, 99))
+                     + f"{max(values):>9.3f}")
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-stage latency percentiles from the metrics log")
+    parser.add_argument("log", nargs="?", default="./logs/metrics.jsonl",
+                        help="metrics log (rotated backups are read too)")
+    parser.add_argument("--window", default=None,
+                        help="only traces from the last N seconds (suffix s/m/h/d, e.g. 1h)")
+    args = parser.parse_args()
+
+    files = log_files(args.log)
+    if not files:
+        print(f"❌ No metrics log at {args.log}")
+        return 1
+    since = time.time() - parse_window(args.window) if args.window else None
+    print(report(read_records(files, since)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
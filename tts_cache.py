@@ -0,0 +1,200 @@
+"""
+Synthesized speech cache
+A size-capped directory in front of a TTS engine, plus an in-memory LRU for streamed PCM
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from tts_engine import Clip
+
+
+def normalize_text(text: str) -> str:
+    """Fold whitespace and case so trivially different phrasings share an entry"""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class SpeechCache:
+    """
+    Cache of synthesized audio keyed by text, engine, voice and speed
+
+    Every clip is stored in ``directory``, which is trimmed back to
+    ``max_disk_bytes`` by evicting the least recently used files; file
+    clips play straight from there. Engines that stream raw PCM store the
+    bytes with put_bytes() and read them back with get_bytes(), which also
+    keeps the ``memory_items`` most recently used ones in memory so a hit
+    plays without touching the disk.
+    """
+
+    def __init__(self, directory: str = "./cache/tts", memory_items: int = 32,
+                 max_disk_bytes: int = 200 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str, engine) -> str:
+        # The suffix keeps a streamed voice's PCM apart from the same voice rendered to WAV
+        raw = "\0".join([normalize_text(text), engine.name, str(engine.voice), f"{engine.speed:.3f}",
+                          engine.suffix or ""])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.directory / f"{key}{suffix}"
+
+    def contains(self, key: str, suffix: str) -> bool:
+        return key in self.memory or self._path(key, suffix).exists()
+
+    def get(self, key: str, suffix: str) -> Optional[Clip]:
+        """Return a clip playing the cached file for key, or None on a miss"""
+        path = self._path(key, suffix)
+        with self._lock:
+            try:
+                # Touch so disk eviction sees it as recently used
+                os.utime(path)
+            except OSError:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        # Play the cached file in place; it is not ours to delete
+        return Clip(["afplay", str(path)])
+
+    def get_bytes(self, key: str, suffix: str) -> Optional[bytes]:
+        """Return the stored audio for key, or None on a miss"""
+        path = self._path(key, suffix)
+        with self._lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            try:
+                data = path.read_bytes()
+            except OSError:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            os.utime(path)
+            self._remember(key, data)
+            return data
+
+    def put(self, key: str, suffix: str, source: str):
+        """Store a freshly synthesized file"""
+        path = self._path(key, suffix)
+        with self._lock:
+            shutil.copyfile(source, path)
+            self._trim_disk()
+
+    def put_bytes(self, key: str, suffix: str, data: bytes):
+        """Store audio that never existed as a file (streamed PCM)"""
+        path = self._path(key, suffix)
+        with self._lock:
+            self._remember(key, data)
+            path.write_bytes(data)
+            self._trim_disk()
+
+    def _remember(self, key: str, data: bytes):
+        self.memory[key] = data
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def _trim_disk(self):
+        files = [p for p in self.directory.iterdir() if p.is_file()]
+        total = sum(p.stat().st_size for p in files)
+        if total <= self.max_disk_bytes:
+            return
+        for p in sorted(files, key=lambda p: p.stat().st_mtime):
+            total -= p.stat().st_size
+            p.unlink()
+            self.evictions += 1
+            if total <= self.max_disk_bytes:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memoryHits": self.memory_hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memoryItems": len(self.memory),
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        hits = s["memoryHits"] + s["diskHits"]
+        total = hits + s["misses"]
+        rate = hits / total * 100 if total else 0.0
+        return (f"💾 TTS cache: {hits}/{total} hits ({rate:.0f}%; "
+                f"{s['memoryHits']} memory, {s['diskHits']} disk), {s['evictions']} evicted")
+
+
+class CachedEngine:
+    """TTS engine wrapper that serves repeated text from a SpeechCache"""
+
+    def __init__(self, engine, cache: SpeechCache):
+        self.engine = engine
+        self.cache = cache
+
+    @property
+    def name(self) -> str:
+        return self.engine.name
+
+    @property
+    def suffix(self) -> Optional[str]:
+        return self.engine.suffix
+
+    def synthesize(self, text: str) -> Clip:
+        # Engines that speak directly produce nothing to cache
+        if not self.engine.suffix:
+            return self.engine.synthesize(text)
+
+        key = self.cache.key(text, self.engine)
+        if hasattr(self.engine, "replay"):
+            pcm = self.cache.get_bytes(key, self.engine.suffix)
+            if pcm is not None:
+                return self.engine.replay(pcm, text)
+        else:
+            clip = self.cache.get(key, self.engine.suffix)
+            if clip is not None:
+                return clip
+
+        clip = self.engine.synthesize(text)
+        self._store(key, clip)
+        return clip
+
+    def _store(self, key: str, clip: Clip):
+        if clip.path:
+            self.cache.put(key, self.engine.suffix, clip.path)
+        elif hasattr(clip, "on_audio"):
+            # A streamed sentence is stored once Piper has produced all of it
+            clip.on_audio(lambda pcm: self.cache.put_bytes(key, self.engine.suffix, pcm))
+
+    def warm_up(self, phrases: Iterable[str]):
+        """Pre-synthesize phrases that are not cached yet"""
+        if not self.engine.suffix:
+            return
+        count = 0
+        for phrase in phrases:
+            key = self.cache.key(phrase, self.engine)
+            if self.cache.contains(key, self.engine.suffix):
+                continue
+            clip = self.engine.synthesize(phrase)
+            self._store(key, clip)
+            clip.drain()
+            count += 1
+        print(f"   ✅ TTS warm-up: {count} phrases synthesized")
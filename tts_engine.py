@@ -0,0 +1,448 @@
+"""
+Text-to-speech engines and pipelined playback
+Splits replies into sentences and synthesizes the next one while the current one plays
+"""
+
+import os
+import queue
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Sentence ends (keep the punctuation with the sentence) or line breaks
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+# Clause boundaries used to break up very long sentences
+CLAUSE_END = re.compile(r"(?<=[,;:—])\s+")
+
+
+def split_sentences(text: str, min_chars: int = 12, max_chars: int = 200) -> List[str]:
+    """
+    Split text into speakable chunks
+
+    Fragments shorter than min_chars are merged into the next chunk, and
+    sentences longer than max_chars are broken at clause boundaries.
+    """
+    chunks = []
+    pending = ""
+    for sentence in SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        pending = f"{pending} {sentence}".strip()
+        if len(pending) >= min_chars:
+            chunks.extend(_split_long(pending, max_chars))
+            pending = ""
+    if pending:
+        chunks.append(pending)
+    return chunks
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    if len(sentence) <= max_chars:
+        return [sentence]
+    parts = []
+    current = ""
+    for clause in CLAUSE_END.split(sentence):
+        if current and len(current) + len(clause) + 1 > max_chars:
+            parts.append(current)
+            current = clause
+        else:
+            current = f"{current} {clause}".strip()
+    if current:
+        parts.append(current)
+    return parts
+
+
+class SentenceBuffer:
+    """Accumulates streamed text and releases it a complete sentence at a time"""
+
+    def __init__(self, min_chars: int = 12, max_chars: int = 200):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.text = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Add text; return the chunks that are now complete"""
+        self.text += delta
+        boundaries = list(SENTENCE_END.finditer(self.text))
+        if not boundaries:
+            return []
+        cut = boundaries[-1].end()
+        chunks = split_sentences(self.text[:cut], self.min_chars, self.max_chars)
+        # A short trailing fragment waits for more text instead of being spoken alone
+        if chunks and len(chunks[-1]) < self.min_chars:
+            self.text = chunks.pop() + " " + self.text[cut:]
+        else:
+            self.text = self.text[cut:]
+        return chunks
+
+    def flush(self) -> List[str]:
+        """Return whatever is left"""
+        chunks = split_sentences(self.text, self.min_chars, self.max_chars)
+        self.text = ""
+        return chunks
+
+
+class Clip:
+    """Synthesized audio ready to be played"""
+
+    def __init__(self, play_cmd: List[str], path: Optional[str] = None):
+        self.play_cmd = play_cmd
+        self.path = path
+        self._proc: Optional[subprocess.Popen] = None
+        self._stopped = False
+
+    def play(self):
+        if self._stopped:
+            return
+        self._proc = subprocess.Popen(self.play_cmd)
+        self._proc.wait()
+
+    def stop(self):
+        """Interrupt playback (safe to call from another thread)"""
+        self._stopped = True
+        proc = self._proc
+        if proc and proc.poll() is None:
+            proc.terminate()
+
+    def drain(self):
+        """Release the clip without playing it (streamed clips wait for their audio first)"""
+        self.cleanup()
+
+    def cleanup(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def stats(self) -> Dict[str, float]:
+        """Extra per-clip timings for the playback report (streamed clips add ttfs and rtf)"""
+        return {}
+
+
+def temp_audio_path(suffix: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+
+class SayEngine:
+    """macOS built-in `say`, rendered to AIFF so it can be synthesized ahead"""
+
+    name = "say"
+    voice = None
+    suffix = ".aiff"
+
+    def __init__(self, speed: float = 1.0):
+        self.speed = speed
+
+    def synthesize(self, text: str) -> Clip:
+        path = temp_audio_path(self.suffix)
+        # say's default rate is about 175 words per minute
+        subprocess.run(["say", "-r", str(int(175 * self.speed)), "-o", path, text], check=True)
+        return Clip(["afplay", path], path)
+
+
+class SagEngine:
+    """ElevenLabs via the sag skill; speaks directly, so nothing is prepared ahead"""
+
+    name = "sag"
+    voice = None
+    suffix = None
+    speed = 1.0
+
+    def synthesize(self, text: str) -> Clip:
+        return Clip(["sag", text])
+
+
+class PiperEngine:
+    """Local Piper voice"""
+
+    name = "piper"
+    suffix = ".wav"
+
+    def __init__(self, binary: str, model: str, speed: float = 1.0):
+        self.binary = binary
+        self.model = model
+        self.speed = speed
+
+    @property
+    def voice(self) -> str:
+        return self.model
+
+    def synthesize(self, text: str) -> Clip:
+        # Piper: echo "text" | piper --model model.onnx --output_file output.wav && afplay output.wav
+        path = temp_audio_path(self.suffix)
+        proc = subprocess.Popen(
+            [self.binary, "--model", self.model, "--length_scale", str(1.0 / self.speed),
+             "--output_file", path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        proc.communicate(input=text.encode('utf-8'))
+        return Clip(["afplay", path], path)
+
+
+def piper_model_for(config: dict) -> str:
+    """Pick the Piper voice model for the configured language"""
+    language = config.get("language", "uk")
+    if language == "uk":
+        return config.get("piperModelUK", "./models/tts/uk_UA-lada-x_low.onnx")
+    elif language == "en":
+        return config.get("piperModelEN", "./models/tts/en_US-lessac-medium.onnx")
+    # Fallback to explicit piperModel or default
+    return config.get("piperModel", "./models/tts/uk_UA-lada-x_low.onnx")
+
+
+def create_engine(config: dict):
+    """Build the TTS engine selected by ttsEngine, or None if unknown"""
+    tts_engine = config.get("ttsEngine", "say")
+    speed = config.get("ttsSpeed", 1.0)
+    if tts_engine == "say":
+        return SayEngine(speed)
+    elif tts_engine == "sag":
+        return SagEngine()
+    elif tts_engine == "piper":
+        if config.get("piperStreaming", True):
+            from piper_stream import PiperStreamEngine
+
+            return PiperStreamEngine(config.get("piperBinary", "./bin/piper"), piper_model_for(config), speed,
+                                     config.get("ttsOutput", "device"))
+        return PiperEngine(config.get("piperBinary", "./bin/piper"), piper_model_for(config), speed)
+    return None
+
+
+class SpeechStream:
+    """
+    One reply being spoken
+
+    Text is fed in (whole or as streamed deltas), split into sentences and
+    synthesized on one thread while a second thread plays finished clips in
+    order. At most ``lookahead`` clips are synthesized ahead of playback.
+    Playback waits for ``previous`` to finish, so replies never overlap.
+    """
+
+    def __init__(self, engine, lookahead: int = 1, previous: Optional["SpeechStream"] = None):
+        self.engine = engine
+        self.previous = previous
+        self.done = threading.Event()
+        self.buffer = SentenceBuffer()
+        self.chars_fed = 0
+        self.timings = []
+        self._texts: queue.Queue = queue.Queue()
+        self._clips: queue.Queue = queue.Queue(maxsize=lookahead)
+        self._start = time.monotonic()
+        self._first_audio: Optional[float] = None
+        # time.monotonic() when the first clip started playing
+        self.first_audio_at: Optional[float] = None
+        self._threads: List[threading.Thread] = []
+        self._discarded = False
+        self._ended = False
+        self._playing: Optional[Clip] = None
+        # Guards _discarded against the play loop starting a clip, and the end marker
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        for target, name in ((self._synthesize_loop, "tts-synth"), (self._play_loop, "tts-play")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def feed(self, delta: str):
+        """Add reply text; complete sentences start synthesizing immediately"""
+        # Late deltas of a dropped reply (e.g. a cancelled stream) are ignored
+        if self._discarded:
+            return
+        self.chars_fed += len(delta)
+        for chunk in self.buffer.feed(delta):
+            self._ensure_started()
+            self._texts.put(chunk)
+
+    def finish(self):
+        """Speak any remaining text and block until playback is done"""
+        if self._discarded:
+            return
+        for chunk in self.buffer.flush():
+            self._ensure_started()
+            self._texts.put(chunk)
+        if not self._threads:
+            self._settle()
+            return
+        self._end_texts()
+        for thread in self._threads:
+            thread.join()
+        self._report()
+
+    def _end_texts(self):
+        """Queue the synth loop's end marker, exactly once per stream"""
+        with self._lock:
+            if self._ended:
+                return
+            self._ended = True
+        self._texts.put(None)
+
+    def _settle(self):
+        """Mark a stream with nothing (left) to play as done, but never before the reply ahead of it"""
+        previous = self.previous
+        if previous is None or previous.done.is_set():
+            self.done.set()
+        else:
+            # The play loop waits for the previous reply, then sets done
+            self._ensure_started()
+            self._end_texts()
+
+    def discard(self):
+        """Drop everything not played yet without waiting"""
+        with self._lock:
+            if self._discarded:
+                return
+            self._discarded = True
+            playing = self._playing
+        self.buffer.flush()
+        # Sentences not synthesized yet are never rendered
+        if None in _drain(self._texts):
+            # finish() had already queued the end marker
+            self._texts.put(None)
+        for item in _drain(self._clips):
+            if item is None:
+                # The synth loop has already finished; the play loop still needs its end marker
+                self._clips.put(None)
+            else:
+                item[2].cleanup()
+        if self._threads:
+            self._end_texts()
+        if playing is None:
+            # Replies queued behind this one can start once the one ahead of it is done
+            self._settle()
+
+    def cancel(self):
+        """Barge-in: stop the clip that is playing and drop the rest"""
+        self.discard()
+        clip = self._playing
+        if clip:
+            clip.stop()
+        self.done.set()
+
+    @property
+    def playing(self) -> bool:
+        return self._playing is not None
+
+    def _synthesize_loop(self):
+        index = 0
+        while True:
+            text = self._texts.get()
+            if text is None:
+                break
+            if self._discarded:
+                continue
+            index += 1
+            start = time.monotonic()
+            try:
+                clip = self.engine.synthesize(text)
+            except Exception as e:
+                print(f"❌ TTS error: {e}")
+                continue
+            if self._discarded:
+                clip.cleanup()
+                continue
+            self._clips.put((index, text, clip, time.monotonic() - start, time.monotonic()))
+        self._clips.put(None)
+
+    def _play_loop(self):
+        if self.previous:
+            self.previous.done.wait()
+            self.previous = None
+        if self._discarded:
+            self.done.set()
+        while True:
+            item = self._clips.get()
+            if item is None:
+                break
+            index, text, clip, synth_time, ready_at = item
+            with self._lock:
+                if not self._discarded:
+                    self._playing = clip
+            if self._playing is None:
+                clip.cleanup()
+                continue
+            play_start = time.monotonic()
+            if self._first_audio is None:
+                self._first_audio = play_start - self._start
+                self.first_audio_at = play_start
+            try:
+                clip.play()
+            except Exception as e:
+                print(f"❌ TTS error: {e}")
+            finally:
+                self._playing = None
+                clip.cleanup()
+            if self._discarded:
+                # discard() left done to us because this clip was still playing (the previous
+                # reply has finished: we waited for it above)
+                self.done.set()
+            self.timings.append({
+                "chunk": index,
+                "chars": len(text),
+                "synth": synth_time,
+                "queued": play_start - ready_at,
+                "play": time.monotonic() - play_start,
+                **clip.stats(),
+            })
+        self.done.set()
+
+    def _report(self):
+        for t in self.timings:
+            streamed = f", first sample {t['ttfs'] * 1000:.0f}ms" if "ttfs" in t else ""
+            streamed += f", RTF {t['rtf']:.2f}" if "rtf" in t else ""
+            print(f"   🔊 chunk {t['chunk']}: {t['chars']} chars, synth {t['synth']:.2f}s, "
+                  f"queued {t['queued']:.2f}s, played {t['play']:.2f}s{streamed}")
+        if self._first_audio is not None:
+            print(f"   ⏱️  First audio after {self._first_audio:.2f}s "
+                  f"({len(self.timings)} chunks, {time.monotonic() - self._start:.2f}s total)")
+
+
+def _drain(q: queue.Queue) -> list:
+    """Empty a queue without blocking; returns what was in it"""
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            return items
+
+
+class PipelinedSpeaker:
+    """Speaks replies sentence by sentence with the configured engine"""
+
+    def __init__(self, engine, lookahead: int = 1):
+        self.engine = engine
+        self.lookahead = lookahead
+        self._last: Optional[SpeechStream] = None
+        self._lock = threading.Lock()
+
+    def stream(self) -> SpeechStream:
+        """Start a reply that will be fed incrementally; it plays after earlier replies"""
+        with self._lock:
+            previous = self._last if self._last and not self._last.done.is_set() else None
+            self._last = SpeechStream(self.engine, self.lookahead, previous=previous)
+            return self._last
+
+    def follow(self, other: "PipelinedSpeaker"):
+        """Queue this speaker's replies behind whatever ``other`` is still playing"""
+        with other._lock:
+            self._last = other._last
+
+    def speak(self, text: str):
+        """Speak a complete text and wait until it has been played"""
+        self.speak_stream([text])
+
+    def speak_stream(self, deltas: Iterable[str]):
+        """Speak text as it arrives and wait until it has been played"""
+        speech = self.stream()
+        for delta in deltas:
+            speech.feed(delta)
+        speech.finish()
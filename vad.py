@@ -0,0 +1,178 @@
+"""
+Voice activity detection
+Frame energy + zero-crossing rate over int16 audio, vectorized with NumPy
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from stt_engine import SAMPLE_RATE
+
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+# Floor for the energy scale so digital silence doesn't produce -inf
+MIN_DB = -100.0
+# Voicing test for recordings with no quiet frames: most energy in the speech band...
+SPEECH_BAND_HZ = (100, 4000)
+MIN_SPEECH_BAND_RATIO = 0.5
+# ...and a pitch-like periodicity (autocorrelation peak at a 70–400 Hz lag)
+PITCH_HZ = (70, 400)
+MIN_PERIODICITY = 0.4
+FFT_SIZE = 1024
+
+
+def frame_features(samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-frame energy (dBFS) and zero-crossing rate
+
+    The trailing partial frame is ignored.
+    """
+    count = len(samples) // FRAME_SAMPLES
+    if count == 0:
+        return np.zeros(0), np.zeros(0)
+    frames = samples[:count * FRAME_SAMPLES].reshape(count, FRAME_SAMPLES).astype(np.float32) / 32768.0
+
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = np.maximum(20.0 * np.log10(np.maximum(rms, 1e-10)), MIN_DB)
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (FRAME_SAMPLES - 1)
+    return energy_db, zcr
+
+
+def voiced_frames(samples: np.ndarray) -> np.ndarray:
+    """
+    Per-frame voicing: speech-band energy plus periodicity
+
+    Separates a steady voice from steady background that an energy
+    threshold can't: hiss and fan noise aren't periodic, and mains hum
+    sits below the speech band.
+    """
+    count = len(samples) // FRAME_SAMPLES
+    if count == 0:
+        return np.zeros(0, dtype=bool)
+    frames = samples[:count * FRAME_SAMPLES].reshape(count, FRAME_SAMPLES).astype(np.float32)
+    frames -= frames.mean(axis=1, keepdims=True)
+
+    power = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SAMPLES), n=FFT_SIZE, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(FFT_SIZE, 1.0 / SAMPLE_RATE)
+    in_band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+    band_ratio = power[:, in_band].sum(axis=1) / np.maximum(power.sum(axis=1), 1e-12)
+
+    # Autocorrelation from the power spectrum, normalized by the zero-lag energy
+    autocorr = np.fft.irfft(np.abs(np.fft.rfft(frames, n=FFT_SIZE, axis=1)) ** 2, axis=1)
+    autocorr /= np.maximum(autocorr[:, :1], 1e-12)
+    periodicity = autocorr[:, SAMPLE_RATE // PITCH_HZ[1]:SAMPLE_RATE // PITCH_HZ[0] + 1].max(axis=1)
+    return (band_ratio >= MIN_SPEECH_BAND_RATIO) & (periodicity >= MIN_PERIODICITY)
+
+
+class VoiceActivityDetector:
+    """
+    Energy/ZCR speech detector
+
+    A frame counts as speech when its energy is ``threshold_db`` above the
+    noise floor (a low percentile of the recording's frame energies) and
+    either its zero-crossing rate looks voiced or it is loud enough that
+    the ZCR doesn't matter (fricatives). A recording that is evenly loud
+    throughout has no quiet frames to take the floor from; there a frame
+    above ``min_energy_db`` counts as speech only if it is voiced. Speech runs are extended by
+    ``hangover_ms`` to bridge short gaps between words.
+    """
+
+    def __init__(self, threshold_db: float = 10.0, min_energy_db: float = -55.0,
+                 max_zcr: float = 0.35, hangover_ms: int = 150,
+                 padding_ms: int = 200, min_speech_ms: int = 250):
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.max_zcr = max_zcr
+        self.hangover_frames = hangover_ms // FRAME_MS
+        self.padding = SAMPLE_RATE * padding_ms // 1000
+        self.min_speech_frames = max(1, min_speech_ms // FRAME_MS)
+
+    def classify(self, energy_db, zcr, noise_floor_db: float):
+        """Speech decision for frame features (arrays or scalars) given a noise floor"""
+        threshold = max(noise_floor_db + self.threshold_db, self.min_energy_db)
+        return (energy_db > threshold) & ((zcr < self.max_zcr) | (energy_db > threshold + self.threshold_db))
+
+    def speech_frames(self, samples: np.ndarray) -> np.ndarray:
+        """Boolean speech mask, one entry per 30 ms frame"""
+        energy_db, zcr = frame_features(samples)
+        if len(energy_db) == 0:
+            return np.zeros(0, dtype=bool)
+
+        low, high = np.percentile(energy_db, (10, 90))
+        if high - low >= self.threshold_db:
+            speech = self.classify(energy_db, zcr, float(low))
+        else:
+            # Evenly loud: steady speech with no silence around it, or steady background
+            speech = (energy_db > self.min_energy_db) & voiced_frames(samples)
+
+        if self.hangover_frames and speech.any():
+            # Dilate speech runs forward by the hangover
+            kernel = np.ones(self.hangover_frames + 1, dtype=int)
+            speech = np.convolve(speech.astype(int), kernel)[:len(speech)] > 0
+        return speech
+
+    def trim(self, samples: np.ndarray) -> Optional[Tuple[int, int]]:
+        """
+        Find the speech region
+
+        Returns:
+            (start, end) sample indices including padding, or None if the
+            recording holds too little speech to be worth decoding
+        """
+        speech = self.speech_frames(samples)
+        if np.count_nonzero(speech) < self.min_speech_frames:
+            return None
+
+        indices = np.flatnonzero(speech)
+        start = max(0, indices[0] * FRAME_SAMPLES - self.padding)
+        end = min(len(samples), (indices[-1] + 1) * FRAME_SAMPLES + self.padding)
+        return int(start), int(end)
+
+
+class Endpointer:
+    """
+    Streaming end-of-utterance detector for toggle mode
+
+    Fed with captured chunks; reports the end once speech has been heard
+    and then ``end_silence_ms`` of continuous non-speech follows. The noise
+    floor follows the minimum frame energy and drifts up with non-speech
+    frames.
+    """
+
+    def __init__(self, detector: VoiceActivityDetector, end_silence_ms: int = 800):
+        self.detector = detector
+        self.end_silence_frames = max(1, end_silence_ms // FRAME_MS)
+        self.noise_floor_db: Optional[float] = None
+        self.heard_speech = False
+        self.silent_frames = 0
+        self._pending = np.zeros(0, dtype=np.int16)
+
+    def feed(self, chunk: np.ndarray) -> bool:
+        """Add int16 samples; return True once the utterance has ended"""
+        samples = np.concatenate((self._pending, chunk)) if len(self._pending) else chunk
+        energy_db, zcr = frame_features(samples)
+        used = len(energy_db) * FRAME_SAMPLES
+        self._pending = samples[used:].copy()
+
+        for db, rate in zip(energy_db, zcr):
+            if self.classify_frame(db, rate):
+                self.heard_speech = True
+                self.silent_frames = 0
+            elif self.heard_speech:
+                self.silent_frames += 1
+
+        return self.heard_speech and self.silent_frames >= self.end_silence_frames
+
+    def classify_frame(self, db: float, rate: float) -> bool:
+        """Speech decision for one frame against the running noise floor (which it updates)"""
+        if self.noise_floor_db is None or db < self.noise_floor_db:
+            self.noise_floor_db = float(db)
+
+        if self.detector.classify(db, rate, self.noise_floor_db):
+            return True
+        # Let the floor follow background noise (never speech) upwards
+        self.noise_floor_db += 0.05 * (db - self.noise_floor_db)
+        return False
@@ -4,346 +4,855 @@ OpenClaw Voice Hotkey Assistant
 Press Cmd+Shift+Space → speak → get AI response
 """
 
+import time
+# Start-up timeline origin; taken before the heavier imports below
+STARTED_AT = time.monotonic()
+
 import json
-import subprocess
-import tempfile
-import os
 import sys
-import time
-import asyncio
 from pathlib import Path
-from pynput import keyboard
-import pyaudio
-import wave
-from openclaw_client import OpenClawClient
+import threading
+import numpy as np
+from concurrent.futures import CancelledError as FutureCancelledError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from acp_bridge import AcpProxy, ProxyDiedError, RequestCancelled
+from stt_engine import SAMPLE_RATE, get_engine
+from audio_capture import AudioEngine, CaptureStats, PcmBuffer
+from vad import Endpointer, VoiceActivityDetector
+from streaming_stt import StreamingTranscriber
+from tts_engine import PipelinedSpeaker, create_engine
+from tts_cache import CachedEngine, SpeechCache
+from pipeline import CancelToken, Pipeline, Stage
+from tracing import StartupTimeline, Trace, TraceLog
+from response_cache import ResponseCache
+from config_watcher import ConfigWatcher
+import stt_engine
 
 # Load config
 CONFIG_FILE = Path(__file__).parent / "config.json"
 with open(CONFIG_FILE) as f:
     CONFIG = json.load(f)
 
+startup = StartupTimeline(STARTED_AT)
+
 # State
 is_recording = False
-audio_frames = []
-audio_stream = None
-p = None
+audio_buffer = PcmBuffer()
+capture_stats = CaptureStats()
 recording_start_time = None
+streamer = None
+endpointer = None
+dictation = None
+speculator = None
+# Created with the first speculative request
+speculation_stats = None
+recording_lock = threading.Lock()
+
+def build_vad(config):
+    return VoiceActivityDetector(
+        threshold_db=config.get("vadThresholdDb", 10.0),
+        padding_ms=config.get("vadPaddingMs", 200),
+        min_speech_ms=config.get("vadMinSpeechMs", 250),
+    )
+
+vad = build_vad(CONFIG)
 
-def start_recording():
+_audio_engine = None
+_audio_engine_lock = threading.Lock()
+
+def get_audio_engine():
+    """Return the shared audio engine, opening the microphone on first use"""
+    global _audio_engine
+    with _audio_engine_lock:
+        if _audio_engine is not None:
+            return _audio_engine
+        engine = AudioEngine(
+            device_index=CONFIG.get("inputDevice"),
+            preroll_ms=CONFIG.get("audioPrerollMs", 300),
+            always_on=CONFIG.get("warmAudio", True),
+            on_audio=audio_callback,
+        )
+        engine.start()
+        _audio_engine = engine
+        return _audio_engine
+
+def start_recording(pressed_at=None):
     """Start audio recording"""
-    global is_recording, audio_frames, audio_stream, p, recording_start_time
+    global is_recording, recording_start_time, streamer, endpointer, audio_buffer, speculator, speculation_stats
     
     if is_recording:
         return
+    if dictation_mode():
+        start_dictation(pressed_at)
+        return
     
     print("🎤 Recording started...")
+    capture_stats.reset()
+    recording_start_time = time.time()
+    
+    # In toggle mode the recording also ends by itself after trailing silence
+    if toggle_mode():
+        endpointer = Endpointer(vad, CONFIG.get("vadEndSilenceMs", 800))
+    
+    # Decode while the hotkey is still held, optionally asking the agent once the speaker pauses
+    if CONFIG.get("streamingTranscription", False):
+        speculator = None
+        if speculation_enabled():
+            from speculation import SpeculationStats, Speculator
+            
+            if speculation_stats is None:
+                speculation_stats = SpeculationStats()
+            speculator = Speculator(send_speculative, speculation_stats, vad,
+                                    stable_seconds=CONFIG.get("speculationStableMs", 800) / 1000.0,
+                                    end_silence_ms=CONFIG.get("speculationSilenceMs", 400),
+                                    max_requests=CONFIG.get("speculationMaxRequests", 2))
+        streamer = StreamingTranscriber(
+            get_engine(CONFIG),
+            step=CONFIG.get("streamingStepSeconds", 1.0),
+            window=CONFIG.get("streamingWindowSeconds", 8.0),
+            on_partial=speculator.observe if speculator else None,
+        )
+        streamer.start()
+    
+    # Each capture gets a fresh buffer (the previous one may still be in the
+    # pipeline), seeded with the pre-roll from the always-open stream
     is_recording = True
-    audio_frames = []
+    audio_buffer = get_audio_engine().begin(pressed_at, on_preroll=streamer.feed if streamer else None)
+
+def audio_callback(in_data, status):
+    """Called by the audio engine for every captured chunk while recording"""
+    capture_stats.record(status)
+    if dictation:
+        dictation.feed(in_data)
+    if streamer:
+        streamer.feed(in_data)
+    if speculator:
+        speculator.feed_audio(np.frombuffer(in_data, dtype=np.int16))
+    if endpointer and endpointer.feed(np.frombuffer(in_data, dtype=np.int16)):
+        end_by_silence()
+
+def speculation_enabled():
+    """Early agent requests need the WebSocket transport, which can abort a run that turns out wrong"""
+    return CONFIG.get("speculativeAgent", False) and CONFIG.get("gatewayTransport", "proxy") == "websocket"
+
+def start_dictation(pressed_at=None):
+    """Start a long-form dictation: audio goes to the segmenter instead of a growing buffer"""
+    global is_recording, recording_start_time, dictation
+    
+    from dictation import create_session
+    
+    print("📝 Dictation started...")
+    capture_stats.reset()
     recording_start_time = time.time()
+    session = create_session(CONFIG, get_engine(CONFIG))
+    session.start()
+    dictation = session
+    is_recording = True
+    get_audio_engine().begin(pressed_at, buffered=False, on_preroll=session.feed)
+    print(f"   Writing to {session.transcript}")
+
+def stop_dictation():
+    """Stop capturing and let the last segments finish transcribing in the background"""
+    global dictation
+    get_audio_engine().end()
+    session, dictation = dictation, None
+    duration = time.time() - recording_start_time if recording_start_time else 0
+    print(f"⏸️  Dictation stopped (duration: {duration:.1f}s, {capture_stats.summary()})")
     
-    # Initialize PyAudio
-    p = pyaudio.PyAudio()
+    def finish():
+        session.finish()
+        print(session.summary())
+        print(f"💾 Transcript in {session.transcript}")
     
-    # Get input device
-    configured_device = CONFIG.get("inputDevice")
-    input_device_index = configured_device if configured_device is not None else None
-    
-    if input_device_index is not None:
-        device_info = p.get_device_info_by_index(input_device_index)
-        print(f"   Using device [{input_device_index}]: {device_info['name']}")
-    
-    audio_stream = p.open(
-        format=pyaudio.paInt16,
-        channels=1,
-        rate=16000,
-        input=True,
-        input_device_index=input_device_index,
-        frames_per_buffer=1024,
-        stream_callback=audio_callback
-    )
-    audio_stream.start_stream()
+    # The hotkey stays live while the backlog is transcribed
+    threading.Thread(target=finish, name="dictation-finish", daemon=True).start()
+
+def end_by_silence():
+    """Stop a toggle-mode recording once the speaker has gone quiet"""
+    global endpointer
+    # Can't stop the stream from inside its own callback
+    endpointer = None
+    print("   🔇 Trailing silence detected, stopping recording...")
+    threading.Thread(target=stop_recording, daemon=True).start()
+
+class Utterance:
+    """One recording on its way through the pipeline"""
+    
+    def __init__(self, number, audio, duration, streamer=None, trace=None, speculator=None):
+        self.number = number
+        self.audio = audio
+        self.duration = duration
+        self.streamer = streamer
+        self.speculator = speculator
+        self.speculation = None
+        self.speech_range = None
+        self.text = None
+        self.response = None
+        self.reply_speech = None
+        self.cancel_token = CancelToken()
+        self.trace = trace or Trace(number)
 
-def audio_callback(in_data, frame_count, time_info, status):
-    """Callback for audio stream"""
-    global audio_frames
-    audio_frames.append(in_data)
-    return (in_data, pyaudio.paContinue)
+utterance_count = 0
+# How often replies get interrupted
+cancel_stats = {"bargeIns": 0, "requests": 0, "playbacks": 0, "queued": 0}
 
 def stop_recording():
-    """Stop recording and process"""
-    global is_recording, audio_stream, p, recording_start_time
+    """Stop recording and hand the utterance to the processing pipeline"""
+    global is_recording, streamer, endpointer, utterance_count, speculator
     
-    if not is_recording:
+    # The hotkey and the silence endpointer may both try to stop
+    with recording_lock:
+        if not is_recording:
+            return
+        is_recording = False
+    if dictation:
+        stop_dictation()
         return
+    endpointer = None
+    
+    released_at = time.monotonic()
     
     # Check minimum recording duration
     duration = time.time() - recording_start_time if recording_start_time else 0
     
     print(f"⏸️  Recording stopped (duration: {duration:.1f}s)")
-    is_recording = False
     
-    # Stop stream
-    if audio_stream:
-        audio_stream.stop_stream()
-        audio_stream.close()
-    if p:
-        p.terminate()
+    # Stop capturing (the stream itself stays open in warm mode)
+    audio_engine = get_audio_engine()
+    audio_engine.end()
+    
+    print(f"   Captured {audio_buffer.chunks} audio chunks ({capture_stats.summary()})")
+    if audio_engine.first_sample_latency is not None:
+        print(f"   ⏱️  Hotkey → first sample: {audio_engine.first_sample_latency * 1000:.0f}ms "
+              f"(+{audio_engine.preroll_seconds * 1000:.0f}ms pre-roll)")
+    if capture_stats.overflows or capture_stats.underflows:
+        print(f"⚠️  Audio glitches while recording: {capture_stats.summary()}")
+    
+    active_streamer, streamer = streamer, None
+    active_speculator, speculator = speculator, None
     
     # Skip if recording was too short (< 0.5 seconds)
     if duration < 0.5:
         print("⚠️  Recording too short, skipping...")
+        if active_streamer:
+            active_streamer.cancel()
+        if active_speculator:
+            active_speculator.cancel()
         return
     
-    # Save audio to temp file
-    audio_file = save_audio()
+    # Spans are measured from the hotkey press
+    utterance_count += 1
+    trace = Trace(utterance_count, origin=audio_engine.begin_time)
+    trace.add("capture", audio_engine.begin_time, released_at)
+    if audio_engine.first_sample_latency is not None:
+        trace.mark("first_sample", audio_engine.begin_time + audio_engine.first_sample_latency)
+    trace.add("stop_recording", released_at, time.monotonic())
+    trace.attributes["audioSeconds"] = round(audio_buffer.duration, 3)
     
-    # Transcribe with Whisper
-    print("🔄 Transcribing...")
-    text = transcribe_audio(audio_file)
+    # Everything else happens on the pipeline workers; the hotkey stays live
+    get_pipeline().submit(Utterance(utterance_count, audio_buffer, duration, active_streamer, trace,
+                                    active_speculator))
+    print(f"📥 Utterance #{utterance_count} queued")
+
+def preprocess_stage(utterance):
+    """Pipeline stage: skip silent recordings before any decoding starts"""
+    with utterance.trace.span("vad"):
+        utterance.speech_range = find_speech(utterance.audio)
+    if utterance.speech_range is None:
+        print(f"⚠️  No speech detected (#{utterance.number})")
+        if utterance.streamer:
+            utterance.streamer.cancel()
+        return None
+    return utterance
+
+def stt_stage(utterance):
+    """Pipeline stage: speech to text"""
+    if utterance.streamer:
+        # Most of the audio was decoded while recording; only the tail is left
+        print(f"🔄 Finishing streaming transcription (#{utterance.number})...")
+        with utterance.trace.span("whisper"):
+            text = finish_streaming(utterance.streamer)
+    else:
+        # Hand the captured speech to Whisper in memory, silence trimmed off
+        start, end = utterance.speech_range
+        with utterance.trace.span("save"):
+            audio = get_audio_samples(utterance.audio)[start:end]
+        
+        # Transcribe with Whisper
+        print(f"🔄 Transcribing (#{utterance.number})...")
+        with utterance.trace.span("whisper"):
+            text = transcribe_audio(audio)
     
     if not text or text.strip() == "":
         print("⚠️  No speech detected")
-        return
+        return None
     
     print(f"📝 Transcription: {text}")
+    utterance.text = text
+    if utterance.speculator:
+        utterance.speculation = utterance.speculator.resolve(text)
+        if utterance.speculator.requests and not utterance.speculation:
+            utterance.trace.attributes["speculation"] = "miss"
+            print(f"   {speculation_stats.summary()}")
+    return utterance
+
+def agent_stage(utterance):
+    """Pipeline stage: ask OpenClaw; streamed replies start speaking early"""
+    print(f"🤖 Sending to OpenClaw (#{utterance.number})...")
+    speech = open_speech()
+    utterance.reply_speech = speech
+    if speech:
+        utterance.cancel_token.add_callback(speech.cancel)
     
-    # Send to OpenClaw and get response
-    print("🤖 Sending to OpenClaw...")
-    response = send_to_openclaw(text)
+    trace = utterance.trace
+    def on_delta(delta):
+        if "agent_first_delta" not in trace.marks:
+            trace.mark("agent_first_delta")
+        if speech:
+            speech.feed(delta)
     
-    if response:
-        print(f"💬 Response: {response[:100]}...")
-        # Speak the response using TTS
-        print("🔊 Speaking response...")
-        speak_text(response)
+    try:
+        with trace.span("agent"):
+            if utterance.speculation:
+                utterance.response = use_speculation(utterance, on_delta)
+                if not utterance.response and speech and speech.chars_fed:
+                    # The early reply broke off part-way: drop what it started to say and ask again
+                    speech.discard()
+                    speech = utterance.reply_speech = open_speech()
+                    if speech:
+                        utterance.cancel_token.add_callback(speech.cancel)
+            if not utterance.response and not utterance.cancel_token.cancelled:
+                utterance.response = send_to_openclaw(utterance.text, on_delta=on_delta,
+                                                      cancel_token=utterance.cancel_token)
+    finally:
+        if not utterance.response and speech:
+            # Don't hold up replies queued behind this one
+            speech.discard()
+    if utterance.cancel_token.cancelled:
+        return None
+    return utterance if utterance.response else None
 
-def save_audio():
-    """Save audio frames to WAV file"""
-    global audio_frames
+def use_speculation(utterance, on_delta):
+    """Take the reply of an early request sent for the same transcript"""
+    speculation = utterance.speculation
+    utterance.cancel_token.add_callback(speculation.cancel)
+    speculation.attach(on_delta)
+    reply = speculation.result()
+    if utterance.cancel_token.cancelled:
+        return None
     
-    print(f"   Saving {len(audio_frames)} audio chunks...")
+    saved = utterance.speculator.settle(speculation)
+    utterance.trace.attributes["speculation"] = "hit" if reply else "failed"
+    utterance.trace.attributes["speculationSavedSeconds"] = round(saved, 3)
+    if reply:
+        print(f"   🔮 Speculation hit: reply was ready {saved:.2f}s sooner")
+        # Only now that the transcript confirmed it is the reply as good as a normal one
+        cache = get_response_cache()
+        if cache:
+            cache.put(utterance.text, CONFIG.get("telegramUserId"), "telegram", reply)
+    print(f"   {speculation_stats.summary()}")
+    return reply
+
+def tts_stage(utterance):
+    """Pipeline stage: speak the reply (in utterance order)"""
+    response = utterance.response
+    speech = utterance.reply_speech
+    print(f"💬 Response: {response[:100]}...")
     
-    # Save to current directory instead of /tmp to avoid path issues
-    import datetime
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    temp_file = f"./recording_{timestamp}.wav"
+    # Speak the response using TTS
+    print("🔊 Speaking response...")
+    if speech:
+        if speech.chars_fed == 0:
+            speech.feed(response)
+        with utterance.trace.span("tts"):
+            speech.finish()
+        record_speech_timings(utterance.trace, speech)
+        if utterance.cancel_token.cancelled:
+            print(f"   ⛔ Playback of #{utterance.number} interrupted")
+        elif _tts_cache:
+            print(f"   {_tts_cache.summary()}")
+    print(f"   {get_pipeline().summary()}")
+    return utterance
+
+def barge_in():
+    """
+    Interrupt replies that are being fetched or spoken
     
-    wf = wave.open(temp_file, 'wb')
-    wf.setnchannels(1)
-    wf.setsampwidth(pyaudio.PyAudio().get_sample_size(pyaudio.paInt16))
-    wf.setframerate(16000)
-    wf.writeframes(b''.join(audio_frames))
-    wf.close()
+    Stops playback, drops pending synthesis and abandons outstanding agent
+    requests so a new recording can start straight away. Utterances still
+    being transcribed are left alone.
+    """
+    if not CONFIG.get("bargeIn", True) or _pipeline is None:
+        return
     
-    file_size = os.path.getsize(temp_file)
-    print(f"   Saved to: {temp_file} ({file_size} bytes)")
+    # Note what each utterance was doing before cancelling changes it
+    states = []
+    for stage_name in ("agent", "tts"):
+        stage = next(s for s in _pipeline.stages if s.name == stage_name)
+        states.append((stage.current, stage_name))
     
-    return temp_file
+    cancelled = _pipeline.cancel_from("agent")
+    if not cancelled:
+        return
+    
+    cancel_stats["bargeIns"] += 1
+    for utterance in cancelled:
+        if utterance is states[0][0]:
+            cancel_stats["requests"] += 1
+        elif utterance is states[1][0]:
+            cancel_stats["playbacks"] += 1
+        else:
+            cancel_stats["queued"] += 1
+    
+    print(f"⛔ Barge-in: interrupted {len(cancelled)} reply(s) "
+          f"(total: {cancel_stats['bargeIns']} barge-ins, {cancel_stats['requests']} requests, "
+          f"{cancel_stats['playbacks']} playbacks, {cancel_stats['queued']} queued)")
+
+def record_speech_timings(trace, speech):
+    """Add synthesis/playback totals and the hotkey → first audio mark to a trace"""
+    if speech.timings:
+        trace.add_total("synth", sum(t["synth"] for t in speech.timings))
+        trace.add_total("play", sum(t["play"] for t in speech.timings))
+    if speech.first_audio_at is not None:
+        trace.mark("first_audio", speech.first_audio_at)
+        print(f"   ⏱️  Hotkey → first audio: {trace.marks['first_audio']:.2f}s")
+
+_trace_log = None
+
+def get_trace_log():
+    """Return the metrics log, or None when tracing is disabled"""
+    global _trace_log
+    if _trace_log is None and CONFIG.get("tracing", True):
+        _trace_log = TraceLog(
+            CONFIG.get("metricsLog", "./logs/metrics.jsonl"),
+            max_bytes=int(CONFIG.get("metricsLogMaxMB", 10) * 1024 * 1024),
+            backups=CONFIG.get("metricsLogBackups", 3),
+        )
+    return _trace_log
+
+def finish_trace(utterance):
+    """Pipeline exit hook: append the utterance's spans to the metrics log"""
+    if utterance.speculator:
+        # Dropped before its transcript was compared (no speech, barge-in)
+        utterance.speculator.cancel()
+    if utterance.cancel_token.cancelled:
+        outcome = "cancelled"
+    elif utterance.response:
+        outcome = "ok"
+    else:
+        outcome = "dropped"
+    trace_log = get_trace_log()
+    if trace_log:
+        trace_log.write(utterance.trace, outcome)
+
+_pipeline = None
+
+def get_pipeline():
+    """Return the shared capture → preprocess → STT → agent → TTS pipeline"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = Pipeline([
+            Stage("preprocess", preprocess_stage),
+            Stage("stt", stt_stage),
+            Stage("agent", agent_stage),
+            Stage("tts", tts_stage),
+        ], on_done=finish_trace)
+        _pipeline.start()
+    return _pipeline
 
-def transcribe_audio(audio_file):
-    """Transcribe audio using Whisper CLI"""
-    txt_file = None
+def find_speech(buffer):
+    """
+    Locate speech in a capture buffer with VAD
+    
+    Returns (start, end) sample indices, or None if there is no speech.
+    With VAD disabled the whole recording is returned.
+    """
+    if not CONFIG.get("vad", True):
+        return (0, len(buffer))
+    
+    started = time.monotonic()
+    speech = vad.trim(buffer.samples())
+    elapsed = time.monotonic() - started
+    
+    if speech is None:
+        print(f"   🔇 VAD: no speech in {buffer.duration:.1f}s ({elapsed * 1000:.0f}ms)")
+        return None
+    
+    start, end = speech
+    kept = (end - start) / SAMPLE_RATE
+    trimmed = buffer.duration - kept
+    print(f"   ✂️  VAD: kept {kept:.1f}s of {buffer.duration:.1f}s, "
+          f"trimmed {trimmed:.1f}s of silence ({elapsed * 1000:.0f}ms)")
+    return speech
+
+def get_audio_samples(buffer):
+    """Return captured audio as a float32 view for Whisper (no copy, no file)"""
+    # WAV files are only written when explicitly asked for, for debugging
+    if CONFIG.get("saveRecordings", False):
+        path = buffer.save_wav(CONFIG.get("recordingsDir", "./recordings"))
+        print(f"   Saved debug copy to: {path}")
+    
+    return buffer.float32()
+
+def transcribe_audio(audio):
+    """Transcribe in-memory audio using the resident Whisper engine"""
     try:
-        # Check audio file
-        file_size = os.path.getsize(audio_file)
-        print(f"   Audio file: {audio_file}")
-        print(f"   File size: {file_size} bytes")
+        duration = len(audio) / SAMPLE_RATE
+        print(f"   Audio: {len(audio)} samples ({duration:.1f}s)")
         
-        if file_size < 1000:
-            print("   ⚠️  Audio file too small, probably silent")
+        if len(audio) < 500:
+            print("   ⚠️  Audio too short, probably silent")
             return None
         
-        model = CONFIG.get("whisperModel", "base")
-        language = CONFIG.get("language", "uk")
-        
-        # Map language codes
-        whisper_lang = "uk" if language == "uk" else "en"
+        engine = get_stt_engine()
+        print(f"   Using {engine.backend} model: {engine.model_name}, language: {engine.language}")
         
-        print(f"   Using Whisper model: {model}, language: {whisper_lang}")
+        from stt_daemon import OverloadedError
         
-        # Check if whisper is available
-        whisper_check = subprocess.run(["which", "whisper"], capture_output=True, text=True)
-        if whisper_check.returncode != 0:
-            print("   ❌ Whisper CLI not found! Run: pip install openai-whisper")
-            return None
+        start = time.monotonic()
+        try:
+            text = engine.transcribe(audio)
+        except (OSError, OverloadedError) as e:
+            if engine is get_engine(CONFIG) or not CONFIG.get("sttDaemonFallback", True):
+                raise
+            print(f"   ⚠️  STT daemon unavailable ({e}), transcribing in-process")
+            engine = get_engine(CONFIG)
+            text = engine.transcribe(audio)
+        elapsed = time.monotonic() - start
         
-        print(f"   Whisper binary: {whisper_check.stdout.strip()}")
+        if text:
+            print(f"   ✅ Transcribed: {len(text)} characters in {elapsed:.2f}s "
+                  f"(RTF {elapsed / duration:.2f}; {engine.summary()})")
+            print(f"   Text: {text[:100]}")
+        else:
+            print("   ⚠️  Whisper returned no text")
         
-        # Run whisper
-        cmd = ["whisper", audio_file, "--model", model, "--output_format", "txt", "--language", whisper_lang]
-        print(f"   Running: {' '.join(cmd)}")
+        return text
+    except ImportError:
+        if CONFIG.get("sttBackend", "whisper") == "faster-whisper":
+            print("   ❌ faster-whisper not installed! Run: pip install faster-whisper")
+        else:
+            print("   ❌ Whisper not installed! Run: pip install openai-whisper")
+        return None
+    except Exception as e:
+        print(f"❌ Transcription error: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def finish_streaming(active_streamer):
+    """Decode the remaining tail of a streaming transcription"""
+    try:
+        start = time.monotonic()
+        text = active_streamer.finish()
+        print(f"   ✅ Final transcript ready {time.monotonic() - start:.2f}s after release")
+        return text
+    except Exception as e:
+        print(f"❌ Transcription error: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+_stt_daemon_engine = None
+
+def get_stt_engine():
+    """The shared STT daemon client when sttDaemon is enabled, else the in-process engine"""
+    global _stt_daemon_engine
+    if not CONFIG.get("sttDaemon", False):
+        return get_engine(CONFIG)
+    if _stt_daemon_engine is None:
+        from stt_daemon import DEFAULT_SOCKET, DaemonEngine
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=60
+        local = get_engine(CONFIG)
+        _stt_daemon_engine = DaemonEngine(CONFIG.get("sttDaemonSocket", DEFAULT_SOCKET),
+                                          CONFIG.get("whisperModel", "base"), local.language)
+    return _stt_daemon_engine
+
+def warm_up_whisper():
+    """Load the STT model (or reach the STT daemon) so the first utterance doesn't pay for it"""
+    engine = get_stt_engine()
+    try:
+        engine.load()
+    except OSError:
+        if engine is get_engine(CONFIG) or not CONFIG.get("sttDaemonFallback", True):
+            raise
+        print("   ⚠️  STT daemon not reachable, loading the model in-process instead")
+        get_engine(CONFIG).load()
+
+_transport_lock = threading.Lock()
+_acp_proxy = None
+
+def get_acp_proxy():
+    """Return the shared ACP proxy, starting it on first use"""
+    global _acp_proxy
+    with _transport_lock:
+        if _acp_proxy is None:
+            _acp_proxy = AcpProxy()
+    _acp_proxy.start()
+    return _acp_proxy
+
+_gateway = None
+
+def get_gateway():
+    """Return the shared background gateway client, connecting on first use"""
+    global _gateway
+    with _transport_lock:
+        if _gateway is None:
+            _gateway = build_gateway(CONFIG)
+    return _gateway
+
+def build_gateway(config):
+    """Start a background gateway client for config (it connects in the background)"""
+    # Imported here: websockets is only needed for this transport
+    from openclaw_client import BackgroundClient
+    
+    gateway = BackgroundClient(config.get("gatewayUrl", "ws://127.0.0.1:18789"),
+                               config.get("gatewayToken"))
+    gateway.start()
+    return gateway
+
+def warm_up_gateway(timeout=15):
+    """Bring up the configured transport and wait until it can take a request"""
+    if CONFIG.get("gatewayTransport", "proxy") == "websocket":
+        if not get_gateway().wait_connected(timeout):
+            raise TimeoutError(f"gateway not connected after {timeout}s")
+    else:
+        # The proxy answers the ping only after (re)connecting to the gateway, so ok means both are up
+        resp = get_acp_proxy().request({"type": "ping"}).result(timeout)
+        if not resp.get("ok"):
+            raise RuntimeError(resp.get("error", "proxy ping failed"))
+
+_response_cache = None
+
+def get_response_cache():
+    """Return the agent response cache, or None unless responseCache is enabled"""
+    global _response_cache
+    if _response_cache is None and CONFIG.get("responseCache", False):
+        _response_cache = ResponseCache(
+            ttl=CONFIG.get("responseCacheTtlSeconds", 300),
+            max_items=CONFIG.get("responseCacheMaxItems", 64),
+            bypass_phrases=CONFIG.get("responseCacheBypass", []),
         )
+    return _response_cache
+
+def send_to_openclaw(text, on_delta=None, cancel_token=None):
+    """
+    Send message to OpenClaw using the configured transport and get response
+    
+    on_delta, if given, receives reply text as it streams in (websocket transport only).
+    Cancelling cancel_token abandons the request and returns None.
+    Repeated questions are answered from the response cache when it is enabled.
+    """
+    cache = get_response_cache()
+    to = CONFIG.get("telegramUserId")
+    if cache:
+        cached = cache.get(text, to, "telegram")
+        if cached:
+            reply, age = cached
+            print(f"   🗂️  Response cache hit ({age:.0f}s old), skipping the gateway")
+            print(f"   {cache.summary()}")
+            if on_delta:
+                on_delta(reply)
+            return reply
+    
+    if CONFIG.get("gatewayTransport", "proxy") == "websocket":
+        reply = send_via_websocket(text, on_delta, cancel_token)
+    else:
+        reply = send_via_proxy(text, cancel_token)
+    
+    # Transports return None for failed or cut-off replies, so only complete ones are stored
+    if cache and reply:
+        cache.put(text, to, "telegram", reply)
+    return reply
+
+def send_via_websocket(text, on_delta=None, cancel_token=None):
+    """Send message over the pre-connected gateway WebSocket; a reply that doesn't complete counts as a failure"""
+    # Imported here: websockets is only needed for this transport
+    from openclaw_client import AgentError
+    
+    parts = []
+    try:
+        print("   Sending via gateway WebSocket...")
         
-        # Debug output
-        print(f"   Whisper return code: {result.returncode}")
-        if result.stdout:
-            print(f"   Whisper stdout: {result.stdout[:200]}")
-        if result.stderr:
-            print(f"   Whisper stderr: {result.stderr[:200]}")
-        
-        # Whisper writes output to <audio_file>.txt
-        txt_file = audio_file.replace(".wav", ".txt")
-        print(f"   Looking for output: {txt_file}")
+        # Print the reply as the agent generates it
+        for delta in get_gateway().stream_message(text, to=CONFIG.get("telegramUserId"),
+                                                  channel="telegram", timeout=60,
+                                                  cancel_token=cancel_token):
+            if not parts:
+                print("   💬 ", end="", flush=True)
+            print(delta, end="", flush=True)
+            parts.append(delta)
+            if on_delta:
+                on_delta(delta)
+        if parts:
+            print()
         
-        if os.path.exists(txt_file):
-            with open(txt_file) as f:
-                text = f.read().strip()
-            
-            if text:
-                print(f"   ✅ Transcribed: {len(text)} characters")
-                print(f"   Text: {text[:100]}")
-            else:
-                print("   ⚠️  Output file is empty")
-            
-            return text
+        reply = "".join(parts)
+        if reply:
+            print(f"   ✅ Got response from gateway ({len(reply)} chars)")
+            return reply
         else:
-            print(f"   ❌ Output file not found: {txt_file}")
-            # List files in directory
-            import glob
-            similar = glob.glob(audio_file.replace(".wav", ".*"))
-            print(f"   Files with same name: {similar}")
-        
+            print("   ⚠️  Empty reply from gateway")
+            return None
+    except FutureCancelledError:
+        print("\n   ⛔ Gateway request cancelled")
+        return None
+    except (FutureTimeoutError, TimeoutError):
+        print(f"{incomplete_note(parts)}   ❌ Gateway timeout")
         return None
-    except subprocess.TimeoutExpired:
-        print("   ❌ Whisper timeout (60s)")
+    except ConnectionError as e:
+        print(f"{incomplete_note(parts)}   ❌ Gateway connection failed: {e}")
+        return None
+    except AgentError as e:
+        print(f"{incomplete_note(parts)}   ❌ Agent error: {e}")
         return None
     except Exception as e:
-        print(f"❌ Transcription error: {e}")
+        print(f"{incomplete_note(parts)}   ❌ Error: {e}")
         import traceback
         traceback.print_exc()
         return None
-    finally:
-        # Clean up files
-        if txt_file and os.path.exists(txt_file):
-            os.remove(txt_file)
-        if audio_file and os.path.exists(audio_file):
-            os.remove(audio_file)
-
-def send_to_openclaw(text):
-    """Send message to OpenClaw via local ACP proxy and get response"""
+
+def incomplete_note(parts):
+    """Ends a partly printed reply and says it is being dropped"""
+    if not parts:
+        return ""
+    return f"\n   ⚠️  Reply incomplete after {sum(len(p) for p in parts)} chars, discarding it\n"
+
+def send_speculative(text, on_delta=None, cancel_token=None):
+    """
+    Early agent request for speculation over the gateway WebSocket
+
+    Nothing is printed or cached here: the reply only counts once the final
+    transcript matches (see use_speculation). Cancelling aborts the run.
+    """
+    parts = []
+    try:
+        for delta in get_gateway().stream_message(text, to=CONFIG.get("telegramUserId"),
+                                                  channel="telegram", timeout=60,
+                                                  cancel_token=cancel_token):
+            parts.append(delta)
+            if on_delta:
+                on_delta(delta)
+    except FutureCancelledError:
+        return None
+    except Exception as e:
+        print(f"   🔮 Early request failed: {e}")
+        return None
+    return "".join(parts) or None
+
+def send_via_proxy(text, cancel_token=None):
+    """Send message to OpenClaw via the resident ACP proxy and get response"""
     try:
         print(f"   Sending via ACP proxy (Node)...")
         
         telegram_user_id = CONFIG.get("telegramUserId")
         
-        # Prepare JSON line for proxy
-        payload = {
-            "type": "ask",
-            "text": text,
-            "to": telegram_user_id,
-            "channel": "telegram"
-        }
-        
-        # Run Node proxy synchronously
-        # node acp_proxy.js < payload
-        proc = subprocess.Popen(
-            ["node", "acp_proxy.js"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        stdout, stderr = proc.communicate(json.dumps(payload) + "\n", timeout=60)
-        
-        if stderr:
-            # Proxy logs go to stderr; print for debugging but don't fail immediately
-            print(f"   [proxy stderr] {stderr.strip()}")
+        resp = get_acp_proxy().ask(text, to=telegram_user_id, channel="telegram", timeout=60,
+                                   cancel_token=cancel_token)
         
-        if proc.returncode != 0:
-            print(f"   ❌ ACP proxy exited with code {proc.returncode}")
+        if not resp.get("ok"):
+            print(f"   ⚠️  Proxy error: {resp.get('error')}")
             return None
         
-        # Parse first non-empty line from stdout as JSON
-        for line in stdout.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                resp = json.loads(line)
-            except json.JSONDecodeError:
-                print(f"   ⚠️  Could not parse proxy output line: {line}")
-                continue
-            
-            if not resp.get("ok"):
-                print(f"   ⚠️  Proxy error: {resp.get('error')}")
-                return None
-            
-            reply = resp.get("reply", "")
-            if reply:
-                print(f"   ✅ Got response from ACP ({len(reply)} chars)")
-                return reply
-            else:
-                print(f"   ⚠️  Empty reply from ACP")
-                return None
-        
-        print(f"   ⚠️  No usable output from ACP proxy")
-        return None
+        reply = resp.get("reply", "")
+        if reply:
+            print(f"   ✅ Got response from ACP ({len(reply)} chars)")
+            return reply
+        else:
+            print("   ⚠️  Empty reply from ACP")
+            return None
         
-    except subprocess.TimeoutExpired:
+    except FutureTimeoutError:
         print("   ❌ ACP proxy timeout")
         return None
+    except RequestCancelled:
+        print("   ⛔ ACP request cancelled")
+        return None
+    except ProxyDiedError as e:
+        print(f"   ❌ {e}")
+        return None
     except Exception as e:
         print(f"   ❌ Error: {e}")
         import traceback
         traceback.print_exc()
         return None
 
-def speak_text(text):
-    """Speak text using TTS"""
-    tts_engine = CONFIG.get("ttsEngine", "say")
+_speaker = None
+_tts_cache = None
+_speaker_lock = threading.Lock()
+
+def build_speaker(config):
+    """Create a pipelined speaker (and its speech cache) for config, or (None, None) for an unknown engine"""
+    engine = create_engine(config)
+    if engine is None:
+        print(f"⚠️  Unknown TTS engine: {config.get('ttsEngine', 'say')}")
+        return None, None
+    cache = None
+    if config.get("ttsCache", True):
+        cache = SpeechCache(
+            config.get("ttsCacheDir", "./cache/tts"),
+            memory_items=config.get("ttsCacheMemoryItems", 32),
+            max_disk_bytes=int(config.get("ttsCacheDiskMB", 200) * 1024 * 1024),
+        )
+        engine = CachedEngine(engine, cache)
+    return PipelinedSpeaker(engine), cache
+
+def get_speaker():
+    """Return the shared pipelined speaker for the configured TTS engine"""
+    global _speaker, _tts_cache
+    with _speaker_lock:
+        if _speaker is None:
+            _speaker, _tts_cache = build_speaker(CONFIG)
+        return _speaker
+
+def tts_backend(speaker):
+    """The speaker's TTS engine without the cache wrapper"""
+    return speaker.engine.engine if isinstance(speaker.engine, CachedEngine) else speaker.engine
+
+def warm_up_speaker(speaker, config):
+    """Load the TTS voice and pre-synthesize common phrases so they play straight from the cache"""
+    if speaker is None:
+        raise RuntimeError(f"unknown TTS engine: {config.get('ttsEngine', 'say')}")
+    from piper_stream import PiperStreamEngine
     
-    try:
-        if tts_engine == "say":
-            subprocess.run(["say", text])
-        elif tts_engine == "sag":
-            subprocess.run(["sag", text])
-        elif tts_engine == "piper":
-            piper_binary = CONFIG.get("piperBinary", "./bin/piper")
-            
-            # Auto-select model based on language
-            language = CONFIG.get("language", "uk")
-            if language == "uk":
-                piper_model = CONFIG.get("piperModelUK", "./models/tts/uk_UA-lada-x_low.onnx")
-            elif language == "en":
-                piper_model = CONFIG.get("piperModelEN", "./models/tts/en_US-lessac-medium.onnx")
-            else:
-                # Fallback to explicit piperModel or default
-                piper_model = CONFIG.get("piperModel", "./models/tts/uk_UA-lada-x_low.onnx")
-            
-            # Piper: echo "text" | piper --model model.onnx --output_file output.wav && afplay output.wav
-            temp_audio = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            
-            # Generate audio with piper
-            proc = subprocess.Popen(
-                [piper_binary, "--model", piper_model, "--output_file", temp_audio.name],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            proc.communicate(input=text.encode('utf-8'))
-            
-            # Play audio
-            subprocess.run(["afplay", temp_audio.name])
-            
-            # Clean up
-            os.remove(temp_audio.name)
-        else:
-            print(f"⚠️  Unknown TTS engine: {tts_engine}")
-    except Exception as e:
-        print(f"❌ TTS error: {e}")
+    phrases = config.get("ttsWarmupPhrases", [])
+    streaming = isinstance(tts_backend(speaker), PiperStreamEngine)
+    if streaming:
+        # Starts the resident piper process
+        tts_backend(speaker).warm_up()
+    if phrases and isinstance(speaker.engine, CachedEngine):
+        speaker.engine.warm_up(phrases)
+    elif speaker.engine.suffix and not streaming:
+        # One throwaway render pulls the voice into memory / the OS file cache
+        speaker.engine.synthesize("OK").cleanup()
+
+def warm_up_tts():
+    warm_up_speaker(get_speaker(), CONFIG)
+
+def open_speech():
+    """Start a reply that can be spoken while it is still arriving"""
+    speaker = get_speaker()
+    return speaker.stream() if speaker else None
 
 # Track modifier keys state
 current_modifiers = set()
+# Space is held as part of the hotkey (ignore key auto-repeat)
+hotkey_down = False
+
+def toggle_mode():
+    """Press once to start, again (or stay silent) to stop, instead of push-to-talk"""
+    return CONFIG.get("recordingMode", "hold") in ("toggle", "dictation")
+
+def dictation_mode():
+    """Toggle-style long-form dictation, transcribed to a file segment by segment"""
+    return CONFIG.get("recordingMode", "hold") == "dictation"
 
 def on_press(key):
     """Handle key press"""
+    # Imported where used so the pipeline stages load headless (benchmark.py)
+    from pynput import keyboard
+
+    global hotkey_down
     try:
         # Track modifier keys
         if key == keyboard.Key.cmd or key == keyboard.Key.cmd_r:
@@ -355,16 +864,35 @@ def on_press(key):
         # Start recording when Space pressed while holding Cmd+Shift
         if key == keyboard.Key.space:
             if 'cmd' in current_modifiers and 'shift' in current_modifiers:
-                if not is_recording:
+                if hotkey_down:
+                    return
+                hotkey_down = True
+                pressed_at = time.monotonic()
+                if toggle_mode() and is_recording:
+                    print("   Hotkey pressed again, stopping recording...")
+                    stop_recording()
+                elif not is_recording:
                     print("🎤 Hotkey detected: Cmd+Shift+Space")
-                    print("   Hold the keys to record, release to stop")
-                    start_recording()
+                    barge_in()
+                    if dictation_mode():
+                        print("   Dictate as long as you like, press again to stop")
+                    elif toggle_mode():
+                        print("   Speak, then press again or pause to stop")
+                    else:
+                        print("   Hold the keys to record, release to stop")
+                    start_recording(pressed_at)
     except AttributeError:
         pass
 
 def on_release(key):
     """Handle key release"""
+    from pynput import keyboard
+
+    global hotkey_down
     try:
+        if key == keyboard.Key.space:
+            hotkey_down = False
+        
         # Remove released modifiers from tracking
         if key == keyboard.Key.cmd or key == keyboard.Key.cmd_r:
             current_modifiers.discard('cmd')
@@ -373,7 +901,7 @@ def on_release(key):
         
         # Stop recording when ANY of the hotkey keys is released
         # (Space, Cmd, or Shift)
-        if is_recording:
+        if is_recording and not toggle_mode():
             if (key == keyboard.Key.space or 
                 key == keyboard.Key.cmd or key == keyboard.Key.cmd_r or
                 key == keyboard.Key.shift or key == keyboard.Key.shift_r):
@@ -389,6 +917,8 @@ def on_release(key):
 
 def list_audio_devices():
     """List available audio input devices"""
+    import pyaudio
+    
     print("🎤 Audio input devices:")
     p = pyaudio.PyAudio()
     
@@ -425,32 +955,218 @@ def list_audio_devices():
     p.terminate()
     print()
 
+# Config keys each hot-swappable component is built from (the STT engine is
+# compared by stt_engine.swap_engine itself)
+STT_DAEMON_KEYS = {"sttDaemon", "sttDaemonSocket", "whisperModel"}
+TTS_KEYS = {"ttsEngine", "ttsSpeed", "language", "piperBinary", "piperModel", "piperModelUK", "piperModelEN",
+            "piperStreaming", "ttsOutput", "ttsCache", "ttsCacheDir", "ttsCacheMemoryItems", "ttsCacheDiskMB",
+            "ttsWarmupPhrases"}
+GATEWAY_KEYS = {"gatewayTransport", "gatewayUrl", "gatewayToken"}
+AUDIO_KEYS = {"inputDevice", "warmAudio", "audioPrerollMs"}
+VAD_KEYS = {"vadThresholdDb", "vadPaddingMs", "vadMinSpeechMs"}
+RESPONSE_CACHE_KEYS = {"responseCache", "responseCacheTtlSeconds", "responseCacheMaxItems", "responseCacheBypass"}
+TRACE_LOG_KEYS = {"tracing", "metricsLog", "metricsLogMaxMB", "metricsLogBackups"}
+# Only read once at start-up
+RESTART_KEYS = {"hotkey", "watchConfig", "configPollSeconds"}
+
+def apply_config(new, changed):
+    """
+    Bring the running assistant in line with an edited config.json
+    
+    Replacements for the affected components are built and warmed up next to
+    the ones in use, then everything is switched over in one step; the hotkey
+    keeps working meanwhile and untouched components stay warm.
+    """
+    print(f"♻️  config.json changed: {', '.join(sorted(changed))}")
+    started = time.monotonic()
+    
+    speaker = tts_cache = None
+    if changed & TTS_KEYS and _speaker is not None:
+        speaker, tts_cache = build_speaker(new)
+        warm_up_speaker(speaker, new)
+        print(f"   ♻️  TTS voice ready: {new.get('ttsEngine', 'say')} ({time.monotonic() - started:.1f}s)")
+    
+    gateway = None
+    if (changed & GATEWAY_KEYS and new.get("gatewayTransport", "proxy") == "websocket"
+            and (_gateway is not None or "gatewayTransport" in changed)):
+        gateway = build_gateway(new)
+        if not gateway.wait_connected(15):
+            gateway.stop()
+            raise TimeoutError(f"gateway {new.get('gatewayUrl')} not connected after 15s")
+        print(f"   ♻️  Gateway connected: {new.get('gatewayUrl')} ({time.monotonic() - started:.1f}s)")
+    
+    retired = []
+    retired_speakers = []
+    retired_stt_clients = []
+    
+    def install():
+        global vad, _speaker, _tts_cache, _gateway, _response_cache, _trace_log, _stt_daemon_engine
+        CONFIG.clear()
+        CONFIG.update(new)
+        if changed & VAD_KEYS:
+            vad = build_vad(new)
+        if speaker is not None:
+            with _speaker_lock:
+                speaker.follow(_speaker)
+                retired_speakers.append(_speaker)
+                _speaker, _tts_cache = speaker, tts_cache
+        if gateway is not None or (changed & GATEWAY_KEYS and _gateway is not None):
+            with _transport_lock:
+                retired.append(_gateway)
+                _gateway = gateway
+        if changed & RESPONSE_CACHE_KEYS:
+            _response_cache = None
+        if changed & TRACE_LOG_KEYS:
+            _trace_log = None
+        if _stt_daemon_engine is not None:
+            if changed & STT_DAEMON_KEYS:
+                # Closed after the engine lock is released: close() waits for a running transcription
+                retired_stt_clients.append(_stt_daemon_engine)
+                _stt_daemon_engine = None
+            else:
+                # The language travels with each request, so the connection can stay
+                stt_engine.apply_decode_options(_stt_daemon_engine, new)
+    
+    # A new STT model is loaded before the lock is taken; transcriptions
+    # already running finish on the old one
+    if stt_engine.swap_engine(new, commit=install):
+        print(f"   ♻️  STT model ready: {new.get('sttBackend', 'whisper')} '{new.get('whisperModel', 'base')}'")
+    
+    for old in retired:
+        if old is not None:
+            old.stop()
+    for client in retired_stt_clients:
+        client.close()
+    from piper_stream import PiperStreamEngine
+    
+    for old in retired_speakers:
+        backend, current = tts_backend(old), tts_backend(speaker)
+        # A voice still in use keeps its worker; otherwise piper exits once its queue has played
+        if isinstance(backend, PiperStreamEngine) and getattr(current, "key", None) != backend.key:
+            backend.close()
+    if changed & AUDIO_KEYS:
+        # Waits for the current recording (possibly a long dictation); keep the watcher free
+        threading.Thread(target=reopen_audio_engine, name="audio-reopen", daemon=True).start()
+    if new.get("gatewayTransport", "proxy") != "websocket" and "gatewayTransport" in changed:
+        warm_up_gateway()
+    if changed & RESTART_KEYS:
+        print(f"   ⚠️  Restart to apply: {', '.join(sorted(changed & RESTART_KEYS))}")
+    print(f"   ✅ Config applied in {time.monotonic() - started:.1f}s")
+
+def reopen_audio_engine():
+    """Reopen the microphone with the new input settings once no recording is running"""
+    global _audio_engine
+    while True:
+        with _audio_engine_lock:
+            # stop_recording clears is_recording before it ends the capture
+            if not is_recording and not (_audio_engine and _audio_engine.capturing):
+                old, _audio_engine = _audio_engine, None
+                break
+        time.sleep(0.1)
+    if old is None:
+        return
+    old.close()
+    get_audio_engine()
+    print("   ♻️  Audio input reopened")
+
+def warm_up(name, func):
+    """Run a warm-up step on its own thread and record when it finished"""
+    def run():
+        try:
+            func()
+            startup.mark(name)
+        except Exception as e:
+            startup.mark(f"{name} ({e})", ok=False)
+            print(f"⚠️  {name} warm-up failed: {e}")
+    
+    thread = threading.Thread(target=run, name=f"warm-up-{name}", daemon=True)
+    thread.start()
+    return thread
+
+def report_startup(threads):
+    """Print the start-up timeline once every warm-up step has finished"""
+    for thread in threads:
+        thread.join()
+    print(startup.report())
+
 def main():
     """Main entry point"""
+    if "--list-devices" in sys.argv:
+        list_audio_devices()
+        return
+    
     print("🎙️  OpenClaw Voice Hotkey Assistant")
-    print(f"🔑 Hotkey: {CONFIG['hotkey']} (Push-to-talk)")
-    print()
+    print(f"🔑 Hotkey: {CONFIG['hotkey']} ({'Toggle' if toggle_mode() else 'Push-to-talk'})")
+    startup.mark("config loaded")
     
-    # List audio devices
-    try:
-        list_audio_devices()
-    except Exception as e:
-        print(f"⚠️  Could not list audio devices: {e}")
-        print()
+    # Worker threads for everything after capture
+    get_pipeline()
+    
+    # The listener goes live first; everything else warms up behind it
+    from pynput import keyboard
+
+    listener = keyboard.Listener(on_press=on_press, on_release=on_release)
+    listener.start()
+    listener.wait()
+    startup.mark("hotkey listener")
+    print()
     
     print("💡 Usage:")
-    print("   1. Press and HOLD Cmd+Shift+Space")
-    print("   2. Speak while holding")
-    print("   3. Release any key to stop recording")
+    if toggle_mode():
+        print("   1. Press Cmd+Shift+Space")
+        print("   2. Speak")
+        print("   3. Press again, or just pause, to stop recording")
+    else:
+        print("   1. Press and HOLD Cmd+Shift+Space")
+        print("   2. Speak while holding")
+        print("   3. Release any key to stop recording")
     print("   4. Press Escape to exit")
+    print("   (Input devices: python3 voice_hotkey.py --list-devices)")
     print()
     print("⚠️  Make sure Accessibility permissions are granted!")
     print("   System Settings → Privacy & Security → Accessibility → Terminal")
     print()
     
-    # Start listening for hotkeys
-    with keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
+    # Microphone (kept open with a pre-roll buffer), STT model, TTS voice and gateway
+    # connection come up in parallel; a hotkey press before they are ready just waits for them
+    transport = "gateway" if CONFIG.get("gatewayTransport", "proxy") == "websocket" else "ACP proxy"
+    print(f"🔄 Warming up audio input, {CONFIG.get('sttBackend', 'whisper')} model "
+          f"'{CONFIG.get('whisperModel', 'base')}', TTS and {transport} in background...")
+    threads = [
+        warm_up("audio input", get_audio_engine),
+        warm_up("STT model", warm_up_whisper),
+        warm_up("TTS voice", warm_up_tts),
+        warm_up(transport, warm_up_gateway),
+    ]
+    threading.Thread(target=report_startup, args=(threads,), daemon=True).start()
+    if CONFIG.get("speculativeAgent", False) and not speculation_enabled():
+        print("⚠️  speculativeAgent needs \"gatewayTransport\": \"websocket\" (the ACP proxy can't abort a run); "
+              "not speculating")
+    
+    # Edits to config.json are applied while running
+    watcher = None
+    if CONFIG.get("watchConfig", True):
+        watcher = ConfigWatcher(CONFIG_FILE, CONFIG, apply_config, CONFIG.get("configPollSeconds", 1.0))
+        watcher.start()
+    
+    try:
         listener.join()
+    finally:
+        if watcher:
+            watcher.stop()
+        if _pipeline:
+            print(get_pipeline().summary())
+        if speculation_stats and speculation_stats.requests:
+            print(speculation_stats.summary())
+        if _speaker and hasattr(tts_backend(_speaker), "summary"):
+            # Streaming piper reports its time to first sample and RTF
+            print(tts_backend(_speaker).summary())
+        if _audio_engine:
+            _audio_engine.close()
+        if _acp_proxy:
+            _acp_proxy.close()
+        if _gateway:
+            _gateway.stop()
 
 if __name__ == "__main__":
     main()